@@ -7,12 +7,17 @@ if "PyQt5" in sys.modules:
     from PyQt5.QtWidgets import QApplication
 
 from palaeopca.P1Backend.P1DataObject import P1DataObject
+from palaeopca.P1Backend.P1Kernel import window_moments
+from palaeopca.P1Utils.files import is_compressed
 
 
 class P1Backend(object):
     """
     This class is the main backend of palaeopca.
     """
+    # (anchor, origin) combinations computed with variants="all", in output order
+    pca_variants = [(False, False), (False, True), (True, False), (True, True)]
+
     def __init__(self):
         """
         Initializes an empty data container
@@ -20,7 +25,7 @@ class P1Backend(object):
 
         self.__data = P1DataObject()
 
-    def load_file(self, infile: str, sep: str, skip_header: int=0, volume: float=10.0, units: str="emu"):
+    def load_file(self, infile: str, sep: str, skip_header: int=0, volume: float=10.0, units: str="emu", lazy: bool=False, columns: list=None):
         """
 
         | Loads a datafile of known format.
@@ -34,16 +39,71 @@ class P1Backend(object):
         :type skip_header: integer
         :type volume: float
         :type units: string
+        :type lazy: bool
+        :type columns: list
 
         :param infile: full path to input file
         :param sep: file delimiter
         :param skip_header: header lines to skip
         :param volume: sample volume in g/cc (default: 10.0)
         :param units: units of input data (default: emu)
+        :param lazy: parse samples on demand, see P1DataObject.load_index, compressed files are loaded completely (default: False)
+        :param columns: indices or header names of the columns above in wider files, see P1DataObject.load_data (default: all columns)
+        """
+        if lazy and not is_compressed(infile) and not infile.lower().endswith(".zip"):
+            self.__data.load_index(infile, sep, skip_header, columns = columns)
+        else:
+            self.__data.load_data(infile, sep, skip_header, columns = columns)
+        self.__data.set_volume(volume)
+        self.__data.set_units(units)
+
+    def load_magic(self, infile: str, volume: float=10.0) -> str:
+        """
+        Loads the measurements table of a MagIC text file, units are taken from the file, see P1DataObject.load_magic.
+
+        :type infile: string
+        :type volume: float
+
+        :param infile: full path to input file
+        :param volume: sample volume in g/cc (default: 10.0)
+
+        :return: unit of the steps, mT or C
+        :rtype: string
+        """
+        step_unit = self.__data.load_magic(infile)
+        self.__data.set_volume(volume)
+        return step_unit
+
+    def load_files(self, infiles, sep: str, skip_header: int=0, volume: float=10.0, units: str="emu", workers: int=None, pbar=None, columns: list=None) -> bool:
+        """
+        Loads several datafiles of the format of load_file into one dataset, see P1DataObject.load_files.
+
+        :type infiles: list
+        :type sep: string
+        :type skip_header: integer
+        :type volume: float
+        :type units: string
+        :type workers: integer
+        :type pbar: P1Progressbar
+        :type columns: list
+
+        :param infiles: full paths to input files or a glob pattern
+        :param sep: file delimiter
+        :param skip_header: header lines to skip
+        :param volume: sample volume in g/cc (default: 10.0)
+        :param units: units of input data (default: emu)
+        :param workers: number of worker processes (default: None, number of cpus)
+        :param pbar: progress bar instance, only used in gui mode
+        :param columns: column mapping, see load_file (default: all columns)
+
+        :return: False if canceled
+        :rtype: bool
         """
-        self.__data.load_data(infile, sep, skip_header)
+        if not self.__data.load_files(infiles, sep, skip_header, workers, pbar = pbar, columns = columns):
+            return False
         self.__data.set_volume(volume)
         self.__data.set_units(units)
+        return True
 
     def set_data(self, indata: P1DataObject):
         """
@@ -62,7 +122,7 @@ class P1Backend(object):
         """
         return self.__data
 
-    def run_single_interval(self, min_step: float=0.0, max_step: float=100.0, NRM_unit: str="A/m", anchor: bool=False, origin: bool=False, pbar=None) -> np.ndarray:
+    def run_single_interval(self, min_step: float=0.0, max_step: float=100.0, NRM_unit: str="A/m", anchor: bool=False, origin: bool=False, pbar=None, variants: str=None) -> np.ndarray:
         """
         Run a principal component analysis (PCA) on the data in the given interval.
 
@@ -72,6 +132,7 @@ class P1Backend(object):
         :type anchor: bool
         :type origin: bool
         :type pbar: P1ProgressBar
+        :type variants: string
 
         :param min_step: first step to be used, in step units (e.g., mT)
         :param max_step: last step to be used, in step units (e.g., mT)
@@ -79,10 +140,19 @@ class P1Backend(object):
         :param anchor: anchor pca
         :param origin: include origin
         :param pbar: progress bar instance, only used in gui mode
+        :param variants: "all" to compute every (anchor, origin) combination of pca_variants at once, anchor and origin are ignored (default: None)
         
-        :return: array with the following columns: SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step
+        :return: array with the following columns: SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step. With variants="all" the variants are stacked along a new first axis.
         :rtype: numpy.ndarray
         """
+        # Samples with individual steps are processed at once, see P1DataObject.set_ragged
+        if self.__data.is_ragged():
+            outdata = self.__run_single_interval_ragged(min_step, max_step, NRM_unit, self.pca_variants if variants == "all" else [(anchor, origin)])
+            return outdata if variants == "all" else outdata[0]
+
+        if variants == "all":
+            return self.__run_single_interval_variants(min_step, max_step, NRM_unit)
+
 
         # Prepare output
         outdata = np.zeros((self.__data.rowCount(), 8))
@@ -91,16 +161,17 @@ class P1Backend(object):
         # Loop through unique samples in data
         pbar_steps = 100 / self.__data.rowCount()
         new_value = 0
-        for n, sample in enumerate(self.__data.get_samples()):
+        for n in range(self.__data.rowCount()):
             # Get corresponding sample data
-            A = self.__data.get_data(sample)
+            A = self.__data.get_vectors(slice(n, n + 1))[0]
 
             # Calculate, convert and save NRM convert to provided unit
             NRM = np.sqrt(A[0, 0]**2 + A[0, 1]**2 + A[0, 2]**2) * self.get_conversion_factor(self.__data.get_units(), NRM_unit)
             outdata[n, 1] = NRM
 
-            # Save data that will be used for PCA
+            # Save data that will be used for PCA, steps the sample does not have are NaN and dropped as in the ragged case
             B = A[np.where(np.logical_and(self.__data.get_steps() >= min_step, self.__data.get_steps() <= max_step)), :][0]
+            B = B[np.all(np.isfinite(B), axis = 1)]
             
             # Run PCA and save results
             results = self.ppca(B, anchor=anchor, origin=origin)
@@ -120,7 +191,7 @@ class P1Backend(object):
 
         return outdata
 
-    def run_best_fit(self, min_steps: int=3, NRM_unit: str="A/m", anchor: bool=False, origin: bool=False, pbar=None) -> np.ndarray:
+    def run_best_fit(self, min_steps: int=3, NRM_unit: str="A/m", anchor: bool=False, origin: bool=False, pbar=None, variants: str=None) -> np.ndarray:
         """
         Run a principal component analysis (PCA) on the data minimizing the MADp.
 
@@ -129,20 +200,29 @@ class P1Backend(object):
         :type anchor: bool
         :type origin: bool
         :type pbar: P1ProgressBar
+        :type variants: string
 
         :param min_steps: minimum number of steps to be used (default: 3)
         :param NRM_unit: units for NRM (default = A/m)
         :param anchor: anchor pca
         :param origin: include origin
         :param pbar: progress bar instance, only used in gui mode
+        :param variants: "all" to compute every (anchor, origin) combination of pca_variants at once, anchor and origin are ignored (default: None)
         
-        :return: array with the following columns: SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step
+        :return: array with the following columns: SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step. With variants="all" the variants are stacked along a new first axis.
         :rtype: numpy.ndarray
         """
         # Need at least 3 steps, set to 3 if less
         if min_steps < 3:
             min_steps = 3
 
+        if self.__data.is_ragged():
+            outdata = self.__run_best_fit_ragged(min_steps, NRM_unit, self.pca_variants if variants == "all" else [(anchor, origin)], pbar)
+            return outdata if variants == "all" else outdata[0]
+
+        if variants == "all":
+            return self.__run_best_fit_variants(min_steps, NRM_unit, pbar)
+
         # Prepare output
         outdata = np.zeros((self.__data.rowCount(), 8))
         outdata[:, 0] = self.__data.get_samples()
@@ -150,9 +230,9 @@ class P1Backend(object):
         # Loop through unique samples in data
         pbar_steps = 100 / self.__data.rowCount()
         new_value = 0
-        for n, sample in enumerate(self.__data.get_samples()):
+        for n in range(self.__data.rowCount()):
             # Get corresponding sample data
-            A = self.__data.get_data(sample)
+            A = self.__data.get_vectors(slice(n, n + 1))[0]
 
              # Calculate, convert and save NRM convert to provided unit
             NRM = np.sqrt(A[0, 0]**2 + A[0, 1]**2 + A[0, 2]**2) * self.get_conversion_factor(self.__data.get_units(), NRM_unit)
@@ -198,6 +278,7 @@ class P1Backend(object):
         |   Declination: Declination matrix with observations in rows, windows in columns.
         |   MADp: medium angular deviation, prolate matrix with observations in rows, windows in columns.
         |   MADo: medium angular deviation, oblate matrix with observations in rows, windows in columns.
+        |   Labels: vector of sample labels, only if sample ids are not numbers.
 
         :type window: integer
         :type diff: bool
@@ -219,61 +300,481 @@ class P1Backend(object):
             window = 3
 
         # Prepare output
+        outdata = self.__prepare_mesh(window, diff)
+
+        # Loop through unique samples in data
+        pbar_steps = 100 / self.__data.rowCount()
+        new_value = 0
+        for n in range(self.__data.rowCount()):
+            self.__mesh_sample(outdata, n, window=window, diff=diff, anchor=anchor, origin=origin)
+            
+            if pbar != None:
+                new_value += pbar_steps
+                if int(new_value) > pbar.progress.value():
+                    pbar.progress.setValue(int(new_value))
+                QApplication.processEvents()
+
+        return outdata
+
+    def run_mesh_progressive(self, window: int=3, diff: bool=False, anchor: bool=False, origin: bool=False, strides: tuple=(64, 16, 4, 1), chunk: int=256):
+        """
+        | Run a moving window principal component analysis (PCA) on the data in progressively refined passes.
+        | 
+        | The first pass processes every strides[0]-th sample, each following pass fills in the samples of the next finer stride.
+        | The magnetization is calculated upfront, PCA results of samples that have not been processed yet are NaN. The generator yields a tuple (outdata, done, final) after every chunk of samples:
+        |   outdata: dictionary as returned by run_mesh, filled in place.
+        |   done: boolean vector (copy) marking processed samples.
+        |   final: True if the chunk completes a refinement pass.
+
+        :type window: integer
+        :type diff: bool
+        :type anchor: bool
+        :type origin: bool
+        :type strides: tuple
+        :type chunk: integer
+
+        :param window: interval length for pca
+        :param diff: use difference vector (true) or original data (false)
+        :param anchor: anchor pca
+        :param origin: include origin
+        :param strides: sample strides of the refinement passes in descending order (default: (64, 16, 4, 1))
+        :param chunk: maximum number of samples processed between two yields (default: 256)
+
+        :return: generator of (outdata, done, final) tuples
+        :rtype: generator
+        """
+        # Need at least 3 steps, set to 3 if less
+        if window < 3:
+            window = 3
+
+        # Prepare output, rows are filled in as they are processed
+        outdata = self.__prepare_mesh(window, diff, fill = np.nan)
+        done = np.zeros(self.__data.rowCount(), dtype = bool)
+
+        # Make sure the last pass covers every sample
+        strides = sorted(set([int(x) for x in strides if x >= 1] + [1]), reverse = True)
+
+        for stride in strides:
+            rows = np.arange(0, self.__data.rowCount(), stride)
+            rows = rows[~done[rows]]
+
+            if len(rows) == 0:
+                continue
+
+            for index_0 in range(0, len(rows), chunk):
+                for n in rows[index_0:index_0 + chunk]:
+                    self.__mesh_sample(outdata, n, window=window, diff=diff, anchor=anchor, origin=origin)
+                    done[n] = True
+
+                yield outdata, done.copy(), index_0 + chunk >= len(rows)
+
+    def __prepare_mesh(self, window: int, diff: bool=False, fill: float=0.0) -> Dict:
+        """
+        Allocates the output dictionary of a mesh PCA and calculates the normalized magnetization.
+
+        :type window: integer
+        :type diff: bool
+        :type fill: float
+
+        :param window: interval length for pca
+        :param diff: use difference vector (true) or original data (false)
+        :param fill: initial value of the result matrices (default: 0.0)
+
+        :return: dictionary with the following keys: Samples, Centers, Steps, M, Inclination, Declination, MADp, MADo
+        :rtype: dictionary
+        """
         N = self.__data.colCount() - (window - 1) # Calculates number of columns
+        steps = self.__data.get_steps()
+
         outdata = {
             "Samples": self.__data.get_samples(),
-            "Centers": np.zeros(N),
-            "Steps": self.__data.get_steps(),
-            "M": np.zeros((self.__data.rowCount(), self.__data.colCount())),
-            "Inclination": np.zeros((self.__data.rowCount(), N)),
-            "Declination": np.zeros((self.__data.rowCount(), N)),
-            "MADp": np.zeros((self.__data.rowCount(), N)),
-            "MADo": np.zeros((self.__data.rowCount(), N)),
+            "Centers": np.asarray([steps[index_0:index_0 + window].mean() for index_0 in range(N)]),
+            "Steps": steps,
+            "M": np.empty((self.__data.rowCount(), self.__data.colCount())),
+            "Inclination": np.full((self.__data.rowCount(), N), fill),
+            "Declination": np.full((self.__data.rowCount(), N), fill),
+            "MADp": np.full((self.__data.rowCount(), N), fill),
+            "MADo": np.full((self.__data.rowCount(), N), fill),
         }
 
-        # Loop through unique samples in data
-        pbar_steps = 100 / self.__data.rowCount()
-        new_value = 0
-        for n, sample in enumerate(self.__data.get_samples()):
-            # Get corresponding sample data
-            A = self.__data.get_data(sample)
+        if self.__data.get_labels() is not None:
+            outdata["Labels"] = self.__data.get_labels()
 
-            # Get number of steps
-            steps = self.__data.colCount()
+        self.__mesh_magnetization(outdata["M"], diff)
 
-            # Calculate difference vector if needed
-            if diff:
-                A = np.diff(A, axis = 0) * -1
-                A = np.append(A, [[np.nan, np.nan, np.nan]], axis = 0)
+        return outdata
 
-             # Calculate, convert and save NRM convert to provided unit
-            for m in range(steps):
-                outdata["M"][n, m] = np.sqrt(A[m, 0]**2 + A[m, 1]**2 + A[m, 2]**2)
+    def __mesh_magnetization(self, out: np.ndarray, diff: bool=False):
+        """
+        Calculates the magnetization of all samples and steps normalized to the maximum of each sample.
+
+        :type out: numpy.ndarray
+        :type diff: bool
+
+        :param out: preallocated (samples, steps) output array
+        :param diff: use difference vector (true) or original data (false)
+        """
+        if diff:
+            A = self.__data.get_difference_vectors()
+        else:
+            A = self.__data.get_vectors()
+
+        np.einsum("ijk,ijk->ij", A, A, out = out)
+        np.sqrt(out, out = out)
+        np.divide(out, np.nanmax(out, axis = 1)[:, None], out = out)
+
+    def __mesh_sample(self, outdata: Dict, n: int, window: int=3, diff: bool=False, anchor: bool=False, origin: bool=False):
+        """
+        Runs the moving window PCA for a single sample and writes row n of the output dictionary.
+
+        :type outdata: dictionary
+        :type n: integer
+        :type window: integer
+        :type diff: bool
+        :type anchor: bool
+        :type origin: bool
+
+        :param outdata: output dictionary, see run_mesh
+        :param n: row index of the sample
+        :param window: interval length for pca
+        :param diff: use difference vector (true) or original data (false)
+        :param anchor: anchor pca
+        :param origin: include origin
+        """
+        # Get corresponding sample data, difference vectors are shared through the data object
+        if diff:
+            A = self.__data.get_difference_vectors()[n]
+        else:
+            A = self.__data.get_vectors(slice(n, n + 1))[0]
+
+        # Get number of steps
+        steps = self.__data.colCount()
+
+        # Iterate through array, steps the sample does not have are NaN and dropped
+        for index_0 in range(steps - window + 1):
+            B = A[index_0:index_0 + window, :]
+            B = B[np.all(np.isfinite(B), axis = 1)]
+            results = self.ppca(B, anchor=anchor, origin=origin)
+            outdata["Inclination"][n, index_0] = results["Inclination"]
+            outdata["Declination"][n, index_0] = results["Declination"]
+            outdata["MADp"][n, index_0] = results["MADp"]
+            outdata["MADo"][n, index_0] = results["MADo"]
+
+    def __run_single_interval_variants(self, min_step: float, max_step: float, NRM_unit: str) -> np.ndarray:
+        """
+        Single interval PCA for all pca_variants, derived from the same window moments.
+
+        :type min_step: float
+        :type max_step: float
+        :type NRM_unit: string
+
+        :param min_step: first step to be used, in step units (e.g., mT)
+        :param max_step: last step to be used, in step units (e.g., mT)
+        :param NRM_unit: units for NRM
+
+        :return: array of shape (variants, samples, 8), columns as in run_single_interval
+        :rtype: numpy.ndarray
+        """
+        A = self.__data.get_vectors()
+        steps = self.__data.get_steps()
+
+        # Moments of the interval as a single window, with and without origin
+        B = A[:, np.logical_and(steps >= min_step, steps <= max_step), :]
+        moments = {origin: [x[:, 0] for x in self.window_moments(B, B.shape[1], origin)] for origin in (False, True)}
+        n = np.full(B.shape[0], B.shape[1], dtype = float)
+        trend = B[:, -1, :] - B[:, 0, :]
+
+        outdata = np.zeros((len(self.pca_variants), self.__data.rowCount(), 8))
+        outdata[:, :, 0] = self.__data.get_samples()
+        outdata[:, :, 1] = np.sqrt(np.sum(A[:, 0, :]**2, axis = 1)) * self.get_conversion_factor(self.__data.get_units(), NRM_unit)
+        outdata[:, :, 6] = min_step
+        outdata[:, :, 7] = max_step
+
+        for v, (anchor, origin) in enumerate(self.pca_variants):
+            S1, S2, M2 = moments[origin]
+            results = self.ppca_moments(S1, S2, n, trend, anchor=anchor, origin=origin, M2=M2)
+            outdata[v, :, 2] = results["Inclination"]
+            outdata[v, :, 3] = results["Declination"]
+            outdata[v, :, 4] = results["MADp"]
+            outdata[v, :, 5] = results["MADo"]
+
+        return outdata
+
+    def __run_best_fit_variants(self, min_steps: int, NRM_unit: str, pbar=None) -> np.ndarray:
+        """
+        Best fit PCA for all pca_variants, all windows of equal length are solved at once.
+
+        :type min_steps: integer
+        :type NRM_unit: string
+        :type pbar: P1ProgressBar
+
+        :param min_steps: minimum number of steps to be used
+        :param NRM_unit: units for NRM
+        :param pbar: progress bar instance, only used in gui mode
+
+        :return: array of shape (variants, samples, 8), columns as in run_best_fit
+        :rtype: numpy.ndarray
+        """
+        A = self.__data.get_vectors()
+        steps = self.__data.get_steps()
+
+        outdata = np.zeros((len(self.pca_variants), self.__data.rowCount(), 8))
+        outdata[:, :, 0] = self.__data.get_samples()
+        outdata[:, :, 1] = np.sqrt(np.sum(A[:, 0, :]**2, axis = 1)) * self.get_conversion_factor(self.__data.get_units(), NRM_unit)
+
+        # Set an abritraty MADp
+        outdata[:, :, 4] = 10*5
+
+        # Windows of equal length are processed at once, shorter windows win ties as in run_best_fit
+        pbar_steps = 100 / max(len(steps) - min_steps + 1, 1)
+        new_value = 0
+        for window in range(min_steps, len(steps) + 1):
+            moments = {origin: self.window_moments(A, window, origin) for origin in (False, True)}
+            n = np.full((A.shape[0], A.shape[1] - window + 1), window, dtype = float)
+            trend = A[:, window - 1:, :] - A[:, :A.shape[1] - window + 1, :]
+
+            for v, (anchor, origin) in enumerate(self.pca_variants):
+                S1, S2, M2 = moments[origin]
+                results = self.ppca_moments(S1, S2, n, trend, anchor=anchor, origin=origin, M2=M2)
+
+                # First window with the lowest MADp of this length
+                MADp = np.where(np.isnan(results["MADp"]), np.inf, results["MADp"])
+                index_0 = MADp.argmin(axis = 1)
+                rows = np.arange(MADp.shape[0])
+                better = MADp[rows, index_0] < outdata[v, :, 4]
+
+                rows = rows[better]
+                index_0 = index_0[better]
+                outdata[v, rows, 2] = results["Inclination"][rows, index_0]
+                outdata[v, rows, 3] = results["Declination"][rows, index_0]
+                outdata[v, rows, 4] = results["MADp"][rows, index_0]
+                outdata[v, rows, 5] = results["MADo"][rows, index_0]
+                outdata[v, rows, 6] = steps[index_0]
+                outdata[v, rows, 7] = steps[index_0 + window - 1]
 
-            # Iterate through array
-            for index_0 in range(steps - window + 1):
-                if n == 0:
-                    # Calculate and save window center
-                    outdata["Centers"][index_0] = self.__data.get_steps()[index_0:index_0 + window].mean()
-                
-                B = A[index_0:index_0 + window, :]
-                results = self.ppca(B, anchor=anchor, origin=origin)
-                outdata["Inclination"][n, index_0] = results["Inclination"]
-                outdata["Declination"][n, index_0] = results["Declination"]
-                outdata["MADp"][n, index_0] = results["MADp"]
-                outdata["MADo"][n, index_0] = results["MADo"]
-            
             if pbar != None:
                 new_value += pbar_steps
                 if int(new_value) > pbar.progress.value():
                     pbar.progress.setValue(int(new_value))
                 QApplication.processEvents()
 
-        # Normalize NRM
-        outdata["M"] = outdata["M"] / outdata["M"].max(axis = 1)[:, None]
+        return outdata
+
+    def __run_single_interval_ragged(self, min_step: float, max_step: float, NRM_unit: str, variants: list) -> np.ndarray:
+        """
+        Single interval PCA of samples with individual steps, window moments of all samples are summed at once.
+
+        :type min_step: float
+        :type max_step: float
+        :type NRM_unit: string
+        :type variants: list
+
+        :param min_step: first step to be used, in step units (e.g., mT)
+        :param max_step: last step to be used, in step units (e.g., mT)
+        :param NRM_unit: units for NRM
+        :param variants: (anchor, origin) combinations to compute
+
+        :return: array of shape (variants, samples, 8), columns as in run_single_interval
+        :rtype: numpy.ndarray
+        """
+        R = self.__data.get_ragged()
+        counts = np.diff(R["offsets"])
+        sample = np.repeat(np.arange(len(counts)), counts)
+
+        # Window moments, rows are sorted by sample and step
+        selected = np.flatnonzero(np.logical_and(R["steps"] >= min_step, R["steps"] <= max_step))
+        B = R["vectors"][selected]
+        s = sample[selected]
+        n = np.bincount(s, minlength = len(counts)).astype(float)
+        start = np.cumsum(n).astype(int) - n.astype(int)
+
+        # Samples with the same number of rows in the interval are summed at once, as a single window like in the grid case
+        moments = {origin: tuple(np.zeros((len(counts),) + shape) for shape in ((3,), (3, 3), (3, 3))) for origin in set(x[1] for x in variants)}
+        for length in np.unique(n[n > 0]).astype(int):
+            index = np.flatnonzero(n == length)
+            X = B[start[index][:, None] + np.arange(length)]
+            for origin, M in moments.items():
+                for x, y in zip(M, self.window_moments(X, length, origin)):
+                    x[index] = y[:, 0]
+
+        trend = np.full((len(counts), 3), np.nan)
+        if len(s) > 0:
+            first = np.append(True, s[1:] != s[:-1])
+            last = np.append(s[1:] != s[:-1], True)
+            trend[s[first]] = B[last] - B[first]
+
+        outdata = np.zeros((len(variants), len(counts), 8))
+        outdata[:, :, 0] = self.__data.get_samples()
+        outdata[:, :, 1] = _ragged_nrm(R) * self.get_conversion_factor(self.__data.get_units(), NRM_unit)
+        outdata[:, :, 6] = min_step
+        outdata[:, :, 7] = max_step
+
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            for v, (anchor, origin) in enumerate(variants):
+                S1, S2, M2 = moments[origin]
+                results = self.ppca_moments(S1, S2, n, trend, anchor=anchor, origin=origin, M2=M2)
+                outdata[v, :, 2] = results["Inclination"]
+                outdata[v, :, 3] = results["Declination"]
+                outdata[v, :, 4] = results["MADp"]
+                outdata[v, :, 5] = results["MADo"]
+
+        return outdata
+
+    def __run_best_fit_ragged(self, min_steps: int, NRM_unit: str, variants: list, pbar=None) -> np.ndarray:
+        """
+        | Best fit PCA of samples with individual steps.
+        | Samples with the same number of steps are gathered into a block, all windows of equal length of a block are solved at once.
+
+        :type min_steps: integer
+        :type NRM_unit: string
+        :type variants: list
+        :type pbar: P1ProgressBar
+
+        :param min_steps: minimum number of steps to be used
+        :param NRM_unit: units for NRM
+        :param variants: (anchor, origin) combinations to compute
+        :param pbar: progress bar instance, only used in gui mode
+
+        :return: array of shape (variants, samples, 8), columns as in run_best_fit
+        :rtype: numpy.ndarray
+        """
+        R = self.__data.get_ragged()
+        counts = np.diff(R["offsets"])
+
+        outdata = np.zeros((len(variants), len(counts), 8))
+        outdata[:, :, 0] = self.__data.get_samples()
+        outdata[:, :, 1] = _ragged_nrm(R) * self.get_conversion_factor(self.__data.get_units(), NRM_unit)
+
+        # Set an abritraty MADp
+        outdata[:, :, 4] = 10*5
+
+        lengths = np.unique(counts[counts >= min_steps])
+        pbar_steps = 100 / max(np.sum(lengths - min_steps + 1), 1)
+        new_value = 0
+        for length in lengths:
+            # Dense block of all samples with this number of steps
+            block = np.flatnonzero(counts == length)
+            index = R["offsets"][block][:, None] + np.arange(length)
+            A = R["vectors"][index]
+            steps = R["steps"][index]
+
+            for window in range(min_steps, length + 1):
+                moments = {origin: self.window_moments(A, window, origin) for origin in set(x[1] for x in variants)}
+                n = np.full((A.shape[0], A.shape[1] - window + 1), window, dtype = float)
+                trend = A[:, window - 1:, :] - A[:, :A.shape[1] - window + 1, :]
+
+                for v, (anchor, origin) in enumerate(variants):
+                    S1, S2, M2 = moments[origin]
+                    results = self.ppca_moments(S1, S2, n, trend, anchor=anchor, origin=origin, M2=M2)
+
+                    # First window with the lowest MADp of this length
+                    MADp = np.where(np.isnan(results["MADp"]), np.inf, results["MADp"])
+                    index_0 = MADp.argmin(axis = 1)
+                    rows = np.arange(MADp.shape[0])
+                    better = MADp[rows, index_0] < outdata[v, block, 4]
+
+                    rows = rows[better]
+                    index_0 = index_0[better]
+                    outdata[v, block[rows], 2] = results["Inclination"][rows, index_0]
+                    outdata[v, block[rows], 3] = results["Declination"][rows, index_0]
+                    outdata[v, block[rows], 4] = results["MADp"][rows, index_0]
+                    outdata[v, block[rows], 5] = results["MADo"][rows, index_0]
+                    outdata[v, block[rows], 6] = steps[rows, index_0]
+                    outdata[v, block[rows], 7] = steps[rows, index_0 + window - 1]
+
+                if pbar != None:
+                    new_value += pbar_steps
+                    if int(new_value) > pbar.progress.value():
+                        pbar.progress.setValue(int(new_value))
+                    QApplication.processEvents()
 
         return outdata
 
+    def window_moments(self, A: np.ndarray, window: int, origin: bool=False) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        | Calculates the moments of all windows of a given length along the steps of every sample, see P1Kernel.window_moments.
+
+        :type A: numpy.ndarray
+        :type window: integer
+        :type origin: bool
+
+        :param A: data array with samples in the first, steps in the second and (x, y, z) in the third dimension
+        :param window: number of steps per window
+        :param origin: append a zero row to every window (default: False)
+
+        :returns: sums of the vectors, of their outer products and of the outer products of the centered vectors
+        :rtype: tuple
+        """
+        return window_moments(A, window, origin)
+
+    def ppca_moments(self, S1: np.ndarray, S2: np.ndarray, n: np.ndarray, trend: np.ndarray, anchor: bool=False, origin: bool=False, M2: np.ndarray=None) -> Dict:
+        """
+        | Batched principal component analysis from window moments, equivalent to ppca on the window data.
+        | Anchored PCA uses the raw second moments, free PCA the centered ones, the origin adds a zero row.
+        | Centered moments M2 should be given for free PCA, centering S2 loses precision if the window mean is large compared to its spread.
+        | With origin, M2 has to include the zero row and be centered on the mean of all rows, as returned by window_moments with origin.
+        | 
+        | Dictionary keys correspond to the following parameters, all arrays have the batch shape of n:
+        |   Inclination: Inclination.
+        |   Declination: Declination.
+        |   MADp: medium angular deviation, prolate.
+        |   MADo: medium angular deviation, oblate.
+
+        :type S1: numpy.ndarray
+        :type S2: numpy.ndarray
+        :type n: numpy.ndarray
+        :type trend: numpy.ndarray
+        :type anchor: bool
+        :type origin: bool
+
+        :param S1: sums of the window vectors (..., 3)
+        :param S2: sums of the outer products of the window vectors (..., 3, 3)
+        :param n: number of observations in the windows (...)
+        :param trend: last minus first vector of the windows (..., 3), used to orient the eigenvectors
+        :param anchor: anchor pca
+        :param origin: include origin
+        :param M2: sums of the outer products of the window vectors centered on the window mean, with origin including the zero row (..., 3, 3) (default: None)
+
+        :returns: dictionary with the following keys: Inclination, Declination, MADp, MADo
+        :rtype: dictionary
+        """
+        # Origin adds a zero row, which does not change the sums
+        if origin: n = n + 1
+
+        # Orientation tensor, centered if not anchored
+        if anchor:
+            T = S2 / n[..., None, None]
+        elif M2 is not None:
+            T = M2 / n[..., None, None]
+        else:
+            mean = S1 / n[..., None]
+            T = S2 / n[..., None, None] - mean[..., :, None] * mean[..., None, :]
+
+        results = {
+            "Inclination": np.full(n.shape, np.nan),
+            "Declination": np.full(n.shape, np.nan),
+            "MADp": np.full(n.shape, np.nan),
+            "MADo": np.full(n.shape, np.nan),
+        }
+
+        # SVD, windows that do not converge stay NaN
+        valid = np.isfinite(T).all(axis = (-2, -1))
+        try:
+            _, evals, evecs = np.linalg.svd(T[valid])
+        except np.linalg.LinAlgError:
+            return results
+
+        # Largest eigenvector, pointing against the trend
+        evec = evecs[:, 0, :]
+        evec = np.where((np.sum(trend[valid] * evec, axis = -1) > 0)[:, None], -evec, evec)
+
+        results["Inclination"][valid] = np.degrees(np.arctan2(evec[:, 2], np.sqrt(evec[:, 0]**2 + evec[:, 1]**2)))
+        results["Declination"][valid] = 180 + np.degrees(np.arctan2(evec[:, 1], evec[:, 0]))
+        results["MADp"][valid] = np.degrees(np.arctan(np.sqrt((evals[:, 2] + evals[:, 1]) / evals[:, 0])))
+        results["MADo"][valid] = np.degrees(np.arctan(np.sqrt(evals[:, 2] / (evals[:, 1] + evals[:, 0]))))
+
+        return results
+
     def get_conversion_factor(self, units_in: str, units_out: str) -> float:
         """
         Calculates unit conversion factor based on input and output units
@@ -440,4 +941,12 @@ class P1Backend(object):
             [np.sum(indata[:,2]*indata[:,0]), np.sum(indata[:,2]*indata[:,1]), np.sum(indata[:,2]**2)],
         ]) * 1 / indata.shape[0]
 
-        return T
\ No newline at end of file
+        return T
+
+
+def _ragged_nrm(R: dict) -> np.ndarray:
+    # Magnetization of the first step of every sample
+    first = np.minimum(R["offsets"][:-1], len(R["vectors"]) - 1)
+    nrm = np.sqrt(np.sum(R["vectors"][first]**2, axis = 1))
+    nrm[np.diff(R["offsets"]) == 0] = np.nan
+    return nrm
@@ -1,6 +1,21 @@
 # Imports
+import io
+import os
+import sys
+import glob
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
 import numpy as np
 
+if "PyQt5" in sys.modules:
+    from PyQt5.QtWidgets import QApplication
+
+from palaeopca.P1Utils.P1LRUCache import P1LRUCache
+from palaeopca.P1Utils.files import open_file, archive_members, is_compressed
+from palaeopca.P1Backend.P1MagIC import read_measurements
+
 
 class P1DataObject(object):
     """
@@ -13,36 +28,355 @@ class P1DataObject(object):
         self.__data = None
         self.__samples = None
         self.__steps = None
+        self.__diff = None
         self.__volume = 10
         self.__units = "emu"
+        self.__index = None
+        self.__report = None
+        self.__ragged = None
+        self.__labels = None
+        self.__depth = False
+        self.__lookup = None
+        self.__sources = None
+        self.__step_unit = None
 
-    def load_data(self, infile: str, sep: str, skip_header: int=0):
+    def load_data(self, infile: str, sep: str, skip_header: int=0, max_rows: int=None, cache=None, ragged: bool=False, columns: list=None):
         """
         Loads a data file.
 
         :type infile: string
         :type sep: string
         :type skip_header: integer
+        :type max_rows: integer
+        :type cache: P1ImportCache
+        :type ragged: bool
+        :type columns: list
 
         :param infile: full path to input file
         :param sep: file delimiter
         :param skip_header: header lines to skip
+        :param max_rows: read only the first rows, e.g. for a preview, the last incomplete sample is dropped (default: all rows)
+        :param cache: cache of parsed files, complete reads are taken from and written to it (default: no cache)
+        :param ragged: store the steps of every sample without padding, for samples with different step schemes, see ragged_rows (default: False)
+        :param columns: indices or header names of the columns SampleID, step, x, y, z or SampleID, depth, step, x, y, z, other columns are not parsed (default: all columns in this order)
+
+        | Sample ids that are not numbers, e.g. core sections, are stored as integer codes and a table of unique labels, see get_labels.
+        | A sixth column after such ids is read as depth and returned by get_samples, otherwise get_samples returns the codes.
+        | Files ending with .gz, .bz2, .xz or .zip are decompressed while they are read, zip archives with several files are loaded with load_files.
         """
+        members = archive_members(infile)
+        if len(members) > 1 and max_rows is None:
+            self.load_files(members, sep, skip_header, cache = cache, ragged = ragged, columns = columns)
+            return
+        infile = members[0]
+
         # Try to read the first line as the header
         if skip_header > 0:
-            with open(infile, 'r') as fin:
+            with open_file(infile, "rt", errors = "replace") as fin:
                 header = fin.readline()
-            fin.close()
             self.__header = header.split(sep)
         else:
             self.__header = []
 
-        data = np.genfromtxt(infile, delimiter = sep, skip_header = skip_header)
-        data = data.reshape(len(np.unique(data[:, 0])), len(np.unique(data[:, 1])), data.shape[1])
+        data = None
+        report = None
+        labels = None
+        depth = None
 
-        self.__data = data
-        self.__samples = data[:, 0, 0]
-        self.__steps = data[0, :, 1]
+        # Cached arrays do not keep labels
+        if cache is not None and max_rows is None and not ragged and not _has_labels(infile, sep, skip_header, columns):
+            data = cache.load(infile, sep, skip_header, columns)
+
+        if data is None:
+            data, labels, depth = _read_rows(infile, sep, skip_header, max_rows, columns)
+            if max_rows is not None and data.shape[0] == max_rows:
+                last = data[:, 0] == data[-1, 0]
+                if not last.all():
+                    data = data[~last]
+
+            if ragged:
+                self.set_ragged(*ragged_rows(data))
+                self.__set_labels(labels, depth)
+                self.__sources = None
+                self.__step_unit = None
+                return
+
+            data, report = grid_rows(data)
+
+            if cache is not None and max_rows is None and labels is None:
+                cache.store(infile, data, sep, skip_header, columns)
+
+        self.__set_grid(data, report)
+        self.__set_labels(labels, depth)
+        self.__sources = None
+        self.__step_unit = None
+
+    def load_files(self, infiles, sep: str, skip_header: int=0, workers: int=None, cache=None, ragged: bool=False, pbar=None, columns: list=None) -> bool:
+        """
+        | Loads several data files into one dataset, files are parsed concurrently in worker processes.
+        | Samples keep the order of the files, the steps of all files are merged into one grid, see grid_rows.
+        | Every sample remembers the file it was read from, see get_sources.
+        | Sample ids are kept if they are unique, ids found in several files are labelled with the file name, see get_labels.
+        | Every file of a zip archive is loaded as a separate file.
+
+        :type infiles: list
+        :type sep: string
+        :type skip_header: integer
+        :type workers: integer
+        :type cache: P1ImportCache
+        :type ragged: bool
+        :type pbar: P1Progressbar
+        :type columns: list
+
+        :param infiles: full paths to input files or a glob pattern
+        :param sep: file delimiter
+        :param skip_header: header lines to skip
+        :param workers: number of worker processes, 0 parses in the calling process (default: None, number of cpus)
+        :param cache: cache of parsed files, see load_data (default: no cache)
+        :param ragged: store the steps of every sample without padding, see load_data (default: False)
+        :param pbar: progress bar instance, only used in gui mode
+        :param columns: column mapping, header names are looked up in every file, see load_data (default: all columns)
+
+        :returns: False if canceled, data is not changed then
+        :rtype: bool
+        """
+        if isinstance(infiles, str):
+            infiles = sorted(glob.glob(infiles))
+        infiles = [member for infile in infiles for member in archive_members(infile)]
+        if len(infiles) == 0:
+            raise ValueError("No input files")
+
+        if workers is None:
+            workers = os.cpu_count()
+
+        # Results are collected by file, files finish in any order
+        files = [None] * len(infiles)
+        if workers == 0 or len(infiles) == 1:
+            for n, infile in enumerate(infiles):
+                files[n] = _read_file(infile, sep, skip_header, cache, columns)
+                if not _update_progress(pbar, n + 1, len(infiles)):
+                    return False
+        else:
+            pool = ProcessPoolExecutor(min(workers, len(infiles)), mp_context = multiprocessing.get_context("spawn"))
+            canceled = False
+            try:
+                pending = {pool.submit(_read_file, infile, sep, skip_header, cache, columns): n for n, infile in enumerate(infiles)}
+                done = 0
+                while done < len(infiles):
+                    finished, _ = wait(pending, timeout = 0.1, return_when = FIRST_COMPLETED)
+                    for future in finished:
+                        files[pending.pop(future)] = future.result()
+                        done += 1
+
+                    if not _update_progress(pbar, done, len(infiles)):
+                        canceled = True
+                        return False
+            finally:
+                # Queued reads are dropped on cancel, running reads are not waited for so the gui does not block
+                pool.shutdown(wait = not canceled, cancel_futures = canceled)
+
+        data, labels, samples, sources = _merge_files(infiles, files)
+
+        with open_file(infiles[0], "rt", errors = "replace") as fin:
+            header = fin.readline()
+        self.__header = header.split(sep) if skip_header > 0 else []
+
+        # Samples are codes numbered across all files until labels and ids are set
+        if ragged:
+            self.set_ragged(*ragged_rows(data))
+        else:
+            self.__set_grid(*grid_rows(data))
+        codes = self.__samples.astype(int)
+        self.__set_labels(labels, samples)
+        self.__depth = labels is not None and any(x[1] is None or x[2] is not None for x in files)
+        self.__sources = (infiles, sources[codes])
+        self.__step_unit = None
+        return True
+
+    def load_magic(self, infile: str, ragged: bool=False) -> str:
+        """
+        | Loads the measurements table of a MagIC text file, see P1MagIC.read_measurements.
+        | Specimen names are stored as labels, units and the step unit are set to the units of the table.
+
+        :type infile: string
+        :type ragged: bool
+
+        :param infile: full path to input file
+        :param ragged: store the steps of every specimen without padding, see load_data (default: False)
+
+        :returns: unit of the steps, mT or C
+        :rtype: string
+        """
+        data, labels, units, step_unit = read_measurements(infile)
+
+        if ragged:
+            self.set_ragged(*ragged_rows(data))
+        else:
+            self.__set_grid(*grid_rows(data))
+        self.__set_labels(labels, None)
+        self.__header = []
+        self.__sources = None
+        self.__units = units
+        self.__step_unit = step_unit
+        return step_unit
+
+    def set_ragged(self, ragged: dict, report: dict=None):
+        """
+        | Sets data of samples with individual steps, see ragged_rows.
+        | get_steps returns the steps of all samples, grid getters like get_vectors pad missing steps of the requested samples with NaN.
+
+        :type ragged: dictionary
+        :type report: dictionary
+
+        :param ragged: dictionary with the following keys: samples, offsets, steps, vectors
+        :param report: validation report, see grid_rows
+        """
+        self.__ragged = ragged
+        self.__samples = ragged["samples"]
+        self.__steps = np.unique(ragged["steps"])
+        self.__data = None
+        self.__diff = None
+        self.__index = None
+        self.__report = report
+        self.__labels = None
+        self.__depth = False
+        self.__lookup = None
+        self.__sources = None
+        self.__step_unit = None
+
+    def is_ragged(self) -> bool:
+        """
+        Returns whether samples have individual steps, see set_ragged
+
+        :returns: ragged state
+        :rtype: bool
+        """
+        return self.__ragged is not None
+
+    def get_ragged(self) -> dict:
+        """
+        | Returns the measured steps of all samples without padding, see ragged_rows.
+        | Grid data is converted on every call, steps with NaN vectors are left out.
+
+        :returns: dictionary with the following keys: samples, offsets, steps, vectors
+        :rtype: dictionary
+        """
+        if self.__ragged is not None:
+            return self.__ragged
+
+        A = self.get_vectors()
+        valid = np.all(np.isfinite(A), axis = 2)
+        return {
+            "samples": self.get_samples(),
+            "offsets": np.concatenate([[0], np.cumsum(valid.sum(axis = 1))]),
+            "steps": np.broadcast_to(self.get_steps(), valid.shape)[valid],
+            "vectors": A[valid],
+        }
+
+    def load_index(self, infile: str, sep: str, skip_header: int=0, cache_size: int=256, columns: list=None):
+        """
+        | Loads a data file lazily, the file is scanned once for the byte offsets of all samples.
+        | Samples are parsed when requested and kept in a cache, see get_data and get_vectors.
+        | Getters of the whole data set, e.g. get_vectors without rows, parse the complete file once.
+
+        :type infile: string
+        :type sep: string
+        :type skip_header: integer
+        :type cache_size: integer
+        :type columns: list
+
+        :param infile: full path to input file
+        :param sep: file delimiter
+        :param skip_header: header lines to skip
+        :param cache_size: maximum number of parsed samples kept in memory
+        :param columns: column mapping, see load_data, ids of a mapping with depth are read as labels (default: all columns)
+        """
+        # Byte offsets need an uncompressed file
+        if is_compressed(infile) or len(archive_members(infile)) > 1:
+            raise ValueError("Compressed files cannot be loaded lazily")
+
+        # Whitespace delimiters split the id at any whitespace
+        split = sep.encode() if sep.strip() not in ("", "\\s+") else None
+        usecols = None if columns is None else _column_indices(infile, sep, columns)
+        column = 0 if usecols is None else usecols[0]
+
+        # Files with six columns hold a depth after the id, as in _read_rows
+        depth_column = None
+        if len(_first_row(infile, sep, skip_header) if usecols is None else usecols) == 6:
+            depth_column = 1 if usecols is None else usecols[1]
+
+        offsets = []
+        samples = []
+        depths = []
+        counts = []
+        offset = 0
+        with open(infile, "rb") as fin:
+            for n in range(skip_header):
+                line = fin.readline()
+                if n == 0:
+                    header = line.decode(errors = "replace")
+                offset += len(line)
+
+            # Rows of a sample are contiguous, a new id starts a new block
+            last = None
+            for line in fin:
+                fields = line.split(split, column + 1)
+                sample = fields[column].strip() if len(fields) > column else b""
+                if sample and sample != last:
+                    offsets.append(offset)
+                    samples.append(sample)
+                    counts.append(0)
+                    last = sample
+                    if depth_column is not None:
+                        fields = line.split(split)
+                        depths.append(_float(fields[depth_column]) if len(fields) > depth_column else np.nan)
+                if sample:
+                    counts[-1] += 1
+                offset += len(line)
+        offsets.append(offset)
+
+        if len(samples) == 0:
+            raise ValueError("No samples in input file")
+        if min(counts) != max(counts):
+            raise ValueError("All samples need to have the same number of steps")
+
+        self.__header = header.split(sep) if skip_header > 0 else []
+        self.__data = None
+        self.__diff = None
+        self.__ragged = None
+        self.__report = None
+        self.__lookup = None
+        self.__sources = None
+        self.__step_unit = None
+        self.__index = {
+            "infile": infile,
+            "sep": sep,
+            "skip_header": skip_header,
+            "usecols": usecols,
+            "offsets": np.asarray(offsets, dtype = np.int64),
+            "blocks": P1LRUCache(cache_size),
+            "lock": threading.Lock(),
+        }
+
+        self.__samples = np.asarray([_float(x) for x in samples])
+        self.__labels = None
+        self.__depth = depth_column is not None
+        if np.isnan(self.__samples).any() or self.__depth:
+            if np.isnan(self.__samples).any():
+                self.__labels = np.asarray([x.decode(errors = "replace") for x in samples])
+            else:
+                self.__labels = np.asarray(["{0:g}".format(x) for x in self.__samples.tolist()])
+            self.__samples = np.asarray(depths) if self.__depth else np.arange(len(samples), dtype = float)
+        self.__steps = self.__read(0, 1)[0, :, 1]
+
+    def is_lazy(self) -> bool:
+        """
+        Returns whether samples are parsed on demand, see load_index
+
+        :returns: lazy state
+        :rtype: bool
+        """
+        return self.__index is not None and self.__data is None
 
     def set_volume(self, volume: float=10.0):
         """
@@ -62,6 +396,15 @@ class P1DataObject(object):
         """
         self.__units = units
 
+    def set_step_unit(self, unit: str):
+        """
+        Set unit of the steps
+
+        :type unit: string
+        :param unit: step unit (mT, C) or None if unknown
+        """
+        self.__step_unit = unit
+
     def set_header(self, new_header: list):
         """
         Set data header
@@ -77,9 +420,36 @@ class P1DataObject(object):
         """
         return self.__units
 
+    def get_step_unit(self) -> str:
+        """
+        Returns the unit of the steps, e.g. of a MagIC file, or None if unknown
+        """
+        return self.__step_unit
+
     def get_header(self) -> list:
         return self.__header
 
+    def get_report(self) -> dict:
+        """
+        Returns the validation report of the last file read, see grid_rows
+
+        :returns: report or None if the data was read from a cache or lazily
+        :rtype: dictionary
+        """
+        return self.__report
+
+    def get_sources(self) -> np.ndarray:
+        """
+        Returns the file every sample was read from, see load_files
+
+        :returns: full path to the input file of every sample or None if a single file was loaded
+        :rtype: numpy.ndarray
+        """
+        if self.__sources is None:
+            return None
+        infiles, sources = self.__sources
+        return np.asarray(infiles)[sources]
+
     def get_volume(self):
         """
         Returns sample volume
@@ -99,11 +469,60 @@ class P1DataObject(object):
         """
         Returns a list of all samples
 
-        :returns: sample list
+        :returns: sample list, depths or codes if samples have labels
         :rtype: numpy.ndarray
         """
         return self.__samples
 
+    def get_labels(self) -> np.ndarray:
+        """
+        Returns the labels of all samples, e.g. core sections
+
+        :returns: label of every sample or None if sample ids are numbers
+        :rtype: numpy.ndarray
+        """
+        return self.__labels
+
+    def has_depth(self) -> bool:
+        """
+        Returns whether samples of labelled data are depths or ids read from the file, otherwise they are codes
+
+        :rtype: bool
+        """
+        return self.__depth
+
+    def get_sample_names(self) -> list:
+        """
+        Returns the names of all samples as shown to the user and accepted by get_data
+
+        :returns: labels or sample ids as strings
+        :rtype: list
+        """
+        if self.__labels is not None:
+            return self.__labels.tolist()
+        return [str(x) for x in self.__samples.tolist()]
+
+    def get_row_labels(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns the labels of rows of the raw data, see get_raw_data
+
+        :type start: integer
+        :type stop: integer
+
+        :param start: first row
+        :param stop: row after the last row
+
+        :returns: labels or None if sample ids are numbers
+        :rtype: numpy.ndarray
+        """
+        if self.__labels is None:
+            return None
+
+        rows = np.arange(start, stop)
+        if self.__ragged is not None:
+            return self.__labels[np.searchsorted(self.__ragged["offsets"], rows, side = "right") - 1]
+        return self.__labels[rows // self.colCount()]
+
     def get_data(self, sample) -> np.ndarray:
         """
         Returns data for specified sample
@@ -114,8 +533,57 @@ class P1DataObject(object):
         :returns: array with data
         :rtype: numpy.ndarray
         """
-        samples = [str(x) for x in self.get_samples()]
-        return self.__data[samples.index(str(sample)), :, 2:]
+        if self.__lookup is None:
+            self.__lookup = {name: n for n, name in reversed(list(enumerate(self.get_sample_names())))}
+        try:
+            n = self.__lookup[str(sample)]
+        except KeyError:
+            raise ValueError("{0} is not a sample".format(sample))
+
+        return self.get_vectors(slice(n, n + 1))[0]
+
+    def get_vectors(self, rows: slice=None) -> np.ndarray:
+        """
+        Returns the (x, y, z) vectors of all samples
+
+        :type rows: slice
+        :param rows: samples to return, only these are parsed if loaded lazily (default: all samples)
+
+        :returns: view of the data with samples in the first, steps in the second and (x, y, z) in the third dimension, a padded copy for samples with individual steps
+        :rtype: numpy.ndarray
+        """
+        if self.is_lazy():
+            if rows is None:
+                self.__materialize()
+            else:
+                start, stop, _ = rows.indices(self.rowCount())
+                return self.__blocks(start, stop)[:, :, 2:]
+        elif self.__ragged is not None:
+            # Only the requested samples are padded, the padded grid is not kept
+            return self.__pad(np.arange(self.rowCount())[rows if rows is not None else slice(None)])[:, :, 2:]
+
+        if rows is None:
+            return self.__data[:, :, 2:]
+        return self.__data[rows, :, 2:]
+
+    def get_difference_vectors(self) -> np.ndarray:
+        """
+        | Returns the difference vectors of all samples, i.e. the vector removed between two consecutive steps.
+        | The last step of every sample has no successor and is set to NaN.
+        | The result is computed once and cached until new data is loaded.
+
+        :returns: read-only array with samples in the first, steps in the second and (x, y, z) in the third dimension
+        :rtype: numpy.ndarray
+        """
+        if self.__diff is None:
+            A = self.get_vectors()
+            diff = np.empty(A.shape)
+            np.subtract(A[:, :-1], A[:, 1:], out = diff[:, :-1])
+            diff[:, -1] = np.nan
+            diff.flags.writeable = False
+            self.__diff = diff
+
+        return self.__diff
 
     def get_raw_data(self) -> np.ndarray:
         """
@@ -124,8 +592,49 @@ class P1DataObject(object):
         :returns: raw data
         :rtype: numpy.ndarray
         """
+        if self.is_lazy():
+            self.__materialize()
+        elif self.__ragged is not None:
+            # Rows as read, without padding
+            counts = np.diff(self.__ragged["offsets"])
+            return np.column_stack([np.repeat(self.__samples, counts), self.__ragged["steps"], self.__ragged["vectors"]])
         return self.__data.reshape(self.__data.shape[0] * self.__data.shape[1], self.__data.shape[2])
 
+    def get_raw_rows(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns rows of the raw data, see get_raw_data, only the samples of these rows are parsed if loaded lazily
+
+        :type start: integer
+        :type stop: integer
+
+        :param start: first row
+        :param stop: row after the last row
+
+        :returns: raw data rows
+        :rtype: numpy.ndarray
+        """
+        stop = min(stop, self.rawRowCount())
+        start = min(start, stop)
+        if self.is_lazy():
+            first = start // self.colCount()
+            data = self.__blocks(first, -(-stop // self.colCount())).reshape(-1, 5)
+            return data[start - first * self.colCount():stop - first * self.colCount()]
+        elif self.__ragged is not None:
+            rows = np.searchsorted(self.__ragged["offsets"], np.arange(start, stop), side = "right") - 1
+            return np.column_stack([self.__samples[rows], self.__ragged["steps"][start:stop], self.__ragged["vectors"][start:stop]])
+        return self.get_raw_data()[start:stop]
+
+    def rawRowCount(self) -> int:
+        """
+        Returns row count of the raw data, see get_raw_data
+
+        :returns: number of rows
+        :rtype: integer
+        """
+        if self.__ragged is not None:
+            return int(self.__ragged["offsets"][-1])
+        return self.rowCount() * self.colCount()
+
     def rowCount(self) -> int:
         """
         Returns sample count
@@ -143,3 +652,443 @@ class P1DataObject(object):
         :rtype: integer
         """
         return len(self.__steps)
+
+    def __blocks(self, start: int, stop: int) -> np.ndarray:
+        # Cached samples are reused, a range with missing samples is parsed in one read
+        blocks = self.__index["blocks"]
+        with self.__index["lock"]:
+            cached = [blocks.get(n) for n in range(start, stop)]
+        if all(x is not None for x in cached):
+            return np.stack(cached) if len(cached) > 0 else np.empty((0, self.colCount(), 5))
+
+        data = self.__read(start, stop)
+        if stop - start <= blocks.maxsize:
+            with self.__index["lock"]:
+                for n in range(start, stop):
+                    blocks.put(n, data[n - start])
+        return data
+
+    def __read(self, start: int, stop: int) -> np.ndarray:
+        offsets = self.__index["offsets"]
+        with open(self.__index["infile"], "rb") as fin:
+            fin.seek(offsets[start])
+            buffer = fin.read(offsets[stop] - offsets[start])
+
+        data = np.atleast_2d(np.genfromtxt(io.BytesIO(buffer), delimiter = _splitter(self.__index["sep"]), usecols = self.__index["usecols"]))
+        data = data.reshape(stop - start, -1, data.shape[-1])
+        if self.__labels is not None:
+            # Labels are not numbers, samples are their codes
+            data = data[:, :, -5:]
+            data[:, :, 0] = self.__samples[start:stop, None]
+        return data
+
+    def __set_grid(self, data: np.ndarray, report: dict):
+        self.__data = data
+        self.__samples = data[:, 0, 0]
+        self.__steps = data[0, :, 1]
+        self.__diff = None
+        self.__index = None
+        self.__report = report
+        self.__ragged = None
+
+    def __set_labels(self, labels: np.ndarray, depth: np.ndarray):
+        # Samples of labelled files are codes into the label and depth tables
+        self.__labels = None
+        self.__depth = depth is not None
+        self.__lookup = None
+        if labels is None and depth is None:
+            return
+
+        codes = self.__samples.astype(int)
+        if labels is not None:
+            self.__labels = labels[codes]
+        if self.__report is not None:
+            self.__report["incomplete"] = (labels if labels is not None else depth)[self.__report["incomplete"].astype(int)]
+
+        if depth is not None:
+            samples = depth[codes]
+            if self.__ragged is not None:
+                self.__ragged["samples"] = samples
+                self.__samples = samples
+            else:
+                self.__data[:, :, 0] = samples[:, None]
+                self.__samples = self.__data[:, 0, 0]
+
+    def __pad(self, rows: np.ndarray) -> np.ndarray:
+        # Ragged samples of the given rows on the common step grid
+        offsets = self.__ragged["offsets"]
+        counts = offsets[rows + 1] - offsets[rows]
+        index = np.repeat(offsets[rows] - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+
+        data = np.full((len(rows), self.colCount(), 5), np.nan)
+        data[:, :, 0] = self.__samples[rows, None]
+        data[:, :, 1] = self.__steps
+        data[np.repeat(np.arange(len(rows)), counts), np.searchsorted(self.__steps, self.__ragged["steps"][index]), 2:] = self.__ragged["vectors"][index]
+        return data
+
+    def __materialize(self):
+        # Parsing the file as a whole is faster than sample by sample
+        self.__data = self.__read(0, self.rowCount())
+        self.__index["blocks"].clear()
+
+
+def grid_rows(data: np.ndarray) -> (np.ndarray, dict):
+    """
+    | Places measurement rows on a common (sample, step) grid, rows may be in any order.
+    | Samples keep the order of their first row, steps are sorted ascending.
+    | Missing steps are filled with NaN, of duplicated steps the last row is kept.
+    | Rows without a valid sample id or step are dropped.
+    | 
+    | Report keys:
+    |   rows: number of rows read.
+    |   samples: number of samples.
+    |   steps: number of steps.
+    |   sorted: rows were ordered by sample and step.
+    |   dropped: rows without a valid sample id or step.
+    |   duplicates: rows replaced by a later row of the same sample and step.
+    |   missing: missing (sample, step) measurements, filled with NaN.
+    |   incomplete: sample ids with missing steps.
+    |   ragged: rows are stored per sample, see ragged_rows.
+
+    :type data: numpy.ndarray
+    :param data: matrix with the columns SampleID/Depth, step, x, y, z and observations in rows
+
+    :returns: array with samples in the first, steps in the second and columns in the third dimension, and the report
+    :rtype: tuple
+    """
+    rows, samples, steps, cell, order, report = _group_rows(data)
+
+    grid = np.full((len(samples) * len(steps), rows.shape[1]), np.nan)
+    grid[cell] = rows[order]
+    grid[:, 0] = np.repeat(samples, len(steps))
+    grid[:, 1] = np.tile(steps, len(samples))
+
+    return grid.reshape(len(samples), len(steps), rows.shape[1]), report
+
+def ragged_rows(data: np.ndarray) -> (dict, dict):
+    """
+    | Groups measurement rows by sample without padding, every sample keeps its own steps (CSR layout).
+    | Rows of sample n are offsets[n] to offsets[n + 1], sorted by step. Rows are cleaned as in grid_rows.
+    | 
+    | Dictionary keys:
+    |   samples: vector of SampleID/Depth.
+    |   offsets: vector of row offsets, one more than samples.
+    |   steps: vector of the steps of all rows.
+    |   vectors: matrix of the (x, y, z) vectors of all rows.
+
+    :type data: numpy.ndarray
+    :param data: matrix with the columns SampleID/Depth, step, x, y, z and observations in rows
+
+    :returns: dictionary with the following keys: samples, offsets, steps, vectors, and the report, see grid_rows
+    :rtype: tuple
+    """
+    rows, samples, steps, cell, order, report = _group_rows(data)
+
+    # Steps of a sample are only missing relative to other protocols
+    report["ragged"] = True
+    counts = np.bincount(cell // len(steps), minlength = len(samples))
+
+    ragged = {
+        "samples": samples,
+        "offsets": np.concatenate([[0], np.cumsum(counts)]),
+        "steps": rows[order, 1],
+        "vectors": np.ascontiguousarray(rows[order, 2:5]),
+    }
+
+    return ragged, report
+
+def _group_rows(data: np.ndarray) -> tuple:
+    # Sorted unique (sample, step) cells of the valid rows and the validation report
+    data = np.atleast_2d(data)
+    valid = np.isfinite(data[:, 0]) & np.isfinite(data[:, 1])
+    rows = data[valid]
+    if rows.shape[0] == 0:
+        raise ValueError("No valid rows in input file")
+
+    # Sample order of appearance
+    samples, first, sample_index = np.unique(rows[:, 0], return_index = True, return_inverse = True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    samples = samples[order]
+    sample_index = rank[sample_index.ravel()]
+
+    steps, step_index = np.unique(rows[:, 1], return_inverse = True)
+    step_index = step_index.ravel()
+
+    # Grouping by cell, the stable sort keeps the file order of duplicates
+    cell = sample_index * len(steps) + step_index
+    order = np.argsort(cell, kind = "stable")
+    cell = cell[order]
+    last = np.append(cell[1:] != cell[:-1], True)
+
+    filled = np.zeros(len(samples) * len(steps), dtype = bool)
+    filled[cell[last]] = True
+    filled = filled.reshape(len(samples), len(steps))
+
+    report = {
+        "rows": data.shape[0],
+        "samples": len(samples),
+        "steps": len(steps),
+        "sorted": bool(np.all(np.diff(sample_index * len(steps) + step_index) > 0)),
+        "dropped": int(np.count_nonzero(~valid)),
+        "duplicates": int(np.count_nonzero(~last)),
+        "missing": int(np.count_nonzero(~filled)),
+        "incomplete": samples[~filled.all(axis = 1)],
+        "ragged": False,
+    }
+
+    return rows, samples, steps, cell[last], order[last], report
+
+def format_report(report: dict, limit: int=10) -> str:
+    """
+    Returns a readable summary of a validation report, see grid_rows
+
+    :type report: dictionary
+    :type limit: integer
+
+    :param report: validation report
+    :param limit: maximum number of listed samples
+
+    :returns: summary, empty if the file was a complete and sorted grid
+    :rtype: string
+    """
+    if report is None:
+        return ""
+
+    lines = []
+    if report["dropped"] > 0:
+        lines.append("{0} rows without a valid sample id or step were skipped.".format(report["dropped"]))
+    if report["duplicates"] > 0:
+        lines.append("{0} duplicated measurements were replaced by the last one.".format(report["duplicates"]))
+    if report["missing"] > 0 and not report["ragged"]:
+        incomplete = [str(x) for x in report["incomplete"][:limit]]
+        if len(report["incomplete"]) > limit:
+            incomplete.append("...")
+        lines.append("{0} measurements of {1} samples are missing and set to NaN: {2}".format(report["missing"], len(report["incomplete"]), ", ".join(incomplete)))
+    if not report["sorted"] and len(lines) == 0:
+        lines.append("Rows were not ordered by sample and step and have been sorted.")
+    return "\n".join(lines)
+
+def _read_file(infile: str, sep: str, skip_header: int, cache, columns: list) -> tuple:
+    # Rows, labels and depth of a single file, run in worker processes by load_files
+    if cache is not None and not _has_labels(infile, sep, skip_header, columns):
+        data = cache.load(infile, sep, skip_header, columns)
+        if data is not None:
+            # Cached grids are padded, missing steps are not rows of the file
+            data = data.reshape(-1, data.shape[-1])
+            return np.array(data[np.isfinite(data[:, 2:]).all(axis = 1)]), None, None
+
+    data, labels, depth = _read_rows(infile, sep, skip_header, columns = columns)
+    if cache is not None and labels is None:
+        cache.store(infile, grid_rows(data)[0], sep, skip_header, columns)
+    return data, labels, depth
+
+def _merge_files(infiles: list, files: list) -> tuple:
+    """
+    | Merges the rows of several files, samples are numbered across all files in order of the files.
+    | Ids found in several files are prefixed with the file name.
+
+    :returns: rows with sample codes, labels or None if all ids are unique numbers, id or depth and file index of every code
+    :rtype: tuple
+    """
+    rows = []
+    names = []
+    samples = []
+    sources = []
+    labelled = False
+    offset = 0
+    for n, (data, labels, depth) in enumerate(files):
+        data = data.copy()
+        valid = np.isfinite(data[:, 0])
+        ids = data[valid, 0]
+
+        # Codes of labelled files are numbered already, ids are numbered by first appearance
+        if labels is not None:
+            labelled = True
+            codes = ids.astype(int)
+            values = depth if depth is not None else np.full(len(labels), np.nan)
+            file_names = labels.tolist()
+        else:
+            values, first, codes = np.unique(ids, return_index = True, return_inverse = True)
+            order = np.argsort(first)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            codes = rank[codes.ravel()]
+            values = values[order]
+            file_names = [str(x) for x in values.tolist()]
+
+        data[valid, 0] = codes + offset
+        data[~valid, 0] = np.nan
+        rows.append(data)
+        names.extend(file_names)
+        samples.append(values)
+        sources.append(np.full(len(values), n))
+        offset += len(values)
+
+    data = np.concatenate(rows)
+    samples = np.concatenate(samples)
+    sources = np.concatenate(sources)
+
+    # Samples without a number keep their code
+    missing = np.isnan(samples)
+    samples[missing] = np.flatnonzero(missing)
+
+    unique, counts = np.unique(names, return_counts = True)
+    duplicated = np.isin(names, unique[counts > 1])
+    if not labelled and not duplicated.any():
+        return data, None, samples, sources
+
+    for n in np.flatnonzero(duplicated):
+        names[n] = "{0}:{1}".format(os.path.basename(infiles[sources[n]]), names[n])
+    return data, np.asarray(names), samples, sources
+
+def _update_progress(pbar, done: int, total: int) -> bool:
+    # Returns False if the progress bar was canceled
+    if pbar != None:
+        new_value = int(100 * done / total)
+        if new_value > pbar.progress.value():
+            pbar.progress.setValue(new_value)
+        QApplication.processEvents()
+        return not getattr(pbar, "canceled", False)
+    return True
+
+def _splitter(sep: str):
+    # Whitespace delimiters split at any whitespace
+    return sep if sep.strip() not in ("", "\\s+") else None
+
+def _has_labels(infile: str, sep: str, skip_header: int, columns: list=None) -> bool:
+    # Sample id of the first data row is not a number
+    column = 0 if columns is None else _column_indices(infile, sep, columns)[0]
+    fields = _first_row(infile, sep, skip_header)
+    return len(fields) > column and len(fields[column]) > 0 and np.isnan(_float(fields[column]))
+
+def _first_row(infile: str, sep: str, skip_header: int) -> list:
+    # Fields of the first data row
+    with open_file(infile, "rt", errors = "replace") as fin:
+        for n, line in enumerate(fin):
+            if n < skip_header or not line.strip() or line.startswith("#"):
+                continue
+            return [x.strip() for x in line.split(_splitter(sep))]
+    return []
+
+def _column_indices(infile: str, sep: str, columns: list) -> list:
+    """
+    | Resolves a column mapping to column indices, names are looked up in the first line of the file.
+    | A mapping lists the columns SampleID, step, x, y, z or SampleID, depth, step, x, y, z.
+
+    :type infile: string
+    :type sep: string
+    :type columns: list
+
+    :param infile: full path to input file
+    :param sep: file delimiter
+    :param columns: column indices or header names
+
+    :returns: column indices
+    :rtype: list
+    """
+    if len(columns) not in (5, 6):
+        raise ValueError("Columns need to map SampleID, step, x, y, z and an optional depth")
+
+    header = None
+    indices = []
+    for column in columns:
+        if isinstance(column, str) and not column.strip().isdigit():
+            if header is None:
+                with open_file(infile, "rt", errors = "replace") as fin:
+                    header = [x.strip().strip("\"'") for x in fin.readline().split(_splitter(sep))]
+            if column.strip() not in header:
+                raise ValueError("Column {0} not in file header".format(column))
+            indices.append(header.index(column.strip()))
+        else:
+            indices.append(int(column))
+    return indices
+
+def _parse(infile: str, sep: str, skip_header: int=0, max_rows: int=None, usecols: list=None) -> np.ndarray:
+    # loadtxt converts only the used columns and is faster, genfromtxt reads missing and invalid values as NaN
+    delimiter = None if sep == "\\s+" else sep
+    try:
+        with open_file(infile, "rt", errors = "replace") as fin:
+            return np.loadtxt(fin, delimiter = delimiter, skiprows = skip_header, max_rows = max_rows, usecols = usecols, ndmin = 2)
+    except ValueError:
+        pass
+
+    with open_file(infile, "rt", errors = "replace") as fin:
+        return np.atleast_2d(np.genfromtxt(fin, delimiter = delimiter, skip_header = skip_header, max_rows = max_rows, usecols = usecols))
+
+def _read_rows(infile: str, sep: str, skip_header: int=0, max_rows: int=None, columns: list=None) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    | Reads the rows of a data file, sample ids that are not numbers are replaced by integer codes.
+    | Codes number the samples in order of appearance and index the returned labels.
+    | With a depth column the ids are labels and depth is the sample value, see _column_indices.
+
+    :type infile: string
+    :type sep: string
+    :type skip_header: integer
+    :type max_rows: integer
+    :type columns: list
+
+    :param infile: full path to input file
+    :param sep: file delimiter
+    :param skip_header: header lines to skip
+    :param max_rows: read only the first rows
+    :param columns: column indices or header names, only these columns are parsed (default: all columns in file order)
+
+    :returns: matrix with the columns SampleID/Depth, step, x, y, z, the unique labels and the depth of every row, labels and depth are None if not in the file
+    :rtype: tuple
+    """
+    usecols = None if columns is None else _column_indices(infile, sep, columns)
+    fields = _first_row(infile, sep, skip_header)
+    column = 0 if usecols is None else usecols[0]
+    labelled = len(fields) > column and len(fields[column]) > 0 and np.isnan(_float(fields[column]))
+    if not labelled and len(fields if usecols is None else usecols) != 6:
+        return _parse(infile, sep, skip_header, max_rows, usecols), None, None
+
+    if usecols is None:
+        usecols = list(range(len(fields)))
+
+    if labelled:
+        # Ids are split off in a single pass, the numeric columns are parsed as usual
+        split = _splitter(sep)
+        ids = []
+        with open_file(infile, "rt", errors = "replace") as fin:
+            for n, line in enumerate(fin):
+                if n < skip_header or not line.strip() or line.startswith("#"):
+                    continue
+                if max_rows is not None and len(ids) == max_rows:
+                    break
+                ids.append(line.split(split)[column].strip() if column > 0 else line.split(split, 1)[0].strip())
+        ids = np.asarray(ids)
+        values = _parse(infile, sep, skip_header, max_rows, usecols[1:])
+        valid = np.ones(len(ids), dtype = bool)
+    else:
+        values = _parse(infile, sep, skip_header, max_rows, usecols)
+        ids = values[:, 0]
+        values = values[:, 1:]
+        valid = np.isfinite(ids)
+    if values.shape[0] != len(ids):
+        raise ValueError("Rows with sample ids and values do not match")
+
+    labels, first, codes = np.unique(ids[valid], return_index = True, return_inverse = True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    data = np.full((len(ids), 5), np.nan)
+    data[valid, 0] = rank[codes.ravel()]
+    data[:, 1:] = values[:, -4:]
+    depth = None
+    if values.shape[1] > 4:
+        depth = values[valid, 0][first[order]]
+
+    labels = labels[order]
+    if not labelled:
+        labels = np.asarray(["{0:g}".format(x) for x in labels.tolist()])
+    return data, labels, depth
+
+def _float(value: bytes) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
@@ -0,0 +1,398 @@
+# Imports
+import math
+import numpy as np
+
+
+class P1PCAWorkspace(object):
+    """
+    Reusable buffers for the single window pca kernel.
+    """
+    def __init__(self, rows: int=32):
+        """
+        Allocates the moment buffers.
+
+        :type rows: integer
+        :param rows: initial maximum number of observations per window, grows on demand (default: 32)
+        """
+        self.S1 = np.empty(3)
+        self.S2 = np.empty((3, 3))
+        self.ones = np.ones(rows)
+        self.M = np.empty((rows, 3))
+
+    def reserve(self, rows: int):
+        """
+        Makes sure windows of the given number of observations fit into the workspace.
+
+        :type rows: integer
+        :param rows: number of observations
+        """
+        if rows > len(self.ones):
+            self.ones = np.ones(rows)
+            self.M = np.empty((rows, 3))
+
+
+class P1IntervalPCA(object):
+    """
+    | Low-latency principal component analysis (PCA) of arbitrary step intervals of a data set.
+    | Every interval is solved from its own steps with ppca_kernel in reused buffers, no moments are cached.
+    """
+    def __init__(self, data, anchor: bool=False, origin: bool=False):
+        """
+        Initializes the workspace.
+
+        :type data: P1DataObject
+        :type anchor: bool
+        :type origin: bool
+
+        :param data: data container
+        :param anchor: anchor pca
+        :param origin: include origin
+        """
+        self.__data = data
+        self.__anchor = anchor
+        self.__origin = origin
+        self.__ws = P1PCAWorkspace()
+
+    def set_options(self, anchor: bool=False, origin: bool=False):
+        """
+        Sets the pca options.
+
+        :type anchor: bool
+        :type origin: bool
+
+        :param anchor: anchor pca
+        :param origin: include origin
+        """
+        self.__anchor = anchor
+        self.__origin = origin
+
+    def fit(self, n: int, first: int, last: int, out: np.ndarray) -> np.ndarray:
+        """
+        Runs the pca on the steps first to last (inclusive) of sample n.
+
+        :type n: integer
+        :type first: integer
+        :type last: integer
+        :type out: numpy.ndarray
+
+        :param n: row index of the sample
+        :param first: index of the first step
+        :param last: index of the last step
+        :param out: output vector of length 4, see ppca_kernel
+
+        :returns: out
+        :rtype: numpy.ndarray
+        """
+        # Moments of the interval itself, differences of cumulative sums lose precision after strong overprints
+        A = self.__data.get_vectors(slice(n, n + 1))[0]
+        return ppca_kernel(A[first:last + 1], out, self.__ws, self.__anchor, self.__origin)
+
+
+def window_moments(A: np.ndarray, window: int, origin: bool=False) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    | Calculates the moments of all windows of a given length along the steps of every sample.
+    | Every window is summed directly and centered on its own mean, windows after a strong overprint keep their precision.
+    | With origin a zero row is appended to every window as in P1Backend.ppca, it is part of the sums and of the mean.
+
+    :type A: numpy.ndarray
+    :type window: integer
+    :type origin: bool
+
+    :param A: data array with samples in the first, steps in the second and (x, y, z) in the third dimension
+    :param window: number of steps per window
+    :param origin: include origin (default: False)
+
+    :returns: sums of the vectors (samples, windows, 3), of their outer products (samples, windows, 3, 3) and of the outer products of the centered vectors (samples, windows, 3, 3)
+    :rtype: tuple
+    """
+    W = A[:, np.arange(A.shape[1] - window + 1)[:, None] + np.arange(window), :]
+    if origin:
+        W = np.concatenate([W, np.zeros(W.shape[:2] + (1, 3))], axis = 2)
+    S1 = W.sum(axis = 2)
+    S2 = outer_sums(W)
+    M2 = outer_sums(W - S1[:, :, None, :] / W.shape[2])
+
+    return S1, S2, M2
+
+
+def outer_sums(D: np.ndarray) -> np.ndarray:
+    """
+    | Sums the outer products of the rows of stacked matrices.
+    | Every entry is summed along a contiguous axis like np.sum in P1Backend.calc_OTensor, so the tensors equal those of ppca to the last bit.
+    | Ill-conditioned windows, e.g. of a strong overprint, then get the same eigenvalues in ppca and in the batched pca.
+
+    :type D: numpy.ndarray
+    :param D: data array with rows in the second to last and (x, y, z) in the last dimension
+
+    :returns: sums of the outer products (..., 3, 3)
+    :rtype: numpy.ndarray
+    """
+    Dt = np.ascontiguousarray(np.moveaxis(D, -2, -1))
+    S = np.empty(D.shape[:-2] + (3, 3))
+    for i in range(3):
+        for j in range(i, 3):
+            S[..., i, j] = S[..., j, i] = np.sum(Dt[..., i, :] * Dt[..., j, :], axis = -1)
+
+    return S
+
+
+def ppca_kernel(indata: np.ndarray, out: np.ndarray, ws: P1PCAWorkspace, anchor: bool=False, origin: bool=False, evals: np.ndarray=None, evecs: np.ndarray=None, scores: np.ndarray=None, variance: np.ndarray=None) -> np.ndarray:
+    """
+    | Low-level principal component analysis (PCA) of a single window writing into caller-supplied buffers.
+    | Results are equivalent to P1Backend.ppca, the optional outputs are only calculated if a buffer is given.
+    |
+    | Output vector entries:
+    |   0: Inclination.
+    |   1: Declination.
+    |   2: MADp: medium angular deviation, prolate.
+    |   3: MADo: medium angular deviation, oblate.
+
+    :type indata: numpy.ndarray
+    :type out: numpy.ndarray
+    :type ws: P1PCAWorkspace
+    :type anchor: bool
+    :type origin: bool
+    :type evals: numpy.ndarray
+    :type evecs: numpy.ndarray
+    :type scores: numpy.ndarray
+    :type variance: numpy.ndarray
+
+    :param indata: data matrix with variables (x, y, z) in columns and observations in rows, converted to float64 if needed
+    :param out: output vector of length 4
+    :param ws: workspace, can be reused for every call
+    :param anchor: anchor pca
+    :param origin: include origin
+    :param evals: optional output vector (3) of eigenvalues in decending order
+    :param evecs: optional output matrix (3, 3) of eigenvectors in columns
+    :param scores: optional output matrix (3, 3) of the left singular vectors scaled by the eigenvalues, as in P1Backend.ppca
+    :param variance: optional output vector (3) of the variance explained by the components
+
+    :returns: out
+    :rtype: numpy.ndarray
+    """
+    indata = np.asarray(indata, dtype = float)
+    n = indata.shape[0]
+    ws.reserve(n)
+    np.dot(ws.ones[:n], indata, out = ws.S1)
+
+    first = indata[0].tolist()
+    last = indata[-1].tolist()
+    trend = (last[0] - first[0], last[1] - first[1], last[2] - first[2])
+
+    if anchor:
+        np.dot(indata.T, indata, out = ws.S2)
+        s1x, s1y, s1z = ws.S1.tolist()
+    else:
+        # Centered on the window mean before the moments are summed, the origin becomes a row at minus the mean
+        ws.S1 /= n
+        M = np.subtract(indata, ws.S1, out = ws.M[:n])
+        np.dot(M.T, M, out = ws.S2)
+        s1x, s1y, s1z = 0.0, 0.0, 0.0
+        if origin:
+            mx, my, mz = ws.S1.tolist()
+            ws.S2 += np.multiply.outer(ws.S1, ws.S1)
+            s1x, s1y, s1z = -mx, -my, -mz
+            n, origin = n + 1, False
+
+    return ppca_moments_kernel(s1x, s1y, s1z, ws.S2, n, trend, out, anchor, origin, evals, evecs, scores, variance)
+
+
+def ppca_moments_kernel(s1x: float, s1y: float, s1z: float, S2: np.ndarray, n: int, trend: tuple, out: np.ndarray, anchor: bool=False, origin: bool=False, evals: np.ndarray=None, evecs: np.ndarray=None, scores: np.ndarray=None, variance: np.ndarray=None) -> np.ndarray:
+    """
+    Single window principal component analysis (PCA) from window moments, see ppca_kernel.
+
+    :type s1x: float
+    :type s1y: float
+    :type s1z: float
+    :type S2: numpy.ndarray
+    :type n: integer
+    :type trend: tuple
+    :type out: numpy.ndarray
+
+    :param s1x: sum of the x components
+    :param s1y: sum of the y components
+    :param s1z: sum of the z components
+    :param S2: sum of the outer products of the window vectors (3, 3), only the upper triangle is used
+    :param n: number of observations
+    :param trend: last minus first vector of the window, used to orient the eigenvectors
+    :param out: output vector of length 4
+
+    :returns: out
+    :rtype: numpy.ndarray
+    """
+    # Origin adds a zero row, which only changes the number of observations
+    if origin: n = n + 1
+
+    # Orientation tensor, centered if not anchored
+    (a00, a01, a02), (_, a11, a12), (_, _, a22) = S2.tolist()
+    a00 /= n
+    a01 /= n
+    a02 /= n
+    a11 /= n
+    a12 /= n
+    a22 /= n
+    if not anchor:
+        mx = s1x / n
+        my = s1y / n
+        mz = s1z / n
+        a00 -= mx * mx
+        a01 -= mx * my
+        a02 -= mx * mz
+        a11 -= my * my
+        a12 -= my * mz
+        a22 -= mz * mz
+
+    e, V = _eigh3(a00, a01, a02, a11, a12, a22)
+
+    if e is None:
+        out[:4] = np.nan
+        for buf in (evals, evecs, scores, variance):
+            if buf is not None:
+                buf[...] = np.nan
+        return out
+
+    # Point eigenvectors against the trend
+    V = [_orient(v, trend) for v in V]
+
+    # Largest eigenvector
+    x, y, z = V[0]
+    inc = math.degrees(math.atan2(z, math.sqrt(x * x + y * y)))
+    dec = 180 + math.degrees(math.atan2(y, x))
+
+    # MAD
+    madp = math.degrees(math.atan(math.sqrt((e[2] + e[1]) / e[0]))) if e[0] > 0 else math.nan
+    mado = math.degrees(math.atan(math.sqrt(e[2] / (e[1] + e[0])))) if e[0] + e[1] > 0 else math.nan
+
+    out[0], out[1], out[2], out[3] = inc, dec, madp, mado
+
+    # Optional outputs
+    if evals is not None:
+        evals[0], evals[1], evals[2] = e
+    if evecs is not None:
+        for column in range(3):
+            evecs[0, column], evecs[1, column], evecs[2, column] = V[column]
+    if scores is not None or variance is not None:
+        # Signs of the singular vectors are arbitrary, they are taken from the same SVD as in P1Backend.ppca
+        U, s, _ = np.linalg.svd(np.asarray([[a00, a01, a02], [a01, a11, a12], [a02, a12, a22]]))
+        r = U * s
+        if scores is not None:
+            scores[...] = r
+        if variance is not None:
+            var = r.std(axis = 1)**2
+            variance[...] = var / var.sum()
+
+    return out
+
+
+def _orient(v: tuple, trend: tuple) -> tuple:
+    """
+    Flips vector v if it points in the direction of trend.
+    """
+    if v[0] * trend[0] + v[1] * trend[1] + v[2] * trend[2] > 0:
+        return (-v[0], -v[1], -v[2])
+    return v
+
+
+def _eigh3(a00: float, a01: float, a02: float, a11: float, a12: float, a22: float) -> (tuple, list):
+    """
+    | Closed form eigen decomposition of a symmetric, positive semi-definite 3x3 matrix.
+    | Falls back to numpy for (nearly) degenerate eigenvalues.
+
+    :returns: eigenvalues in decending order and the corresponding unit eigenvectors, (None, None) for invalid input
+    :rtype: tuple
+    """
+    if not math.isfinite(a00 + a01 + a02 + a11 + a12 + a22):
+        return None, None
+
+    p1 = a01 * a01 + a02 * a02 + a12 * a12
+    q = (a00 + a11 + a22) / 3
+    p2 = (a00 - q)**2 + (a11 - q)**2 + (a22 - q)**2 + 2 * p1
+    p = math.sqrt(p2 / 6)
+
+    if p1 == 0 or p == 0:
+        return _eigh3_numpy(a00, a01, a02, a11, a12, a22)
+
+    # Largest eigenvalue from the trigonometric solution of the characteristic polynomial
+    b00 = (a00 - q) / p
+    b11 = (a11 - q) / p
+    b22 = (a22 - q) / p
+    b01 = a01 / p
+    b02 = a02 / p
+    b12 = a12 / p
+    r = (b00 * (b11 * b22 - b12 * b12) - b01 * (b01 * b22 - b12 * b02) + b02 * (b01 * b12 - b11 * b02)) / 2
+    r = min(max(r, -1.0), 1.0)
+    e0 = q + 2 * p * math.cos(math.acos(r) / 3)
+
+    v0 = _null_vector(a00 - e0, a01, a02, a11 - e0, a12, a22 - e0)
+    if v0 is None:
+        return _eigh3_numpy(a00, a01, a02, a11, a12, a22)
+
+    # The smaller eigenvalues are lost in the trigonometric solution of prolate matrices,
+    # they are solved in the plane normal to v0 instead
+    k = min(range(3), key = lambda i: abs(v0[i]))
+    u = [0.0, 0.0, 0.0]
+    u[k] = 1.0
+    u = (v0[1] * u[2] - v0[2] * u[1], v0[2] * u[0] - v0[0] * u[2], v0[0] * u[1] - v0[1] * u[0])
+    norm = math.sqrt(u[0] * u[0] + u[1] * u[1] + u[2] * u[2])
+    u = (u[0] / norm, u[1] / norm, u[2] / norm)
+    w = (v0[1] * u[2] - v0[2] * u[1], v0[2] * u[0] - v0[0] * u[2], v0[0] * u[1] - v0[1] * u[0])
+
+    mv0 = _product(a00, a01, a02, a11, a12, a22, v0)
+    mu = _product(a00, a01, a02, a11, a12, a22, u)
+    mw = _product(a00, a01, a02, a11, a12, a22, w)
+    e0 = v0[0] * mv0[0] + v0[1] * mv0[1] + v0[2] * mv0[2]
+    c00 = u[0] * mu[0] + u[1] * mu[1] + u[2] * mu[2]
+    c01 = u[0] * mw[0] + u[1] * mw[1] + u[2] * mw[2]
+    c11 = w[0] * mw[0] + w[1] * mw[1] + w[2] * mw[2]
+
+    h = math.hypot((c00 - c11) / 2, c01)
+    e1 = (c00 + c11) / 2 + h
+    e2 = (c00 + c11) / 2 - h
+
+    # The largest eigenvector needs a separated eigenvalue
+    if e0 - e1 < 1e-12 * e0:
+        return _eigh3_numpy(a00, a01, a02, a11, a12, a22)
+
+    theta = math.atan2(2 * c01, c00 - c11) / 2
+    c, s = math.cos(theta), math.sin(theta)
+    v1 = (c * u[0] + s * w[0], c * u[1] + s * w[1], c * u[2] + s * w[2])
+    v2 = (c * w[0] - s * u[0], c * w[1] - s * u[1], c * w[2] - s * u[2])
+
+    return (max(e0, 0.0), max(e1, 0.0), max(e2, 0.0)), [v0, v1, v2]
+
+
+def _product(a00: float, a01: float, a02: float, a11: float, a12: float, a22: float, v: tuple) -> tuple:
+    """
+    Product of a symmetric 3x3 matrix and vector v.
+    """
+    return (a00 * v[0] + a01 * v[1] + a02 * v[2], a01 * v[0] + a11 * v[1] + a12 * v[2], a02 * v[0] + a12 * v[1] + a22 * v[2])
+
+
+def _null_vector(m00: float, m01: float, m02: float, m11: float, m12: float, m22: float) -> tuple:
+    """
+    Unit vector spanning the null space of a symmetric rank 2 matrix, from the largest cross product of its rows.
+    """
+    c = [
+        (m01 * m12 - m02 * m11, m02 * m01 - m00 * m12, m00 * m11 - m01 * m01),
+        (m01 * m22 - m02 * m12, m02 * m02 - m00 * m22, m00 * m12 - m01 * m02),
+        (m11 * m22 - m12 * m12, m12 * m02 - m01 * m22, m01 * m12 - m11 * m02),
+    ]
+    norms = [v[0] * v[0] + v[1] * v[1] + v[2] * v[2] for v in c]
+    i = norms.index(max(norms))
+    if norms[i] == 0:
+        return None
+    norm = math.sqrt(norms[i])
+
+    return (c[i][0] / norm, c[i][1] / norm, c[i][2] / norm)
+
+
+def _eigh3_numpy(a00: float, a01: float, a02: float, a11: float, a12: float, a22: float) -> (tuple, list):
+    """
+    Eigen decomposition through SVD as in P1Backend.ppca, used for degenerate cases only.
+    """
+    try:
+        _, e, vt = np.linalg.svd(np.asarray([[a00, a01, a02], [a01, a11, a12], [a02, a12, a22]]))
+    except np.linalg.LinAlgError:
+        return None, None
+
+    return (e[0], e[1], e[2]), [(vt[k, 0], vt[k, 1], vt[k, 2]) for k in range(3)]
@@ -0,0 +1,233 @@
+# Imports
+from itertools import zip_longest
+
+import numpy as np
+
+from palaeopca.P1Utils.files import open_file
+
+
+# MagIC 3.0 columns and their MagIC 2.5 names
+aliases = {
+    "specimen": ["specimen", "er_specimen_name"],
+    "method_codes": ["method_codes", "magic_method_codes"],
+    "treat_ac_field": ["treat_ac_field", "treatment_ac_field"],
+    "treat_temp": ["treat_temp", "treatment_temp"],
+    "magn_moment": ["magn_moment", "measurement_magn_moment"],
+    "magn_volume": ["magn_volume", "measurement_magn_volume"],
+    "dir_dec": ["dir_dec", "measurement_dec"],
+    "dir_inc": ["dir_inc", "measurement_inc"],
+    "magn_x": ["magn_x", "measurement_x"],
+    "magn_y": ["magn_y", "measurement_y"],
+    "magn_z": ["magn_z", "measurement_z"],
+}
+
+# Zero field steps of a demagnetization, in-field steps are left out
+demag_codes = ["LT-NO", "LT-AF-Z", "LT-T-Z"]
+
+def read_magic(infile: str, table: str="measurements", columns: list=None, numeric: list=()) -> dict:
+    """
+    | Reads a table of a MagIC text file, columns are returned as arrays of strings or numbers.
+    | Files may hold several tables separated by lines of ">" as in downloaded contributions.
+    | Only the requested columns are parsed, numbers are converted by the C parser of numpy.loadtxt where possible.
+
+    :type infile: string
+    :type table: string
+    :type columns: list
+    :type numeric: list
+
+    :param infile: full path to input file, may be compressed, see P1Utils.files.open_file
+    :param table: table name in the first line of the table, e.g. measurements or specimens
+    :param columns: names of the columns to return, missing columns are left out (default: all columns)
+    :param numeric: names of columns returned as numbers, empty fields are NaN (default: none)
+
+    :returns: dictionary with column names as keys
+    :rtype: dictionary
+    """
+    skiprows, max_rows, header = _find_table(infile, table)
+    wanted = [n for n, name in enumerate(header) if columns is None or name in columns]
+    strings = [n for n in wanted if header[n] not in numeric]
+    numbers = [n for n in wanted if header[n] in numeric]
+
+    out = {}
+    try:
+        if len(strings) > 0:
+            values = _loadtxt(infile, skiprows, max_rows, strings, str)
+            out.update({header[n]: values[:, k] for k, n in enumerate(strings)})
+        if len(numbers) > 0:
+            try:
+                values = _loadtxt(infile, skiprows, max_rows, numbers, float)
+            except ValueError:
+                # Empty fields are converted column by column
+                values = _numbers(_loadtxt(infile, skiprows, max_rows, numbers, str))
+            out.update({header[n]: values[:, k] for k, n in enumerate(numbers)})
+    except (ValueError, IndexError):
+        # Rows shorter than the header are split line by line
+        out = {}
+        with open_file(infile, "rt", errors = "replace") as fin:
+            lines = fin.read().splitlines()[skiprows:]
+        rows = [line.split("\t") for line in lines if line.strip()][:max_rows]
+        transposed = list(zip_longest(*rows, fillvalue = ""))
+        for n in wanted:
+            values = np.asarray(transposed[n] if n < len(transposed) else [""] * len(rows), dtype = str)
+            out[header[n]] = _numbers(values) if header[n] in numeric else values
+    return out
+
+def _find_table(infile: str, table: str) -> (int, int, list):
+    # Lines before the first row, number of rows and header of a table
+    found = None
+    with open_file(infile, "rt", errors = "replace") as fin:
+        for n, line in enumerate(fin):
+            if found is None:
+                # First line is "tab<TAB>table" or "tab delimited<TAB>table"
+                kind = line.split("\t")
+                if kind[0].strip().startswith("tab") and len(kind) > 1 and kind[1].strip() == table:
+                    found = n
+                    header = [x.strip() for x in fin.readline().split("\t")]
+                    rows = 0
+            elif line.startswith(">"):
+                return found + 2, rows, header
+            elif line.strip():
+                rows += 1
+
+    if found is None:
+        raise ValueError("No {0} table in {1}".format(table, infile))
+    return found + 2, None, header
+
+def _loadtxt(infile: str, skiprows: int, max_rows: int, usecols: list, dtype) -> np.ndarray:
+    with open_file(infile, "rt", errors = "replace") as fin:
+        return np.loadtxt(fin, delimiter = "\t", skiprows = skiprows, max_rows = max_rows, usecols = usecols, dtype = dtype, comments = None, ndmin = 2)
+
+def read_measurements(infile: str) -> (np.ndarray, np.ndarray, str, str):
+    """
+    | Reads the demagnetization steps of a MagIC 3.0 measurements or MagIC 2.5 magic_measurements table.
+    | Vectors are taken from x, y, z columns if present, otherwise from the moment and its declination and inclination.
+    | Horizontal components are negated into the convention of P1Backend.ppca, which reports declinations as 180° + atan2(y, x).
+    | Steps are AF fields in mT if the table holds AF steps, otherwise temperatures in °C.
+    | Rows with method codes of in-field steps are left out.
+
+    :type infile: string
+    :param infile: full path to input file
+
+    :returns: matrix with the columns specimen code, step, x, y, z, the specimen names of all codes, the units of the vectors and the step unit (mT or C)
+    :rtype: tuple
+    """
+    numeric = [name for key in ("treat_ac_field", "treat_temp", "magn_moment", "magn_volume", "dir_dec", "dir_inc", "magn_x", "magn_y", "magn_z") for name in aliases[key]]
+    columns = [name for names in aliases.values() for name in names]
+    try:
+        table = read_magic(infile, "measurements", columns, numeric)
+    except ValueError:
+        # MagIC 2.5 table name
+        table = read_magic(infile, "magic_measurements", columns, numeric)
+    column = lambda key: next((table[name] for name in aliases[key] if name in table), None)
+
+    specimens = column("specimen")
+    if specimens is None:
+        raise ValueError("Measurements need a specimen column")
+
+    keep = np.ones(len(specimens), dtype = bool)
+    methods = column("method_codes")
+    if methods is not None:
+        demag = np.zeros(len(specimens), dtype = bool)
+        for code in demag_codes:
+            demag |= np.char.find(methods, code) >= 0
+        if demag.any():
+            keep = demag
+
+    # Vectors
+    if column("magn_x") is not None:
+        x, y, z = (column(key) for key in ("magn_x", "magn_y", "magn_z"))
+        units = "Am2"
+    else:
+        if column("magn_moment") is not None and np.isfinite(column("magn_moment")).any():
+            M, units = column("magn_moment"), "Am2"
+        elif column("magn_volume") is not None:
+            M, units = column("magn_volume"), "A/m"
+        else:
+            raise ValueError("Measurements need magnetic moments or x, y, z columns")
+        if column("dir_dec") is None or column("dir_inc") is None:
+            raise ValueError("Measurements need declination and inclination columns")
+        dec = np.radians(column("dir_dec"))
+        inc = np.radians(column("dir_inc"))
+        x = M * np.cos(inc) * np.cos(dec)
+        y = M * np.cos(inc) * np.sin(dec)
+        z = M * np.sin(inc)
+
+    # MagIC directions point along x, y, pca directions are reported from -x, -y
+    x, y = -x, -y
+
+    # Steps, MagIC stores fields in T and temperatures in K
+    af = column("treat_ac_field") if column("treat_ac_field") is not None else np.zeros(len(specimens))
+    temp = column("treat_temp") if column("treat_temp") is not None else np.zeros(len(specimens))
+    if np.nanmax(af[keep], initial = 0) > 0 or column("treat_temp") is None:
+        steps, step_unit = af * 10**3, "mT"
+    else:
+        steps, step_unit = temp - 273.15, "C"
+
+    # Specimens are numbered in order of appearance
+    labels, first, codes = np.unique(specimens[keep], return_index = True, return_inverse = True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    data = np.column_stack([rank[codes.ravel()], steps[keep], x[keep], y[keep], z[keep]]).astype(float)
+    return data, labels[order], units, step_unit
+
+def write_specimens(outfile: str, results: np.ndarray, specimens: list, step_unit: str="mT", anchor: bool=False, origin: bool=False, citation: str="This study"):
+    """
+    | Writes pca results as MagIC 3.0 specimens table, e.g. results of P1Backend.run_single_interval or run_best_fit.
+    | Directions are in specimen coordinates, samples without a result are written without direction.
+
+    :type outfile: string
+    :type results: numpy.ndarray
+    :type specimens: list
+    :type step_unit: string
+    :type anchor: bool
+    :type origin: bool
+    :type citation: string
+
+    :param outfile: full path to output file
+    :param results: pca results with the columns SampleID/Depth, NRM, Inc, Dec, MADp, MADo, min. step, max. step
+    :param specimens: specimen name of every row
+    :param step_unit: unit of the steps, mT or C (default: mT)
+    :param anchor: results of an anchored pca (default: False)
+    :param origin: results of a pca including the origin (default: False)
+    :param citation: citation of the results (default: This study)
+    """
+    if step_unit == "mT":
+        steps, unit, technique = results[:, 6:8] * 10**(-3), "T", "LT-AF-Z"
+    else:
+        steps, unit, technique = results[:, 6:8] + 273.15, "K", "LT-T-Z"
+
+    codes = [technique, "DE-BFL"]
+    if anchor:
+        codes.append("DE-BFL-A")
+    if origin:
+        codes.append("DE-BFL-O")
+
+    n = results.shape[0]
+    columns = [
+        ("specimen", np.asarray(specimens, dtype = str)),
+        ("dir_dec", _strings(results[:, 3], "%.1f")),
+        ("dir_inc", _strings(results[:, 2], "%.1f")),
+        ("dir_mad_free", _strings(results[:, 4], "%.1f")),
+        ("meas_step_min", _strings(steps[:, 0], "%.6g")),
+        ("meas_step_max", _strings(steps[:, 1], "%.6g")),
+        ("meas_step_unit", np.full(n, unit)),
+        ("dir_tilt_correction", np.full(n, "-1")),
+        ("method_codes", np.full(n, ":".join(codes))),
+        ("citations", np.full(n, citation)),
+        ("software_packages", np.full(n, "palaeopca")),
+    ]
+
+    with open(outfile, "w", encoding = "utf-8") as fout:
+        fout.write("tab\tspecimens\n")
+        fout.write("\t".join(name for name, _ in columns) + "\n")
+        fout.writelines("\t".join(row) + "\n" for row in zip(*(values.tolist() for _, values in columns)))
+
+def _numbers(values: np.ndarray) -> np.ndarray:
+    # Empty fields are NaN
+    return np.where(np.char.str_len(values) > 0, values, "nan").astype(float)
+
+def _strings(values: np.ndarray, fmt: str) -> np.ndarray:
+    # NaN is written as empty field
+    return np.where(np.isfinite(values), np.char.mod(fmt, values), "")
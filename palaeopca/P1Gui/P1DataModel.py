@@ -1,28 +1,24 @@
 from typing import List
 
-from PyQt5.QtCore import Qt, QAbstractTableModel
+import numpy as np
+
+from palaeopca.P1Gui.P1TableModel import P1TableModel
 from palaeopca.P1Backend.P1DataObject import P1DataObject
 
-class P1DataModel(QAbstractTableModel):
-    def __init__(self, data: P1DataObject, header: List, parent = None):
-        QAbstractTableModel.__init__(self, parent)
+class P1DataModel(P1TableModel):
+    def __init__(self, data: P1DataObject, header: List, parent = None, precision: int = None):
+        # Rows are read from the data object, lazily loaded files are parsed for the rows that are shown
         self._dataObject = data
-        self._data = data.get_raw_data()
-        self._header = header
+        P1TableModel.__init__(self, None, header, parent, precision)
 
-    def rowCount(self, parent = None):
-        return self._data.shape[0]
+    def _row_total(self) -> int:
+        return self._dataObject.rawRowCount()
 
-    def columnCount(self, parent = None):
-        return self._data.shape[1]
+    def _column_total(self) -> int:
+        return 5
 
-    def data(self, index, role = Qt.DisplayRole):
-        if index.isValid():
-            if role == Qt.DisplayRole:
-                return str(self._data[index.row(), index.column()])
-        return None
+    def _rows(self, start: int, stop: int) -> np.ndarray:
+        return self._dataObject.get_raw_rows(start, stop)
 
-    def headerData(self, col, orientation, role):
-        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return self._header[col]
-        return None
\ No newline at end of file
+    def _labels(self, start: int, stop: int):
+        return self._dataObject.get_row_labels(start, stop)
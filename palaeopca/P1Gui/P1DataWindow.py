@@ -1,20 +1,20 @@
-# Qt
-from PyQt5.QtCore import Qt, QCoreApplication, pyqtSlot, QSettings
-from PyQt5.QtWidgets import QWidget, QGridLayout, QTableView, QMenuBar, QMenu, QToolButton, QComboBox, QAction, QDialog, QMdiSubWindow, QSplitter
+# Standard library
+import os
 
-# Matplotlib
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+# Qt
+from PyQt5.QtCore import Qt, pyqtSlot, QSettings
+from PyQt5.QtWidgets import QWidget, QGridLayout, QTableView, QMenuBar, QMenu, QAction, QDialog, QMdiSubWindow, QSplitter, QTabWidget
 
 # palaeopca
 from palaeopca.P1Backend.P1DataObject import P1DataObject
 from palaeopca.P1Backend.P1Backend import P1Backend
 from palaeopca.P1Gui.P1DataModel import P1DataModel
-from palaeopca.P1Mpl.P1Zijder import zijder_plot
+from palaeopca.P1Mpl.P1Zijder import P1ZijderProjection
 from palaeopca.P1Gui.P1PCAWindow import P1PCAWindow
 from palaeopca.P1Gui.P1MeshWindow import P1MeshWindow
 from palaeopca.P1Gui.P1ProgressBar import P1ProgressBar
+from palaeopca.P1Gui.P1ZijderView import P1ZijderView
+from palaeopca.P1Gui.P1ThumbnailView import P1ThumbnailView
 import palaeopca.P1Utils.P1PixmapCache
 
 
@@ -22,6 +22,9 @@ class P1DataWindow(QWidget):
     def __init__(self, parent = None):
         super(P1DataWindow, self).__init__(parent)
 
+        self.__load_settings()
+        self.__data = None
+
         self.__setupGui()
         self.__connectGui()
 
@@ -32,30 +35,14 @@ class P1DataWindow(QWidget):
         self.__table = QTableView(self.__splitter)
         self.__model = None
 
-        self.__figure_widget = QWidget(self.__splitter)
-        self.__figure_layout = QGridLayout(self.__figure_widget)
+        self.__tabs = QTabWidget(self.__splitter)
         self.__setupMenu()
-        
-        self.__figure = Figure(figsize = (4, 4), dpi = 150)
-        self.__canvas = FigureCanvasQTAgg(self.__figure)
-        self.__toolbar = NavigationToolbar2QT(self.__canvas, self.__figure_widget)
-
-        self.__prevButton = QToolButton(self.__figure_widget)
-        self.__prevButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
-        self.__prevButton.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("chevron-left", "solid"))
-
-        self.__sampleCombo = QComboBox(self.__figure_widget)
 
-        self.__nextButton = QToolButton(self.__figure_widget)
-        self.__nextButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
-        self.__nextButton.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("chevron-right", "solid"))
+        self.__zijder = P1ZijderView()
 
-        self.__figure_layout.addWidget(self.__toolbar, 0, 0, 1, 1)
-        self.__figure_layout.addWidget(self.__prevButton, 0, 1, 1, 1)
-        self.__figure_layout.addWidget(self.__sampleCombo, 0, 2, 1, 1)
-        self.__figure_layout.addWidget(self.__nextButton, 0, 3, 1, 1)
-        self.__figure_layout.addWidget(self.__canvas, 1, 0, 1, 4)
-        self.__figure_layout.setRowStretch(1, 10)
+        self.__thumbnails = P1ThumbnailView()
+        self.__tabs.addTab(self.__zijder, "Zijderveld Plot")
+        self.__tabs.addTab(self.__thumbnails, "Thumbnails")
 
         self.__layout.addWidget(self.__splitter)
 
@@ -104,9 +91,7 @@ class P1DataWindow(QWidget):
 
     def __connectGui(self):
         self.__action_close.triggered.connect(self.parent().close)
-        self.__sampleCombo.currentIndexChanged.connect(self.__updateFigure)
-        self.__prevButton.clicked.connect(self.__on_prev_button_clicked)
-        self.__nextButton.clicked.connect(self.__on_next_button_clicked)
+        self.__thumbnails.sampleActivated.connect(self.__on_thumbnail_activated)
 
         self.__action_single_interval_pca.triggered.connect(self.__on_single_interval)
         self.__action_best_fit_pca.triggered.connect(self.__on_best_fit)
@@ -114,15 +99,43 @@ class P1DataWindow(QWidget):
 
         self.__action_export_zijder.triggered.connect(self.__export_zijder)
     
+    def __load_settings(self):
+        s = QSettings()
+        self.__projection = (s.value("Zijder/xh", "N"), s.value("Zijder/xv", "N"), s.value("Zijder/y", "W"), s.value("Zijder/z", "Up"))
+        self.__precision = int(s.value("Table/Precision", -1))
+        if self.__precision < 0:
+            self.__precision = None
+
+    def reload_settings(self):
+        """
+        Re-reads the plot settings, cached plots are invalidated.
+        """
+        self.__load_settings()
+
+        if self.__model is not None:
+            self.__model.set_precision(self.__precision)
+
+        if self.__data is not None:
+            self.__projection_data = P1ZijderProjection(self.__data, *self.__projection)
+            self.__thumbnails.set_data(self.__data.get_sample_names(), self.__projection_data)
+            self.__zijder.set_components(self.__projection)
+
+    def closeEvent(self, event):
+        self.__zijder.shutdown()
+        self.__thumbnails.model.shutdown()
+        super(P1DataWindow, self).closeEvent(event)
+
     def set_data(self, data: P1DataObject):
         self.__data = data
-        self.__model = P1DataModel(data, ["SampleID/Depth", "Steps", "x", "y", "z"])
+        # Samples are projected when shown, lazily loaded files are not parsed as a whole
+        self.__projection_data = P1ZijderProjection(data, *self.__projection)
+        self.__thumbnails.set_data(data.get_sample_names(), self.__projection_data)
+        self.__model = P1DataModel(data, ["SampleID/Depth", "Steps", "x", "y", "z"], precision = self.__precision)
         self.__table.setModel(self.__model)
-        self.__sampleCombo.currentIndexChanged.disconnect(self.__updateFigure)
-        self.__sampleCombo.clear()
-        self.__sampleCombo.addItems([str(x) for x in self.__data.get_samples().tolist()])
-        self.__sampleCombo.currentIndexChanged.connect(self.__updateFigure)
-        self.__updateFigure(0)
+        self.__zijder.set_data(data, self.__projection, self.__plot_kwargs)
+
+    def __plot_kwargs(self, index: int) -> dict:
+        return {"units": self.__data.get_units(), "projection": self.__projection_data.get(index)}
 
     @pyqtSlot()
     def __on_single_interval(self):
@@ -141,7 +154,8 @@ class P1DataWindow(QWidget):
                 NRM_unit = dlg.NRMUnitCombo.currentText(), 
                 anchor = dlg.anchorCheck.isChecked(), 
                 origin = dlg.originCheck.isChecked(),
-                pbar = pbar
+                pbar = pbar,
+                variants = "all" if dlg.variantsCheck.isChecked() else None
             )
             pbar.progress.setValue(100)
             pbar.close()
@@ -151,7 +165,7 @@ class P1DataWindow(QWidget):
             subwindow.setWindowIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("grip-lines-vertical", "solid"))
             subwindow.setWidget(P1PCAWindow(subwindow))
             subwindow.setAttribute(Qt.WA_DeleteOnClose)
-            subwindow.widget().set_data(self.__data, pca, dlg.NRMUnitCombo.currentText())
+            subwindow.widget().set_data(self.__data, pca, dlg.NRMUnitCombo.currentText(), variant = P1Backend.pca_variants.index((dlg.anchorCheck.isChecked(), dlg.originCheck.isChecked())))
             subwindow.show()
 
     @pyqtSlot()
@@ -170,7 +184,8 @@ class P1DataWindow(QWidget):
                 NRM_unit = dlg.NRMUnitCombo.currentText(), 
                 anchor = dlg.anchorCheck.isChecked(), 
                 origin = dlg.originCheck.isChecked(),
-                pbar = pbar
+                pbar = pbar,
+                variants = "all" if dlg.variantsCheck.isChecked() else None
                 )
             pbar.progress.setValue(100)
             pbar.close()
@@ -180,7 +195,7 @@ class P1DataWindow(QWidget):
             subwindow.setWindowIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("sort-amount-down", "solid"))
             subwindow.setWidget(P1PCAWindow(subwindow))
             subwindow.setAttribute(Qt.WA_DeleteOnClose)
-            subwindow.widget().set_data(self.__data, pca)
+            subwindow.widget().set_data(self.__data, pca, dlg.NRMUnitCombo.currentText(), variant = P1Backend.pca_variants.index((dlg.anchorCheck.isChecked(), dlg.originCheck.isChecked())))
             subwindow.show()
 
     @pyqtSlot()
@@ -189,6 +204,26 @@ class P1DataWindow(QWidget):
         dlg = P1MeshDialog([str(x) for x in self.__data.get_steps()], self)
         dlg.setWindowIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("grip-vertical", "solid"))
         if dlg.exec_() == QDialog.Accepted:
+            if dlg.progressiveCheck.isChecked():
+                p = P1Backend()
+                p.set_data(self.__data)
+
+                subwindow = QMdiSubWindow(self.parent().mdiArea())
+                subwindow.setWindowTitle("PCA Results Mesh - {0}".format(self.parent().windowTitle().split("-")[1]))
+                subwindow.setWindowIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("grip-vertical", "solid"))
+                subwindow.setWidget(P1MeshWindow(subwindow))
+                subwindow.setAttribute(Qt.WA_DeleteOnClose)
+                subwindow.show()
+                subwindow.widget().set_progressive(
+                    p,
+                    self.__data.get_header(),
+                    window = dlg.stepSpin.value(), 
+                    diff = dlg.checkDifference.isChecked(), 
+                    anchor = dlg.anchorCheck.isChecked(), 
+                    origin = dlg.originCheck.isChecked()
+                    )
+                return
+
             pbar = P1ProgressBar(self)
             pbar.progress.setValue(0)
 
@@ -216,39 +251,11 @@ class P1DataWindow(QWidget):
             #self.parent().mdiArea().addSubWindow(subwindow)
             subwindow.show()
 
-    @pyqtSlot()
-    def __on_prev_button_clicked(self):
-        self.__sampleCombo.setCurrentIndex(self.__sampleCombo.currentIndex() - 1)
-
-    @pyqtSlot()
-    def __on_next_button_clicked(self):
-        self.__sampleCombo.setCurrentIndex(self.__sampleCombo.currentIndex() + 1)
-    
     @pyqtSlot(int)
-    def __updateFigure(self, index: int):
-        s = QSettings()
-
-        # Set buttons
-        if index == 0: # no more going left
-            self.__prevButton.setDisabled(True)
-        elif index == self.__sampleCombo.count()-1:
-            self.__nextButton.setDisabled(True)
-        else:
-            self.__prevButton.setEnabled(True)
-            self.__nextButton.setEnabled(True)
-
-        # Update figure
-        current_sample = self.__sampleCombo.currentText()
-        current_data = self.__data.get_data(current_sample)
-        xh = s.value("Zijder/xh", "N")
-        xv = s.value("Zijder/xv", "N")
-        y = s.value("Zijder/y", "W")
-        z = s.value("Zijder/z", "Up")
-        self.__figure = zijder_plot(current_sample, current_data, xh, xv, y, z, figure = self.__figure, units = self.__data.get_units())
-        self.__canvas.draw()
-
-        QCoreApplication.processEvents()
-
+    def __on_thumbnail_activated(self, row: int):
+        self.__zijder.setCurrentIndex(row)
+        self.__tabs.setCurrentWidget(self.__zijder)
+    
     @pyqtSlot()
     def __export_zijder(self):
         from palaeopca.P1Gui.P1ExportDialogs import P1ZijderExport
@@ -264,7 +271,7 @@ class P1DataWindow(QWidget):
             pbar = P1ProgressBar(self)
             pbar.progress.setValue(0)
 
-            from palaeopca.P1Mpl.P1Zijder import zijder_save
+            from palaeopca.P1Mpl.P1Zijder import zijder_export, zijder_pdf, zijder_contact_sheet
 
             outdir = dlg.pathPicker.getPath()
             indata = self.__data
@@ -276,7 +283,12 @@ class P1DataWindow(QWidget):
             fmt = dlg.formatCombo.currentText()
             dpi = float(dlg.figure_dpi.text())
 
-            zijder_save(outdir, indata, xh, xv, y, z, pbar = pbar, figsize = figsize, fmt = fmt, dpi = dpi)
+            if dlg.modeCombo.currentText() == "Multi-page PDF":
+                zijder_pdf(os.path.join(outdir, "Zijderveld.pdf"), indata, xh, xv, y, z, pbar = pbar, figsize = figsize)
+            elif dlg.modeCombo.currentText() == "Contact sheets":
+                zijder_contact_sheet(os.path.join(outdir, "Zijderveld_sheets.{0}".format(fmt)), indata, xh, xv, y, z, dlg.rowsSpin.value(), dlg.colsSpin.value(), pbar = pbar, dpi = dpi)
+            else:
+                zijder_export(outdir, indata, xh, xv, y, z, pbar = pbar, figsize = figsize, fmt = fmt, dpi = dpi)
 
             pbar.progress.setValue(100)
             pbar.close()
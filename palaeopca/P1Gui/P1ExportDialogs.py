@@ -13,10 +13,11 @@ from PyQt5.QtWidgets import QDialog, \
     QComboBox, \
     QLineEdit, \
     QCheckBox, \
+    QSpinBox, \
     QDialogButtonBox
 
 # Matplotlib
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 # palaeopca
 from palaeopca.P1Gui.P1PathPicker import P1PathPicker
@@ -45,7 +46,7 @@ class P1ZijderExport(QDialog):
 
         self.__formatLabel = QLabel("File format")
         self.formatCombo = QComboBox()
-        formats = [key for key in plt.gcf().canvas.get_supported_filetypes()]
+        formats = [key for key in FigureCanvasAgg.get_supported_filetypes()]
         self.formatCombo.addItems(formats)
         self.formatCombo.setCurrentText(s.value("Zijder/fmt", "png"))
 
@@ -71,6 +72,33 @@ class P1ZijderExport(QDialog):
         self.__paramLayout.addWidget(self.__figureHLabel, 1, 2)
         self.__paramLayout.addWidget(self.figure_height, 1, 3)
 
+        # Export mode, multi-page pdf and contact sheets are written as single documents into the output directory
+        self.__modeLabel = QLabel("Export mode")
+        self.modeCombo = QComboBox()
+        self.modeCombo.addItems(["Single files", "Multi-page PDF", "Contact sheets"])
+
+        self.__rowsLabel = QLabel("Rows per sheet")
+        self.rowsSpin = QSpinBox()
+        self.rowsSpin.setRange(1, 20)
+        self.rowsSpin.setValue(4)
+
+        self.__colsLabel = QLabel("Columns per sheet")
+        self.colsSpin = QSpinBox()
+        self.colsSpin.setRange(1, 20)
+        self.colsSpin.setValue(3)
+
+        self.__paramLayout.addWidget(self.__modeLabel, 2, 0)
+        self.__paramLayout.addWidget(self.modeCombo, 2, 1, 1, 3)
+
+        self.__paramLayout.addWidget(self.__rowsLabel, 3, 0)
+        self.__paramLayout.addWidget(self.rowsSpin, 3, 1)
+
+        self.__paramLayout.addWidget(self.__colsLabel, 3, 2)
+        self.__paramLayout.addWidget(self.colsSpin, 3, 3)
+
+        self.modeCombo.currentTextChanged.connect(self.__on_mode_changed)
+        self.__on_mode_changed(self.modeCombo.currentText())
+
         # Directions box widgets
         self.dirBox = QGroupBox("Directions")
         self.__dirLayout = QGridLayout(self.dirBox)
@@ -139,6 +167,10 @@ class P1ZijderExport(QDialog):
 
         self.__layout.addWidget(self.buttonBox, 4, 0, 1, 2)
 
+    def __on_mode_changed(self, mode: str):
+        self.rowsSpin.setEnabled(mode == "Contact sheets")
+        self.colsSpin.setEnabled(mode == "Contact sheets")
+
 class P1SequenceExport(QDialog):
     def __init__(self, parent = None):
         super(P1SequenceExport, self).__init__(parent)
@@ -154,7 +186,7 @@ class P1SequenceExport(QDialog):
         self.setLayout(self.__layout)
 
         self.__fileLabel = QLabel("Output file:")
-        __fmt = plt.gcf().canvas.get_supported_filetypes()
+        __fmt = FigureCanvasAgg.get_supported_filetypes()
         __filter = ["{0} (*.{1})".format(__fmt[key], key) for key in __fmt]
         __filter = ";;".join(__filter)
         __sFilter = "{0} (*.{1})".format(__fmt[s.value("Sequence/fmt")], s.value("Sequence/fmt"))
@@ -255,8 +287,8 @@ class P1MeshExport(QDialog):
         self.setLayout(self.__layout)
 
         self.__fileLabel = QLabel("Output file:")
-        __fmt = plt.gcf().canvas.get_supported_filetypes()
-        __filter = ["{0} file (*.{0})".format(key) for key in plt.gcf().canvas.get_supported_filetypes()]
+        __fmt = FigureCanvasAgg.get_supported_filetypes()
+        __filter = ["{0} file (*.{0})".format(key) for key in FigureCanvasAgg.get_supported_filetypes()]
         __filter = ";;".join(__filter)
         __filter = "(" + __filter + ")"
         __sFilter = "{0} (*.{1})".format(__fmt[s.value("Mesh/fmt")], s.value("Mesh/fmt"))
@@ -384,7 +416,7 @@ class P1MeshDataExport(QDialog):
 
         self.__fmtLabel = QLabel("Format:")
         self.fmtCombo = QComboBox()
-        fmt = ["CSV file (*.csv)"]
+        fmt = ["CSV file (*.csv)", "Compressed CSV file (*.csv.gz)"]
 
         try:
             import xlsxwriter
@@ -1,11 +1,17 @@
+import os
 import sys
+from ast import literal_eval
 
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtWidgets import QDialog, QGridLayout, QLabel, QDialogButtonBox, QTableView, QGroupBox, QSpinBox, QComboBox, QCheckBox, QMessageBox
+from PyQt5.QtCore import Qt, QSize, QTimer, QSettings, QStandardPaths, pyqtSlot
+from PyQt5.QtWidgets import QDialog, QGridLayout, QLabel, QDialogButtonBox, QTableView, QGroupBox, QSpinBox, QComboBox, QCheckBox, QMessageBox, QLineEdit, QPushButton, QInputDialog
 
 from palaeopca.P1Gui.P1PathPicker import P1PathPicker
-from palaeopca.P1Backend.P1DataObject import P1DataObject
+from palaeopca.P1Backend.P1DataObject import P1DataObject, format_report
 from palaeopca.P1Gui.P1DataModel import P1DataModel
+from palaeopca.P1Gui.P1ProgressBar import P1ProgressBar
+from palaeopca.P1Gui.P1Worker import P1Worker
+from palaeopca.P1Utils.P1ImportCache import P1ImportCache
+from palaeopca.P1Utils.files import is_compressed
 
 class P1ImportDialog(QDialog):
     delimiters = {
@@ -16,15 +22,20 @@ class P1ImportDialog(QDialog):
         ":": ":",
         ";": ";",
     }
+    preview_rows = 2000
 
     def __init__(self, parent = None):
         super(P1ImportDialog, self).__init__(parent)
         self.setWindowTitle("Import data file")
 
+        self.data = None
+        self.__generation = 0
+        self.__pbar = None
+
         # TODO
         # Add Excel support
         #self.__filter = "All Files (*);;Excel files (*.xls *.xlsx);;CSV files (*.csv);;Text files (*.txt)"
-        self.__filter = "All Files (*);;CSV files (*.csv);;Text files (*.txt)"
+        self.__filter = "All Files (*);;CSV files (*.csv);;Text files (*.txt);;Compressed files (*.gz *.bz2 *.xz *.zip)"
 
         if "xlsxwriter" in sys.modules:
             self.__filter += ";;Excel files (*.xls *.xlsx)"
@@ -65,6 +76,14 @@ class P1ImportDialog(QDialog):
         self.__behaviourLayout.addWidget(self.skipHeaderSpin, 0, 1)
         self.__behaviourLayout.addWidget(self.skipFooterSpin, 1, 1)
 
+        self.raggedCheck = QCheckBox("Individual steps per sample")
+        self.raggedCheck.setToolTip("Keep the steps of every sample, e.g. for samples demagnetized with different step schemes")
+        self.__behaviourLayout.addWidget(self.raggedCheck, 2, 0, 1, 2)
+
+        self.lazyCheck = QCheckBox("Read samples on demand")
+        self.lazyCheck.setToolTip("Only index the file and parse samples when they are shown, e.g. for files larger than memory\nCompressed files are read completely, best fit and mesh pca and plot exports parse the whole file")
+        self.__behaviourLayout.addWidget(self.lazyCheck, 3, 0, 1, 2)
+
         # Locale box widgets
         self.localeBox = QGroupBox("Locale")
         self.__localLayout = QGridLayout(self.localeBox)
@@ -97,6 +116,32 @@ class P1ImportDialog(QDialog):
 
         self.__delimiterLayout.addWidget(self.columnCombo, 0, 1)
 
+        # Column mapping widgets, wide files are parsed in the listed columns only
+        self.columnsBox = QGroupBox("Columns")
+        self.__columnsLayout = QGridLayout(self.columnsBox)
+
+        self.presetLabel = QLabel("Preset")
+        self.presetCombo = QComboBox()
+        self.presetCombo.addItem("Default")
+        self.presetCombo.addItems(sorted(column_presets()))
+        self.presetCombo.setCurrentText(QSettings().value("Import/Preset", "Default"))
+
+        self.columnsLabel = QLabel("SampleID, [depth,] step, x, y, z")
+        self.columnsEdit = QLineEdit()
+        self.columnsEdit.setPlaceholderText("Header names or column numbers, e.g. Sample, Treatment, X, Y, Z")
+        self.columnsEdit.setText(format_columns(column_presets().get(self.presetCombo.currentText())))
+
+        self.savePresetButton = QPushButton("Save preset")
+        self.deletePresetButton = QPushButton("Delete preset")
+        self.deletePresetButton.setEnabled(self.presetCombo.currentIndex() > 0)
+
+        self.__columnsLayout.addWidget(self.presetLabel, 0, 0)
+        self.__columnsLayout.addWidget(self.presetCombo, 0, 1)
+        self.__columnsLayout.addWidget(self.savePresetButton, 0, 2)
+        self.__columnsLayout.addWidget(self.deletePresetButton, 0, 3)
+        self.__columnsLayout.addWidget(self.columnsLabel, 1, 0)
+        self.__columnsLayout.addWidget(self.columnsEdit, 1, 1, 1, 3)
+
         # Setup button box
         self.buttonBox = QDialogButtonBox(self)
         self.buttonBox.setOrientation(Qt.Horizontal)
@@ -113,39 +158,271 @@ class P1ImportDialog(QDialog):
         self.__layout.addWidget(self.behaviourBox, 3, 0, 2, 1)
         self.__layout.addWidget(self.localeBox, 3, 1)
         self.__layout.addWidget(self.delimiterBox, 4, 1)
+        self.__layout.addWidget(self.columnsBox, 5, 0, 1, 2)
 
-        self.__layout.addWidget(self.buttonBox, 5, 0, 1, 2)
+        self.__layout.addWidget(self.buttonBox, 6, 0, 1, 2)
+
+        # Parameter changes are collected until typing settles
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.setInterval(300)
 
     def __connectGui(self):
-        self.pathPicker.lineChanged.connect(self.__updateTable)
+        self.__timer.timeout.connect(self.__updateTable)
+
+        # Signal arguments must not reach QTimer.start(int msec), it would replace the interval
+        restart = lambda *args: self.__timer.start()
+        self.pathPicker.lineChanged.connect(restart)
+        self.skipHeaderSpin.valueChanged.connect(restart)
+        self.skipFooterSpin.valueChanged.connect(restart)
+        self.numericsCombo.currentIndexChanged.connect(restart)
+        self.unitsCombo.currentIndexChanged.connect(restart)
+        self.columnCombo.currentIndexChanged.connect(restart)
+        self.skipSpaces.stateChanged.connect(restart)
+        self.raggedCheck.stateChanged.connect(restart)
+        self.raggedCheck.toggled.connect(self.__on_ragged_toggled)
+        self.columnsEdit.textChanged.connect(restart)
+
+        self.presetCombo.currentIndexChanged.connect(self.__on_preset_changed)
+        self.savePresetButton.clicked.connect(self.__on_save_preset)
+        self.deletePresetButton.clicked.connect(self.__on_delete_preset)
+
+    def __options(self) -> tuple:
+        return self.pathPicker.getPath(), self.delimiters[self.columnCombo.currentText()], self.skipHeaderSpin.value()
+
+    def __start(self, columns: list, max_rows: int = None) -> P1Worker:
+        # A newer parse invalidates the results of older ones
+        self.__generation += 1
+        worker = P1Worker(_load, *self.__options(), self.unitsCombo.currentText(), max_rows, import_cache(), self.raggedCheck.isChecked(), columns, self.lazyCheck.isChecked())
+        _workers.add(worker)
+        worker.finished.connect(lambda: _workers.discard(worker))
+        return worker
+
+    @pyqtSlot(bool)
+    def __on_ragged_toggled(self, checked: bool):
+        # Samples with individual steps cannot be indexed, see P1DataObject.load_index
+        if checked:
+            self.lazyCheck.setChecked(False)
+        self.lazyCheck.setEnabled(not checked)
+
+    @pyqtSlot()
+    def __on_preset_changed(self):
+        self.deletePresetButton.setEnabled(self.presetCombo.currentIndex() > 0)
+        self.columnsEdit.setText(format_columns(column_presets().get(self.presetCombo.currentText())))
+
+    @pyqtSlot()
+    def __on_save_preset(self):
+        try:
+            columns = parse_columns(self.columnsEdit.text())
+        except ValueError:
+            columns = None
+        if columns is None:
+            QMessageBox.warning(self, "Column preset", "Enter the columns SampleID, step, x, y, z and an optional depth after SampleID.", QMessageBox.Ok)
+            return
+
+        name, ok = QInputDialog.getText(self, "Column preset", "Preset name:", text = self.presetCombo.currentText() if self.presetCombo.currentIndex() > 0 else "")
+        name = name.strip()
+        if not ok or len(name) == 0 or name == "Default" or "/" in name or "\\" in name:
+            return
+
+        save_column_preset(name, columns)
+        if self.presetCombo.findText(name) < 0:
+            self.presetCombo.addItem(name)
+        self.presetCombo.setCurrentText(name)
 
-    def __updateTable(self, *args):
-        # Get user input
+    @pyqtSlot()
+    def __on_delete_preset(self):
+        if self.presetCombo.currentIndex() > 0:
+            remove_column_preset(self.presetCombo.currentText())
+            self.presetCombo.removeItem(self.presetCombo.currentIndex())
+
+    @pyqtSlot()
+    def __updateTable(self):
         infile = self.pathPicker.getPath()
         if len(infile) == 0:
             return
 
-        skip_header = self.skipHeaderSpin.value()
-        skip_footer = self.skipFooterSpin.value()
-        numerics = self.numericsCombo.currentText()
-        sep = self.delimiters[self.columnCombo.currentText()]
-        skip = self.skipSpaces.isChecked()
-        units = self.unitsCombo.currentText()
+        try:
+            columns = parse_columns(self.columnsEdit.text())
+        except ValueError:
+            self.prevLabel.setText("File preview: columns need SampleID, step, x, y, z and an optional depth!")
+            return
+
+        # Only the first rows are parsed for the preview
+        worker = self.__start(columns, self.preview_rows)
+        generation = self.__generation
+        worker.result.connect(lambda data: self.__on_preview(generation, data))
+        worker.error.connect(lambda error: self.__on_preview(generation, None))
+        self.prevLabel.setText("File preview: reading ...")
+        worker.start()
+
+    def __on_preview(self, generation: int, data: P1DataObject):
+        if generation != self.__generation:
+            return
+
+        if data is None:
+            self.prevTable.setModel(None)
+            self.prevLabel.setText("File preview: error while reading input file!")
+            self.prevLabel.setToolTip("")
+            return
+
+        self.prevTable.setModel(P1DataModel(data, ["SampleID/Depth", "Steps", "x", "y", "z"]))
+        self.prevLabel.setText("File preview (first {0} rows):".format(self.preview_rows))
+        self.prevLabel.setToolTip(format_report(data.get_report()))
+
+    def accept(self):
+        """
+        Loads the complete file in the background and closes the dialog once it is read.
+        """
+        if len(self.pathPicker.getPath()) == 0:
+            return
 
-        # Set data object and load data
-        data = P1DataObject()
         try:
-            data.load_data(infile, sep, skip_header)
-        except UnicodeDecodeError:
-            QMessageBox.warning(self, "Import warning", "Error while reading input file!", QMessageBox.Ok)
+            columns = parse_columns(self.columnsEdit.text())
+        except ValueError:
+            QMessageBox.warning(self, "Import warning", "Columns need SampleID, step, x, y, z and an optional depth!", QMessageBox.Ok)
+            return
+
+        self.__timer.stop()
+        self.buttonBox.setEnabled(False)
+        self.__pbar = P1ProgressBar(self)
+        self.__pbar.setWindowTitle("Reading ...")
+        self.__pbar.progress.setMaximum(0)
+        self.__pbar.rejected.connect(self.__on_load_canceled)
+
+        worker = self.__start(columns)
+        generation = self.__generation
+        worker.result.connect(lambda data: self.__on_loaded(generation, data))
+        worker.error.connect(lambda error: self.__on_loaded(generation, None))
+        worker.start()
+
+    @pyqtSlot()
+    def __on_load_canceled(self):
+        # The parse keeps running, its result is ignored and the dialog can be used again
+        if self.__pbar is not None and self.__pbar.canceled:
+            self.__generation += 1
+            self.buttonBox.setEnabled(True)
+
+    def __on_loaded(self, generation: int, data: P1DataObject):
+        if generation != self.__generation:
             return
-        except IndexError:
+
+        canceled = self.__pbar.canceled
+        self.__pbar.progress.setMaximum(100)
+        self.__pbar.progress.setValue(100)
+        self.__pbar.close()
+        self.buttonBox.setEnabled(True)
+
+        if canceled:
+            return
+        if data is None:
             QMessageBox.warning(self, "Import warning", "Error while reading input file!", QMessageBox.Ok)
             return
 
-        data.set_units(units)
-        model = P1DataModel(data, ["SampleID/Depth", "Steps", "x", "y", "z"])
+        report = format_report(data.get_report())
+        if len(report) > 0:
+            QMessageBox.information(self, "Import report", report, QMessageBox.Ok)
 
-        self.prevTable.setModel(model)
+        # Quick imports use the last preset
+        QSettings().setValue("Import/Preset", self.presetCombo.currentText())
 
         self.data = data
+        super(P1ImportDialog, self).accept()
+
+    def done(self, result: int):
+        # Running parsers cannot be interrupted, their results are ignored
+        self.__generation += 1
+        if self.__pbar is not None:
+            self.__pbar.close()
+        super(P1ImportDialog, self).done(result)
+
+
+# Parsers still running after their dialog closed
+_workers = set()
+
+def import_cache(disabled: bool = False) -> P1ImportCache:
+    """
+    Returns the cache of parsed data files configured in the settings.
+
+    :param disabled: return the cache even if it is disabled, e.g. to remove its files (bool)
+    :return: cache or None if disabled (P1ImportCache)
+    """
+    size = max(int(QSettings().value("Import/CacheSize", 512)), 0)
+    if size == 0 and not disabled:
+        return None
+    directory = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), "import")
+    return P1ImportCache(directory, size * 2**20)
+
+def column_presets() -> dict:
+    """
+    Returns the column mappings saved as named presets.
+
+    :return: columns of every preset, see P1DataObject.load_data (dict)
+    """
+    s = QSettings()
+    s.beginGroup("ImportPresets")
+    presets = {name: literal_eval(s.value(name)) for name in s.childKeys()}
+    s.endGroup()
+    return presets
+
+def save_column_preset(name: str, columns: list):
+    """
+    Saves a column mapping as named preset, an existing preset of the same name is replaced.
+
+    :param name: preset name (string)
+    :param columns: column indices or header names (list)
+    """
+    QSettings().setValue("ImportPresets/{0}".format(name), repr(list(columns)))
+
+def remove_column_preset(name: str):
+    """
+    Removes a named column preset.
+
+    :param name: preset name (string)
+    """
+    QSettings().remove("ImportPresets/{0}".format(name))
+
+def preset_columns() -> list:
+    """
+    Returns the columns of the preset last used in the import dialog or chosen in the settings.
+
+    :return: column indices or header names, None for all columns (list)
+    """
+    return column_presets().get(QSettings().value("Import/Preset", "Default"))
+
+def parse_columns(text: str) -> list:
+    """
+    Parses a comma-separated column mapping, numbers are column indices and other entries header names.
+
+    :param text: e.g. "Sample, Treatment, X, Y, Z" (string)
+    :return: columns or None if empty (list)
+    """
+    columns = [x.strip() for x in text.split(",") if len(x.strip()) > 0]
+    if len(columns) == 0:
+        return None
+    if len(columns) not in (5, 6):
+        raise ValueError("Columns need to map SampleID, step, x, y, z and an optional depth")
+    return [int(x) if x.isdigit() else x for x in columns]
+
+def format_columns(columns: list) -> str:
+    """
+    Formats a column mapping for editing, see parse_columns.
+
+    :param columns: column indices or header names (list)
+    :return: comma-separated columns (string)
+    """
+    return ", ".join(str(x) for x in columns) if columns else ""
+
+def _load(infile: str, sep: str, skip_header: int, units: str, max_rows: int = None, cache: P1ImportCache = None, ragged: bool = False, columns: list = None, lazy: bool = False) -> P1DataObject:
+    data = P1DataObject()
+    # Previews and compressed files are read completely
+    if lazy and max_rows is None and not ragged and not is_compressed(infile) and not infile.lower().endswith(".zip"):
+        try:
+            data.load_index(infile, sep, skip_header, columns = columns)
+        except ValueError:
+            # Samples with different step counts are put on a common grid, see grid_rows
+            data.load_data(infile, sep, skip_header, max_rows, cache, ragged, columns)
+    else:
+        data.load_data(infile, sep, skip_header, max_rows, cache, ragged, columns)
+    data.set_units(units)
+    return data
@@ -37,7 +37,7 @@ from PyQt5.QtGui import QIcon
 # PalaeoPCA
 import palaeopca
 from palaeopca.P1Gui.P1DataWindow import P1DataWindow
-from palaeopca.P1Backend.P1DataObject import P1DataObject
+from palaeopca.P1Backend.P1DataObject import P1DataObject, format_report
 from palaeopca.P1Gui.P1AboutDialog import P1AboutDialog
 
 def _icon(name, style = ""):
@@ -91,6 +91,14 @@ class P1MainWindow(QMainWindow):
         self.action_quick_import.setIcon(_icon("file-upload", "solid"))
         self.action_quick_import.setText("Quick Import")
 
+        self.action_bulk_import = QAction(self)
+        self.action_bulk_import.setIcon(_icon("copy", "solid"))
+        self.action_bulk_import.setText("Bulk Import")
+
+        self.action_magic_import = QAction(self)
+        self.action_magic_import.setIcon(_icon("file-alt", "solid"))
+        self.action_magic_import.setText("Import MagIC")
+
         # Export actions
         #self.action_export_zijder = QAction(self)
         #self.action_export_zijder.setIcon(_icon("SP_DialogSaveButton"))
@@ -122,6 +130,8 @@ class P1MainWindow(QMainWindow):
         menuImport = QMenu("Import", menubar)
         menuImport.addAction(self.action_import)
         menuImport.addAction(self.action_quick_import)
+        menuImport.addAction(self.action_bulk_import)
+        menuImport.addAction(self.action_magic_import)
 
         # Export menu
         #menuExport = QMenu("Export", menubar)
@@ -147,6 +157,8 @@ class P1MainWindow(QMainWindow):
 
         self.action_import.triggered.connect(self.on_import_triggered)
         self.action_quick_import.triggered.connect(self.on_quick_import_triggered)
+        self.action_bulk_import.triggered.connect(self.on_bulk_import_triggered)
+        self.action_magic_import.triggered.connect(self.on_magic_import_triggered)
 
         self.action_docs.triggered.connect(self.on_docs_triggered)
         self.action_about.triggered.connect(self.on_about_triggered)
@@ -157,8 +169,16 @@ class P1MainWindow(QMainWindow):
 
         dlg = P1SettingsDialog(self)
         dlg.setWindowIcon(_icon("cogs", "solid"))
+        dlg.settingsSaved.connect(self.on_settings_saved)
         dlg.show()
 
+    @pyqtSlot()
+    def on_settings_saved(self):
+        # Let open windows pick up changed plot settings
+        for subwindow in self.centralWidget().subWindowList():
+            if hasattr(subwindow.widget(), "reload_settings"):
+                subwindow.widget().reload_settings()
+
     @pyqtSlot()
     def on_import_triggered(self):
         from palaeopca.P1Gui.P1ImportDialog import P1ImportDialog
@@ -174,7 +194,7 @@ class P1MainWindow(QMainWindow):
     @pyqtSlot()
     def on_quick_import_triggered(self):
         dialog = QFileDialog()
-        infile = dialog.getOpenFileName(None, "Choose data file to open", "", "All Files (*);;CSV files (*.csv);;Text files (*.txt)")[0]
+        infile = dialog.getOpenFileName(None, "Choose data file to open", "", "All Files (*);;CSV files (*.csv);;Text files (*.txt);;Compressed files (*.gz *.bz2 *.xz *.zip)")[0]
 
         if infile == "":
             return
@@ -186,10 +206,11 @@ class P1MainWindow(QMainWindow):
         sep = s.value("Import/Separator", ",")
         skip = literal_eval(s.value("Import/SkipWhitespaces", "False"))
 
-        # Set data object and load data
+        # Set data object and load data, files opened before are read from the import cache
+        from palaeopca.P1Gui.P1ImportDialog import import_cache, preset_columns
         data = P1DataObject()
         try:
-            data.load_data(infile, sep, skip_header)
+            data.load_data(infile, sep, skip_header, cache = import_cache(), columns = preset_columns())
         except UnicodeDecodeError:
             QMessageBox.warning(self, "Import warning", "Error while reading input file!", QMessageBox.Ok)
             return
@@ -202,8 +223,72 @@ class P1MainWindow(QMainWindow):
 
         data.set_units(s.value("Units/Input", "emu"))
 
+        report = format_report(data.get_report())
+        if len(report) > 0:
+            QMessageBox.information(self, "Import report", report, QMessageBox.Ok)
+
         self.open_data_window(infile, data)
 
+    @pyqtSlot()
+    def on_bulk_import_triggered(self):
+        dialog = QFileDialog()
+        infiles = dialog.getOpenFileNames(None, "Choose data files to open", "", "All Files (*);;CSV files (*.csv);;Text files (*.txt);;Compressed files (*.gz *.bz2 *.xz *.zip)")[0]
+
+        if len(infiles) == 0:
+            return
+
+        s = QSettings()
+        skip_header = int(s.value("Import/SkipHeader", 1))
+        sep = s.value("Import/Separator", ",")
+
+        # Files are parsed in worker processes and merged into one data window
+        from palaeopca.P1Gui.P1ImportDialog import import_cache, preset_columns
+        from palaeopca.P1Gui.P1ProgressBar import P1ProgressBar
+        pbar = P1ProgressBar(self)
+        pbar.progress.setValue(0)
+        data = P1DataObject()
+        try:
+            loaded = data.load_files(infiles, sep, skip_header, cache = import_cache(), pbar = pbar, columns = preset_columns())
+        except (UnicodeDecodeError, IndexError, ValueError):
+            QMessageBox.warning(self, "Import warning", "Error while reading input files!", QMessageBox.Ok)
+            return
+        finally:
+            pbar.progress.setValue(100)
+            pbar.close()
+
+        if not loaded:
+            return
+
+        data.set_units(s.value("Units/Input", "emu"))
+
+        report = format_report(data.get_report())
+        if len(report) > 0:
+            QMessageBox.information(self, "Import report", report, QMessageBox.Ok)
+
+        self.open_data_window("{0} files in {1}".format(len(infiles), os.path.dirname(infiles[0])), data)
+
+    @pyqtSlot()
+    def on_magic_import_triggered(self):
+        dialog = QFileDialog()
+        infile = dialog.getOpenFileName(None, "Choose MagIC file to open", "", "MagIC files (*.txt);;All Files (*);;Compressed files (*.gz *.bz2 *.xz *.zip)")[0]
+
+        if infile == "":
+            return
+
+        # Units and specimen names are taken from the measurements table
+        data = P1DataObject()
+        try:
+            step_unit = data.load_magic(infile)
+        except (UnicodeDecodeError, IndexError, ValueError):
+            QMessageBox.warning(self, "Import warning", "Error while reading MagIC file!", QMessageBox.Ok)
+            return
+
+        report = format_report(data.get_report())
+        if len(report) > 0:
+            QMessageBox.information(self, "Import report", report, QMessageBox.Ok)
+
+        self.open_data_window("{0} (steps in {1})".format(infile, step_unit), data)
+
     @pyqtSlot()
     def on_docs_triggered(self):
         url = palaeopca.basedir.replace("\\", "/") + "/../docs/index.html"
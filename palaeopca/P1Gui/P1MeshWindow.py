@@ -1,10 +1,11 @@
 # Standard library
 import sys
 import os
-from typing import Dict
+import importlib.util
+from typing import Dict, List
 
 # Qt
-from PyQt5.QtCore import Qt, QCoreApplication, pyqtSlot
+from PyQt5.QtCore import Qt, QCoreApplication, pyqtSlot, QSettings
 from PyQt5.QtWidgets import QWidget, \
     QGridLayout, \
     QTableView, \
@@ -32,6 +33,8 @@ import numpy as np
 from palaeopca.P1Backend.P1DataObject import P1DataObject
 from palaeopca.P1Backend.P1Backend import P1Backend
 from palaeopca.P1Gui.P1ResultsModel import P1ResultsModel
+from palaeopca.P1Gui.P1Worker import P1Worker
+from palaeopca.P1Gui.P1TableExport import P1TableExport
 from palaeopca.P1Mpl.P1Mesh import mesh_plot
 import palaeopca.P1Utils.P1PixmapCache
 
@@ -40,6 +43,10 @@ class P1MeshWindow(QWidget):
     def __init__(self, parent = None):
         super(P1MeshWindow, self).__init__(parent)
 
+        self.__worker = None
+        self.__export = None
+        self.__models = []
+
         self.__setupGui()
         self.__connectGui()
 
@@ -116,24 +123,95 @@ class P1MeshWindow(QWidget):
     
     def set_data(self, data: Dict):
         self.__data = data
+        precision = self.__load_precision()
 
-        self.__M_model = P1ResultsModel(self.__data["M"], [str(x) for x in self.__data["Steps"].tolist()])
+        # Headers are formatted on demand by the models
+        self.__M_model = P1ResultsModel(self.__data["M"], self.__data["Steps"], precision = precision)
         self.__M_table.setModel(self.__M_model)
 
-        self.__Inc_model = P1ResultsModel(self.__data["Inclination"], [str(x) for x in self.__data["Centers"].tolist()])
+        self.__Inc_model = P1ResultsModel(self.__data["Inclination"], self.__data["Centers"], precision = precision)
         self.__Inc_table.setModel(self.__Inc_model)
 
-        self.__Dec_model = P1ResultsModel(self.__data["Declination"], [str(x) for x in self.__data["Centers"].tolist()])
+        self.__Dec_model = P1ResultsModel(self.__data["Declination"], self.__data["Centers"], precision = precision)
         self.__Dec_table.setModel(self.__Dec_model)
 
-        self.__MADp_model = P1ResultsModel(self.__data["MADp"], [str(x) for x in self.__data["Centers"].tolist()])
+        self.__MADp_model = P1ResultsModel(self.__data["MADp"], self.__data["Centers"], precision = precision)
         self.__MADp_table.setModel(self.__MADp_model)
 
-        self.__MADo_model = P1ResultsModel(self.__data["MADo"], [str(x) for x in self.__data["Centers"].tolist()])
+        self.__MADo_model = P1ResultsModel(self.__data["MADo"], self.__data["Centers"], precision = precision)
         self.__MADo_table.setModel(self.__MADo_model)
 
+        self.__models = [self.__M_model, self.__Inc_model, self.__Dec_model, self.__MADp_model, self.__MADo_model]
+
         self.__update_mesh()
 
+    def set_progressive(self, backend: P1Backend, header: List, **kwargs):
+        """
+        Runs the mesh PCA in a background thread and shows coarse previews while samples are refined.
+
+        :type backend: P1Backend
+        :type header: list
+
+        :param backend: backend instance with data set
+        :param header: data header
+        :param kwargs: keyword arguments passed to P1Backend.run_mesh_progressive
+        """
+        self.__header = header
+
+        self.__worker = P1Worker(backend.run_mesh_progressive, **kwargs)
+        self.__worker.partial.connect(self.__on_mesh_partial)
+        self.__worker.result.connect(self.__on_mesh_result)
+        self.__worker.error.connect(self.__on_mesh_error)
+        self.__tabs.setCurrentWidget(self.__figure_widget)
+        self.__worker.start()
+
+    def __load_precision(self) -> int:
+        precision = int(QSettings().value("Table/Precision", -1))
+        return precision if precision >= 0 else None
+
+    def reload_settings(self):
+        """
+        Re-reads the table settings.
+        """
+        precision = self.__load_precision()
+        for model in self.__models:
+            model.set_precision(precision)
+
+    def closeEvent(self, event):
+        if self.__worker != None and self.__worker.isRunning():
+            self.__worker.cancel()
+            self.__worker.wait()
+        if self.__export != None:
+            self.__export.cancel()
+        super(P1MeshWindow, self).closeEvent(event)
+
+    @pyqtSlot(object)
+    def __on_mesh_partial(self, item):
+        outdata, done, final = item
+
+        # Only redraw once a refinement pass is complete
+        if not final or done.all() or done.sum() < 2:
+            return
+
+        rows = np.flatnonzero(done)
+        preview = {key: outdata[key][rows] for key in ["Samples", "M", "Inclination", "Declination", "MADp", "MADo"]}
+        preview["Centers"] = outdata["Centers"]
+        preview["Steps"] = outdata["Steps"]
+        preview["header"] = self.__header
+
+        self.__data = preview
+        self.__update_mesh()
+
+    @pyqtSlot(object)
+    def __on_mesh_result(self, item):
+        outdata = item[0]
+        outdata["header"] = self.__header
+        self.set_data(outdata)
+
+    @pyqtSlot(object)
+    def __on_mesh_error(self, error):
+        QMessageBox.warning(self, "Mesh warning", "Error while running mesh PCA!\n{0}".format(error), QMessageBox.Ok)
+
     def __update_mesh(self):
         self.__figure.clf()
         self.__figure = mesh_plot("", self.__data, figure=self.__figure, ylabel=self.__data["header"][0])
@@ -158,294 +236,43 @@ class P1MeshWindow(QWidget):
         dlg.setWindowIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("grip-vertical", "solid"))
 
         if dlg.exec_() == QDialog.Accepted:
-            # Determine file extension
-            ind = dlg.fmtCombo.currentIndex()
-            fmt = "csv" if ind == 0 else "xlsx"
-
-            # NRM
-            if dlg.nrmCheck.isChecked():
-                fileout = os.path.join(dlg.pathPicker.getPath(), "Magnetization_Mesh_{0}.{1}".format(len(self.__data["Centers"]), fmt))
-                if fmt == "csv":
-                    # Make header
-                    if dlg.stepCheck.isChecked():
-                        header = "," + ",".join([str(x) for x in self.__data["Steps"]])
-                    else:
-                        header = ""
-                    
-                    # Prepare data and add vectors if desired
-                    data = self.__data["M"]
-                    if dlg.sampleCheck.isChecked():
-                        data = np.insert(data, 0, values = self.__data["Samples"], axis = 1)
-
-                    try:                    
-                        np.savetxt(fileout, data, delimiter = ",", header = header)
-                    except PermissionError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot open file for writing.")
-                        err.setInformativeText("Make sure the file is not locked/opened by another program.")
-                        err.setDetailedText("Affected file: {0}".format(fileout))
-                        err.exec()
-                        return
-
-                else:
-                    try:
-                        import xlsxwriter
-                    except ModuleNotFoundError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot find xlsxwriter module.")
-                        err.setInformativeText("Install xlsxwriter module to enable xls(x) export.")
-                        err.setDetailedText("Try installing xlsxwriter via pip from the command line: pip install xlsxwriter")
-                        err.exec()
-                        return
-                    
-                    workbook = xlsxwriter.Workbook(fileout)
-                    worksheet = workbook.add_worksheet()
-
-                    col = 0
-                    if dlg.sampleCheck.isChecked():
-                        worksheet.write(0, col, "SampleID/Depth")
-                        for row, s in enumerate(self.__data["Samples"]):
-                            worksheet.write(row + 1, col, s)
-                        col += 1
-                    
-                    for c, step in enumerate(self.__data["Steps"]):
-                        worksheet.write(0, c + col, str(step))
-
-                    row = 1
-                    for m in self.__data["M"]:
-                        for c in range(col, len(m) + col):
-                            worksheet.write(row, c, m[c - col])
-                        row += 1
-                    
-                    workbook.close()
-
-            # Inclination
-            if dlg.incCheck.isChecked():
-                fileout = os.path.join(dlg.pathPicker.getPath(), "Inclination_Mesh_{0}.{1}".format(len(self.__data["Centers"]), fmt))
-                if fmt == "csv":
-                    # Make header
-                    if dlg.stepCheck.isChecked():
-                        header = "," + ",".join([str(x) for x in self.__data["Centers"]])
-                    else:
-                        header = ""
-                    
-                    # Prepare data and add vectors if desired
-                    data = self.__data["Inclination"]
-                    if dlg.sampleCheck.isChecked():
-                        data = np.insert(data, 0, values = self.__data["Samples"], axis = 1)
-
-                    try:                    
-                        np.savetxt(fileout, data, delimiter = ",", header = header)
-                    except PermissionError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot open file for writing.")
-                        err.setInformativeText("Make sure the file is not locked/opened by another program.")
-                        err.setDetailedText("Affected file: {0}".format(fileout))
-                        err.exec()
-                        return
-
+            # Determine file extension, e.g. "CSV file (*.csv)"
+            fmt = dlg.fmtCombo.currentText().split("(*.")[1].rstrip(")")
+
+            if fmt == "xlsx":
+                if importlib.util.find_spec("xlsxwriter") is None:
+                    err = QMessageBox(self)
+                    err.setText("Cannot find xlsxwriter module.")
+                    err.setInformativeText("Install xlsxwriter module to enable xls(x) export.")
+                    err.setDetailedText("Try installing xlsxwriter via pip from the command line: pip install xlsxwriter")
+                    err.exec()
+                    return
+
+            # Selected matrices with the vector labelling their columns
+            files = []
+            for check, name, key, columns in ((dlg.nrmCheck, "Magnetization", "M", "Steps"),
+                                              (dlg.incCheck, "Inclination", "Inclination", "Centers"),
+                                              (dlg.decCheck, "Declination", "Declination", "Centers"),
+                                              (dlg.madpCheck, "MADp", "MADp", "Centers"),
+                                              (dlg.madoCheck, "MADo", "MADo", "Centers")):
+                if check.isChecked():
+                    fileout = os.path.join(dlg.pathPicker.getPath(), "{0}_Mesh_{1}.{2}".format(name, len(self.__data["Centers"]), fmt))
+                    files.append((fileout, self.__data[key], self.__data[columns]))
+
+            # Files are written in the background, samples are added as first column if desired
+            sample = self.__data.get("Labels", self.__data["Samples"]) if dlg.sampleCheck.isChecked() else None
+            jobs = []
+            for fileout, data, columns in files:
+                if fmt == "xlsx":
+                    header = columns
+                elif dlg.stepCheck.isChecked():
+                    header = "," + ",".join([str(x) for x in columns])
                 else:
-                    try:
-                        import xlsxwriter
-                    except ModuleNotFoundError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot find xlsxwriter module.")
-                        err.setInformativeText("Install xlsxwriter module to enable xls(x) export.")
-                        err.setDetailedText("Try installing xlsxwriter via pip from the command line: pip install xlsxwriter")
-                        err.exec()
-                        return
-                    
-                    workbook = xlsxwriter.Workbook(fileout)
-                    worksheet = workbook.add_worksheet()
-
-                    col = 0
-                    if dlg.sampleCheck.isChecked():
-                        worksheet.write(0, col, "SampleID/Depth")
-                        for row, s in enumerate(self.__data["Samples"]):
-                            worksheet.write(row + 1, col, s)
-                        col += 1
-                    
-                    for c, center in enumerate(self.__data["Centers"]):
-                        worksheet.write(0, c + col, str(center))
-
-                    row = 1
-                    for i in self.__data["Inclination"]:
-                        for c in range(col, len(i) + col):
-                            worksheet.write(row, c, i[c - col])
-                        row += 1
-                    
-                    workbook.close()
-
-            # Declination
-            if dlg.decCheck.isChecked():
-                fileout = os.path.join(dlg.pathPicker.getPath(), "Declination_Mesh_{0}.{1}".format(len(self.__data["Centers"]), fmt))
-                if fmt == "csv":
-                    # Make header
-                    if dlg.stepCheck.isChecked():
-                        header = "," + ",".join([str(x) for x in self.__data["Centers"]])
-                    else:
-                        header = ""
-                    
-                    # Prepare data and add vectors if desired
-                    data = self.__data["Declination"]
-                    if dlg.sampleCheck.isChecked():
-                        data = np.insert(data, 0, values = self.__data["Samples"], axis = 1)
-
-                    try:                    
-                        np.savetxt(fileout, data, delimiter = ",", header = header)
-                    except PermissionError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot open file for writing.")
-                        err.setInformativeText("Make sure the file is not locked/opened by another program.")
-                        err.setDetailedText("Affected file: {0}".format(fileout))
-                        err.exec()
-                        return
+                    header = ""
+                jobs.append({"outfile": fileout, "data": data, "header": header, "sample": sample})
 
-                else:
-                    try:
-                        import xlsxwriter
-                    except ModuleNotFoundError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot find xlsxwriter module.")
-                        err.setInformativeText("Install xlsxwriter module to enable xls(x) export.")
-                        err.setDetailedText("Try installing xlsxwriter via pip from the command line: pip install xlsxwriter")
-                        err.exec()
-                        return
-                    
-                    workbook = xlsxwriter.Workbook(fileout)
-                    worksheet = workbook.add_worksheet()
-
-                    col = 0
-                    if dlg.sampleCheck.isChecked():
-                        worksheet.write(0, col, "SampleID/Depth")
-                        for row, s in enumerate(self.__data["Samples"]):
-                            worksheet.write(row + 1, col, s)
-                        col += 1
-                    
-                    for c, center in enumerate(self.__data["Centers"]):
-                        worksheet.write(0, c + col, str(center))
-
-                    row = 1
-                    for d in self.__data["Declination"]:
-                        for c in range(col, len(d) + col):
-                            worksheet.write(row, c, d[c - col])
-                        row += 1
-                    
-                    workbook.close()
-
-            # MADp
-            if dlg.madpCheck.isChecked():
-                fileout = os.path.join(dlg.pathPicker.getPath(), "MADp_Mesh_{0}.{1}".format(len(self.__data["Centers"]), fmt))
-                if fmt == "csv":
-                    # Make header
-                    if dlg.stepCheck.isChecked():
-                        header = "," + ",".join([str(x) for x in self.__data["Centers"]])
-                    else:
-                        header = ""
-                    
-                    # Prepare data and add vectors if desired
-                    data = self.__data["MADp"]
-                    if dlg.sampleCheck.isChecked():
-                        data = np.insert(data, 0, values = self.__data["Samples"], axis = 1)
-
-                    try:                    
-                        np.savetxt(fileout, data, delimiter = ",", header = header)
-                    except PermissionError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot open file for writing.")
-                        err.setInformativeText("Make sure the file is not locked/opened by another program.")
-                        err.setDetailedText("Affected file: {0}".format(fileout))
-                        err.exec()
-                        return
-
-                else:
-                    try:
-                        import xlsxwriter
-                    except ModuleNotFoundError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot find xlsxwriter module.")
-                        err.setInformativeText("Install xlsxwriter module to enable xls(x) export.")
-                        err.setDetailedText("Try installing xlsxwriter via pip from the command line: pip install xlsxwriter")
-                        err.exec()
-                        return
-                    
-                    workbook = xlsxwriter.Workbook(fileout)
-                    worksheet = workbook.add_worksheet()
-
-                    col = 0
-                    if dlg.sampleCheck.isChecked():
-                        worksheet.write(0, col, "SampleID/Depth")
-                        for row, s in enumerate(self.__data["Samples"]):
-                            worksheet.write(row + 1, col, s)
-                        col += 1
-                    
-                    for c, center in enumerate(self.__data["Centers"]):
-                        worksheet.write(0, c + col, str(center))
-
-                    row = 1
-                    for m in self.__data["MADp"]:
-                        for c in range(col, len(m) + col):
-                            worksheet.write(row, c, m[c - col])
-                        row += 1
-                    
-                    workbook.close()
-
-            # MADo
-            if dlg.madoCheck.isChecked():
-                fileout = os.path.join(dlg.pathPicker.getPath(), "MADo_Mesh_{0}.{1}".format(len(self.__data["Centers"]), fmt))
-                if fmt == "csv":
-                    # Make header
-                    if dlg.stepCheck.isChecked():
-                        header = "," + ",".join([str(x) for x in self.__data["Centers"]])
-                    else:
-                        header = ""
-                    
-                    # Prepare data and add vectors if desired
-                    data = self.__data["MADo"]
-                    if dlg.sampleCheck.isChecked():
-                        data = np.insert(data, 0, values = self.__data["Samples"], axis = 1)
-
-                    try:                    
-                        np.savetxt(fileout, data, delimiter = ",", header = header)
-                    except PermissionError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot open file for writing.")
-                        err.setInformativeText("Make sure the file is not locked/opened by another program.")
-                        err.setDetailedText("Affected file: {0}".format(fileout))
-                        err.exec()
-                        return
-
-                else:
-                    try:
-                        import xlsxwriter
-                    except ModuleNotFoundError:
-                        err = QMessageBox(self)
-                        err.setText("Cannot find xlsxwriter module.")
-                        err.setInformativeText("Install xlsxwriter module to enable xls(x) export.")
-                        err.setDetailedText("Try installing xlsxwriter via pip from the command line: pip install xlsxwriter")
-                        err.exec()
-                        return
-                    
-                    workbook = xlsxwriter.Workbook(fileout)
-                    worksheet = workbook.add_worksheet()
-
-                    col = 0
-                    if dlg.sampleCheck.isChecked():
-                        worksheet.write(0, col, "SampleID/Depth")
-                        for row, s in enumerate(self.__data["Samples"]):
-                            worksheet.write(row + 1, col, s)
-                        col += 1
-                    
-                    for c, center in enumerate(self.__data["Centers"]):
-                        worksheet.write(0, c + col, str(center))
-
-                    row = 1
-                    for m in self.__data["MADo"]:
-                        for c in range(col, len(m) + col):
-                            worksheet.write(row, c, m[c - col])
-                        row += 1
-                    
-                    workbook.close()
+            self.__export = P1TableExport(jobs, self)
+            self.__export.start()
 
     @pyqtSlot()
     def __export_mesh(self):
@@ -36,6 +36,10 @@ class P1SingleIntervalDialog(QDialog):
         self.originCheck = QCheckBox(self)
         self.__layout.addRow(QLabel("Include origin"), self.originCheck)
 
+        self.variantsCheck = QCheckBox(self)
+        self.variantsCheck.setToolTip("Compute anchored/free and with/without origin at once")
+        self.__layout.addRow(QLabel("All variants"), self.variantsCheck)
+
         self.buttonBox = QDialogButtonBox(self)
         self.buttonBox.setOrientation(Qt.Horizontal)
         self.buttonBox.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
@@ -74,6 +78,10 @@ class P1BestFitDialog(QDialog):
         self.originCheck = QCheckBox(self)
         self.__layout.addRow(QLabel("Include origin"), self.originCheck)
 
+        self.variantsCheck = QCheckBox(self)
+        self.variantsCheck.setToolTip("Compute anchored/free and with/without origin at once")
+        self.__layout.addRow(QLabel("All variants"), self.variantsCheck)
+
         self.buttonBox = QDialogButtonBox(self)
         self.buttonBox.setOrientation(Qt.Horizontal)
         self.buttonBox.setStandardButtons(QDialogButtonBox.Cancel | QDialogButtonBox.Ok)
@@ -97,11 +105,13 @@ class P1MeshDialog(QDialog):
         self.checkDifference = QCheckBox(self)
         self.anchorCheck = QCheckBox(self)
         self.originCheck = QCheckBox(self)
+        self.progressiveCheck = QCheckBox(self)
 
         self.__layout.addRow(QLabel("Steps:"), self.stepSpin)
         self.__layout.addRow(QLabel("Difference Vector"), self.checkDifference)
         self.__layout.addRow(QLabel("Anchor"), self.anchorCheck)
         self.__layout.addRow(QLabel("Include origin"), self.originCheck)
+        self.__layout.addRow(QLabel("Progressive preview"), self.progressiveCheck)
 
         self.buttonBox = QDialogButtonBox(self)
         self.buttonBox.setOrientation(Qt.Horizontal)
@@ -1,15 +1,17 @@
 # Standard library
-import sys
+import os
+import importlib.util
 from ast import literal_eval
 
 # Qt
 from PyQt5.QtCore import Qt, QCoreApplication, pyqtSlot, QSettings
-from PyQt5.QtWidgets import QWidget, QGridLayout, QTableView, QMenuBar, QMenu, QToolButton, QComboBox, QAction, QTabWidget, QVBoxLayout, QFileDialog, QMessageBox, QDialog
+from PyQt5.QtWidgets import QWidget, QGridLayout, QTableView, QMenuBar, QMenu, QToolButton, QAction, QActionGroup, QTabWidget, QVBoxLayout, QFileDialog, QInputDialog, QMessageBox, QDialog
 
 # Matplotlib
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
+from matplotlib.text import Text
 
 # Numpy
 import numpy as np
@@ -17,24 +19,34 @@ import numpy as np
 # palaeopca
 from palaeopca.P1Backend.P1DataObject import P1DataObject
 from palaeopca.P1Backend.P1Backend import P1Backend
+from palaeopca.P1Backend.P1Kernel import P1IntervalPCA
 
 from palaeopca.P1Gui.P1ResultsModel import P1ResultsModel
 from palaeopca.P1Gui.P1ProgressBar import P1ProgressBar
+from palaeopca.P1Gui.P1ZijderView import P1ZijderView
+from palaeopca.P1Gui.P1TableExport import P1TableExport
+from palaeopca.P1Gui.P1ThumbnailView import P1ThumbnailView
 
-from palaeopca.P1Mpl.P1Zijder import zijder_plot
-from palaeopca.P1Mpl.P1Sequence import sequence_plot
+from palaeopca.P1Mpl.P1Zijder import P1ZijderProjection, pca_line_angles
+from palaeopca.P1Utils.P1PCALine import PCALine
+from palaeopca.P1Mpl.P1Sequence import sequence_plot, P1SequenceLOD
 
 import palaeopca.P1Utils.P1PixmapCache
 
 
 class P1PCAWindow(QWidget):
+    variant_labels = ["Free", "Free, origin", "Anchored", "Anchored, origin"]
+
     def __init__(self, parent = None):
         super(P1PCAWindow, self).__init__(parent)
 
-        s = QSettings()
-        self.__anno = literal_eval(s.value("Zijder/anno", "True"))
-        self.__mark = literal_eval(s.value("Zijder/mark", "True"))
-        self.__line = literal_eval(s.value("Zijder/line", "True"))
+        self.__load_settings()
+
+        self.__data = None
+        self.__interval = None
+        self.__selection = None
+        self.__sequence_lod = None
+        self.__export = None
 
         self.__setupGui()
         self.__connectGui()
@@ -47,6 +59,7 @@ class P1PCAWindow(QWidget):
         self.__model = None
 
         self.__setupZijderTab()
+        self.__thumbnails = P1ThumbnailView()
         
         self.__sequence_figure_widget = QWidget()
         self.__sequence_figure_widget.setLayout(QVBoxLayout())
@@ -59,6 +72,7 @@ class P1PCAWindow(QWidget):
         self.__tabs = QTabWidget()
         self.__tabs.addTab(self.__table, "PCA Results")
         self.__tabs.addTab(self.__zijder_widget, "Zijderveld Plots")
+        self.__tabs.addTab(self.__thumbnails, "Thumbnails")
         self.__tabs.addTab(self.__sequence_figure_widget, "Sequence Plot")
 
         self.__layout.addWidget(self.__tabs)
@@ -88,42 +102,41 @@ class P1PCAWindow(QWidget):
         self.__action_export_sequence.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("chart-bar", "solid"))
         self.__action_export_sequence.setText("Export sequence plot")
 
+        self.__action_export_magic = QAction(self)
+        self.__action_export_magic.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("file-alt", "solid"))
+        self.__action_export_magic.setText("Export MagIC specimens")
+
         self.__exportMenu.addAction(self.__action_export_data)
         self.__exportMenu.addAction(self.__action_export_zijder)
         self.__exportMenu.addAction(self.__action_export_sequence)
+        self.__exportMenu.addAction(self.__action_export_magic)
+
+        self.__variantMenu = QMenu("Variant")
+        self.__variantGroup = QActionGroup(self)
+        self.__variantGroup.setExclusive(True)
+
+        for n, label in enumerate(self.variant_labels):
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setData(n)
+            self.__variantGroup.addAction(action)
+            self.__variantMenu.addAction(action)
 
         self.__menu.addMenu(self.__fileMenu)
         self.__menu.addMenu(self.__exportMenu)
+        self.__menu.addMenu(self.__variantMenu)
 
         self.__layout.setMenuBar(self.__menu)
 
     def __setupZijderTab(self):
-        self.__zijder_widget = QWidget()
-        self.__zijder_layout = QGridLayout()
-
-        self.__zijder_figure = Figure(figsize = (4, 4), dpi = 150)
-        self.__zijder_canvas = FigureCanvasQTAgg(self.__zijder_figure)
-
-        self.__zijder_toolbar = NavigationToolbar2QT(self.__zijder_canvas, self.__zijder_widget)
-
-        self.__prevButton = QToolButton(self)
-        self.__prevButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
-        self.__prevButton.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("chevron-left", "solid"))
-
-        self.__sampleCombo = QComboBox(self)
+        self.__zijder_widget = P1ZijderView()
 
-        self.__nextButton = QToolButton(self)
-        self.__nextButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
-        self.__nextButton.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("chevron-right", "solid"))
-
-        self.__zijder_layout.addWidget(self.__zijder_toolbar, 0, 0, 1, 1)
-        self.__zijder_layout.addWidget(self.__prevButton, 0, 1, 1, 1)
-        self.__zijder_layout.addWidget(self.__sampleCombo, 0, 2, 1, 1)
-        self.__zijder_layout.addWidget(self.__nextButton, 0, 3, 1, 1)
-        self.__zijder_layout.addWidget(self.__zijder_canvas, 1, 0, 1, 4)
-        self.__zijder_layout.setRowStretch(1, 10)
-
-        self.__zijder_widget.setLayout(self.__zijder_layout)
+        self.__selectButton = QToolButton(self)
+        self.__selectButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
+        self.__selectButton.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("arrows-alt-h", "solid"))
+        self.__selectButton.setToolTip("Select PCA interval by dragging between two steps")
+        self.__selectButton.setCheckable(True)
+        self.__zijder_widget.addToolWidget(self.__selectButton)
 
     def __connectGui(self):
         self.__action_close.triggered.connect(self.parent().close)
@@ -131,124 +144,337 @@ class P1PCAWindow(QWidget):
         self.__action_export_data.triggered.connect(self.__export_data)
         self.__action_export_zijder.triggered.connect(self.__export_zijder)
         self.__action_export_sequence.triggered.connect(self.__export_sequence)
+        self.__action_export_magic.triggered.connect(self.__export_magic)
+
+        self.__thumbnails.sampleActivated.connect(self.__on_thumbnail_activated)
 
-        self.__sampleCombo.currentIndexChanged.connect(self.__update_zijder)
-        self.__prevButton.clicked.connect(self.__on_prev_button_clicked)
-        self.__nextButton.clicked.connect(self.__on_next_button_clicked)
+        self.__variantGroup.triggered.connect(self.__on_variant_triggered)
+
+        self.__zijder_widget.canvas.mpl_connect("button_press_event", self.__on_zijder_press)
+        self.__zijder_widget.canvas.mpl_connect("motion_notify_event", self.__on_zijder_motion)
+        self.__zijder_widget.canvas.mpl_connect("button_release_event", self.__on_zijder_release)
     
-    def set_data(self, data: P1DataObject, results: np.ndarray, NRM_unit: str = "A/m"):
+    def __load_settings(self):
+        s = QSettings()
+        self.__anno = literal_eval(s.value("Zijder/anno", "True"))
+        self.__mark = literal_eval(s.value("Zijder/mark", "True"))
+        self.__line = literal_eval(s.value("Zijder/line", "True"))
+        self.__projection = (s.value("Zijder/xh", "N"), s.value("Zijder/xv", "N"), s.value("Zijder/y", "W"), s.value("Zijder/z", "Up"))
+        self.__precision = int(s.value("Table/Precision", -1))
+        if self.__precision < 0:
+            self.__precision = None
+
+    def reload_settings(self):
+        """
+        Re-reads the plot settings, cached plots are invalidated.
+        """
+        self.__load_settings()
+
+        if self.__model is not None:
+            self.__model.set_precision(self.__precision)
+
+        if self.__data is not None:
+            self.__project()
+            self.__update_thumbnails()
+            self.__zijder_widget.set_components(self.__projection)
+
+    def closeEvent(self, event):
+        self.__zijder_widget.shutdown()
+        self.__thumbnails.model.shutdown()
+        if self.__export is not None:
+            self.__export.cancel()
+        super(P1PCAWindow, self).closeEvent(event)
+
+    def set_data(self, data: P1DataObject, results: np.ndarray, NRM_unit: str = "A/m", variant: int = 0):
+        """
+        Sets data and pca results.
+
+        :type data: P1DataObject
+        :type results: numpy.ndarray
+        :type NRM_unit: string
+        :type variant: integer
+
+        :param data: data container
+        :param results: pca results, either (samples, 8) or stacked variants (variants, samples, 8) as returned with variants="all"
+        :param NRM_unit: units for NRM (default: A/m)
+        :param variant: index of the pca variant in P1Backend.pca_variants, shown first if results are stacked (default: 0)
+        """
         self.__data = data
-        self.__results = results
         self.__nrm_unit = NRM_unit
 
-        self.__model = P1ResultsModel(results, ["SampleID/Depth", "NRM ({0})".format(NRM_unit), "Inclination (°)", "Declination (°)", "MADp (°)", "MADo (°)", "Min step", "Max step"])
-        self.__table.setModel(self.__model)
+        # Interactive interval selection uses the options of the shown variant
+        self.__variant = variant
+        anchor, origin = P1Backend.pca_variants[variant]
+        self.__interval = P1IntervalPCA(data, anchor, origin)
+
+        # Stacked results can be toggled through the variant menu
+        if results.ndim == 3:
+            self.__variants = results
+            results = results[variant]
+            self.__variantGroup.actions()[variant].setChecked(True)
+        else:
+            self.__variants = None
+        self.__variantMenu.setEnabled(self.__variants is not None)
 
-        self.__sampleCombo.currentIndexChanged.disconnect(self.__update_zijder)
-        self.__sampleCombo.clear()
-        self.__sampleCombo.addItems([str(x) for x in self.__data.get_samples().tolist()])
-        self.__sampleCombo.currentIndexChanged.connect(self.__update_zijder)
+        self.__set_results(results)
 
-        self.__update_zijder(0)
+        self.__zijder_widget.set_data(data, self.__projection, self.__zijder_kwargs)
         self.__update_sequence()
 
-    @pyqtSlot()
-    def __on_prev_button_clicked(self):
-        self.__sampleCombo.setCurrentIndex(self.__sampleCombo.currentIndex() - 1)
+    def __set_results(self, results: np.ndarray):
+        self.__results = results
+        self.__project()
+        self.__update_thumbnails()
 
-    @pyqtSlot()
-    def __on_next_button_clicked(self):
-        self.__sampleCombo.setCurrentIndex(self.__sampleCombo.currentIndex() + 1)
-    
-    @pyqtSlot(int)
-    def __update_zijder(self, index: int):
-        s = QSettings()
+        self.__model = P1ResultsModel(results, ["SampleID/Depth", "NRM ({0})".format(self.__nrm_unit), "Inclination (°)", "Declination (°)", "MADp (°)", "MADo (°)", "Min step", "Max step"], precision = self.__precision)
+        self.__table.setModel(self.__model)
 
-        # Set buttons
-        if index == 0: # no more going left
-            self.__prevButton.setDisabled(True)
-        elif index == self.__sampleCombo.count()-1:
-            self.__nextButton.setDisabled(True)
+    def __project(self, row: int = None):
+        """
+        Sets up the zijderveld projections of all samples or calculates a single row again.
+        Samples are projected when shown, lazily loaded files are not parsed as a whole.
+        """
+        if row is None:
+            self.__zijder_projection = P1ZijderProjection(self.__data, *self.__projection, self.__results)
         else:
-            self.__prevButton.setEnabled(True)
-            self.__nextButton.setEnabled(True)
-
-        # Update figure
-        current_sample = self.__sampleCombo.currentText()
-        current_data = self.__data.get_data(current_sample)
-        xh = s.value("Zijder/xh", "N")
-        xv = s.value("Zijder/xv", "N")
-        y = s.value("Zijder/y", "W")
-        z = s.value("Zijder/z", "Up")
-
-        self.__zijder_figure = zijder_plot(
-            current_sample, 
-            current_data,
-            xh, xv, y, z,
-            pca_results = self.__results[self.__sampleCombo.currentIndex()], 
-            pca_steps = self.__data.get_steps(), 
-            pca_anno = self.__anno,
-            pca_points = self.__mark,
-            pca_lines = self.__line,
-            figure = self.__zijder_figure
-        )
-        self.__zijder_canvas.draw()
-        QCoreApplication.processEvents()
+            self.__zijder_projection.update(row)
+            self.__thumbnails.model.invalidate(row)
+
+    def __update_thumbnails(self):
+        self.__thumbnails.set_data(self.__data.get_sample_names(), self.__zijder_projection, self.__mark, self.__line)
 
-    def __update_sequence(self):
-        self.__sequence_figure.clf()
-        self.__sequence_figure = sequence_plot("", self.__results, dpi = 72, figure = self.__sequence_figure)
+    @pyqtSlot(int)
+    def __on_thumbnail_activated(self, row: int):
+        self.__zijder_widget.setCurrentIndex(row)
+        self.__tabs.setCurrentWidget(self.__zijder_widget)
+
+    @pyqtSlot(QAction)
+    def __on_variant_triggered(self, action: QAction):
+        self.__variant = action.data()
+        self.__interval.set_options(*P1Backend.pca_variants[action.data()])
+        self.__set_results(self.__variants[action.data()])
+        self.__zijder_widget.refresh()
+        self.__update_sequence(False)
+
+    def __zijder_kwargs(self, index: int) -> dict:
+        return {
+            "pca_results": self.__results[index].copy(),
+            "pca_steps": self.__data.get_steps(),
+            "pca_anno": self.__anno,
+            "pca_points": self.__mark,
+            "pca_lines": self.__line,
+            "projection": self.__zijder_projection.get(index)
+        }
+
+    def __pick_step(self, event) -> int:
+        """
+        Returns the index of the step closest to the mouse position in either projection, None if no step is within reach.
+        """
+        sel = self.__selection
+        xy = np.array([event.x, event.y])
+        picked = None
+        dmin = sel["radius"]
+        for proj in (sel["h"], sel["v"]):
+            dist = np.hypot(*(sel["ax"].transData.transform(proj) - xy).T)
+            if np.all(np.isnan(dist)):
+                continue
+            n = int(np.nanargmin(dist))
+            if dist[n] <= dmin:
+                picked = n
+                dmin = dist[n]
+
+        return picked
+
+    def __on_zijder_press(self, event):
+        if not self.__selectButton.isChecked() or self.__interval is None:
+            return
+        if event.button != 1 or event.inaxes is None or self.__zijder_widget.toolbar.mode:
+            return
+
+        row = self.__zijder_widget.currentIndex()
+        projection = self.__zijder_projection.get(row)
+        ax = event.inaxes
+        self.__selection = {
+            "ax": ax,
+            "row": row,
+            "h": projection["h"],
+            "v": projection["v"],
+            "radius": 10 * self.__zijder_widget.figure.dpi / 72,
+            "out": np.full(4, np.nan)
+        }
+
+        first = self.__pick_step(event)
+        if first is None:
+            self.__selection = None
+            return
+        self.__selection["first"] = first
+        self.__selection["last"] = first
+
+        # Hide pca overlay and legend, the selection is drawn on top of a cached background
+        self.__selection["hidden"] = [a for a in list(ax.get_lines()[2:]) + [ax.get_legend()] if a is not None and a.get_visible()]
+        for a in self.__selection["hidden"]:
+            a.set_visible(False)
+        self.__zijder_widget.canvas.draw()
+        self.__selection["background"] = self.__zijder_widget.canvas.copy_from_bbox(self.__zijder_widget.figure.bbox)
+
+        # Artists are not added to the axis, so zijder_plot keeps its line order
+        artists = [
+            Line2D([], [], linestyle = "", marker = "s", color = "blue", markerfacecolor = "blue"),
+            Line2D([], [], linestyle = "", marker = "^", color = "red", markerfacecolor = "red"),
+            Line2D([], [], linestyle = "-", color = "black"),
+            Line2D([], [], linestyle = "-", color = "black")
+        ]
+        for a in artists:
+            a.set_transform(ax.transData)
+            a.set_clip_box(ax.bbox)
+        artists.append(Text(1.02, 0, "", transform = ax.transAxes, verticalalignment = "bottom"))
+        for a in artists:
+            a.set_figure(self.__zijder_widget.figure)
+            a.set_animated(True)
+        self.__selection["artists"] = artists
+
+        self.__update_selection()
+
+    def __on_zijder_motion(self, event):
+        if self.__selection is None or event.inaxes is not self.__selection["ax"]:
+            return
+
+        last = self.__pick_step(event)
+        if last is None or last == self.__selection["last"]:
+            return
+        self.__selection["last"] = last
+
+        self.__update_selection()
+
+    def __on_zijder_release(self, event):
+        if self.__selection is None:
+            return
+        sel = self.__selection
+        self.__selection = None
+
+        for a in sel["hidden"]:
+            a.set_visible(True)
+
+        # Write chosen interval back into the results, stacked variants share the memory
+        first, last = sorted((sel["first"], sel["last"]))
+        if last > first and not np.any(np.isnan(sel["out"])):
+            steps = self.__data.get_steps()
+            row = sel["row"]
+            self.__results[row, 2:6] = sel["out"]
+            self.__results[row, 6] = steps[first]
+            self.__results[row, 7] = steps[last]
+            self.__model.dataChanged.emit(self.__model.index(row, 2), self.__model.index(row, 7))
+            self.__project(row)
+            self.__update_sequence(False)
+
+        self.__zijder_widget.refresh()
+
+    def __update_selection(self):
+        """
+        Runs the pca on the selected interval and redraws only the selection artists.
+        """
+        sel = self.__selection
+        first, last = sorted((sel["first"], sel["last"]))
+        h_points, v_points, v_line, h_line, text = sel["artists"]
+
+        h_points.set_data(sel["h"][first:last+1, 0], sel["h"][first:last+1, 1])
+        v_points.set_data(sel["v"][first:last+1, 0], sel["v"][first:last+1, 1])
+
+        steps = self.__data.get_steps()
+        if last > first:
+            inc, dec, madp, mado = self.__interval.fit(sel["row"], first, last, sel["out"])
+
+            angle_h, angle_v = pca_line_angles(inc, dec, *self.__projection)
+            h_line.set_data(*PCALine(sel["h"][first:last+1, 0], sel["h"][first:last+1, 1], angle_h, 1.5))
+            v_line.set_data(*PCALine(sel["v"][first:last+1, 0], sel["v"][first:last+1, 1], angle_v, 1.5))
+
+            text.set_text("{0} - {1}\nInc: {2:.1f} ($^o$)\nDec: {3:.1f} ($^o$)\nMADp: {4:.1f} ($^o$)\nMADo: {5:.1f} ($^o$)".format(steps[first], steps[last], inc, dec, madp, mado))
+        else:
+            sel["out"][:] = np.nan
+            h_line.set_data([], [])
+            v_line.set_data([], [])
+            text.set_text("{0}".format(steps[first]))
+
+        self.__zijder_widget.canvas.restore_region(sel["background"])
+        for a in sel["artists"]:
+            self.__zijder_widget.figure.draw_artist(a)
+        self.__zijder_widget.canvas.blit(self.__zijder_widget.figure.bbox)
+
+    def __update_sequence(self, rebuild: bool = True):
+        """
+        Draws the sequence plot, results of the same samples are swapped into the existing lines unless rebuild is set.
+        """
+        if rebuild or self.__sequence_lod is None:
+            self.__sequence_figure.clf()
+            self.__sequence_lod = P1SequenceLOD(self.__results)
+            self.__sequence_figure = sequence_plot("", self.__results, dpi = 72, figure = self.__sequence_figure, lod = self.__sequence_lod)
+        else:
+            self.__sequence_lod.set_data(self.__results)
         self.__sequence_canvas.draw()
         QCoreApplication.processEvents()
 
     @pyqtSlot()
     def __export_data(self):
         # Get file name
-        __filter = "CSV file (*.csv)"
+        __filter = "CSV file (*.csv);;Compressed CSV file (*.csv.gz)"
 
-        try:
-            import xlsxwriter
-        except ModuleNotFoundError:
-            pass
-        if "xlsxwriter" in sys.modules:
+        if importlib.util.find_spec("xlsxwriter") is not None:
             __filter += ";;Excel file (*.xlsx)"
 
         fileout = QFileDialog.getSaveFileName(self, "Save PCA results", "", __filter)[0]
         header = "SampleID/Depth,NRM ({0}),Inclination (°),Declination (°),MADp (°),MADo (°),Min. step,Max. step".format(self.__nrm_unit)
 
+        if fileout == "":
+            return
+
         # Check file extension, set to csv if none was given
-        if len(fileout.split(".")) == 1: # Not extension provided
+        if os.path.splitext(fileout)[1] == "": # Not extension provided
             fileout += ".csv"
 
-        # Save file
-        if fileout.split(".")[1] == "csv":
-            np.savetxt(fileout, self.__results, delimiter = ",", header = header)
-        else:            
-            workbook = xlsxwriter.Workbook(fileout)
-            worksheet = workbook.add_worksheet()
-
-            worksheet.write(0, 0, "SampleID/Depth")
-            worksheet.write(0, 1, "NRM {0}".format(self.__nrm_unit))
-            worksheet.write(0, 2, "Inclination (°)")
-            worksheet.write(0, 3, "Declination (°)")
-            worksheet.write(0, 4, "MADp (°)")
-            worksheet.write(0, 5, "MADo (°)")
-            worksheet.write(0, 6, "Min. Step")
-            worksheet.write(0, 7, "Max. Step")
-
-            row = 1
-            for S, N, I, D, Mp, Mo, MiS, MaS in self.__results:
-                worksheet.write(row, 0, S)
-                worksheet.write(row, 1, N)
-                worksheet.write(row, 2, I)
-                worksheet.write(row, 3, D)
-                worksheet.write(row, 4, Mp)
-                worksheet.write(row, 5, Mo)
-                worksheet.write(row, 6, MiS)
-                worksheet.write(row, 7, MaS)
-                row += 1
-            
-            workbook.close()
+        # Save file in the background, results are copied as interval selection may change them while writing
+        if fileout.endswith(".xlsx"):
+            header = ["SampleID/Depth", "NRM {0}".format(self.__nrm_unit), "Inclination (°)", "Declination (°)", "MADp (°)", "MADo (°)", "Min. Step", "Max. Step"]
+        job = {"outfile": fileout, "data": self.__results.copy(), "header": header}
+        if self.__data.get_labels() is not None and self.__data.has_depth():
+            # Labels are written in front of the depth
+            job["sample"] = self.__data.get_labels()
+            if isinstance(header, list):
+                job["sample_header"] = "Label"
+            else:
+                job["header"] = "Label," + header
+        elif self.__data.get_labels() is not None:
+            # Labels replace the sample codes
+            job["data"] = job["data"][:, 1:]
+            job["sample"] = self.__data.get_labels()
+            if isinstance(header, list):
+                job["header"] = header[1:]
+        self.__export = P1TableExport([job], self)
+        self.__export.start()
+
+    @pyqtSlot()
+    def __export_magic(self):
+        fileout = QFileDialog.getSaveFileName(self, "Save MagIC specimens", "specimens.txt", "MagIC specimens (*.txt)")[0]
+
+        if fileout == "":
+            return
+
+        if os.path.splitext(fileout)[1] == "": # Not extension provided
+            fileout += ".txt"
+
+        # MagIC stores steps in T or K, the unit is only asked for if the data did not come with one
+        unit = self.__data.get_step_unit()
+        if unit is None:
+            unit, ok = QInputDialog.getItem(self, "MagIC specimens", "Unit of the steps:", ["mT", "C"], 0, False)
+            if not ok:
+                return
+
+        from palaeopca.P1Backend.P1MagIC import write_specimens
+
+        anchor, origin = P1Backend.pca_variants[self.__variant]
+        try:
+            write_specimens(fileout, self.__results, self.__data.get_sample_names(), unit, anchor, origin)
+        except OSError:
+            QMessageBox.warning(self, "Export warning", "Error while writing MagIC file!", QMessageBox.Ok)
 
     @pyqtSlot()
     def __export_zijder(self):
@@ -261,7 +487,7 @@ class P1PCAWindow(QWidget):
             pbar = P1ProgressBar(self)
             pbar.progress.setValue(0)
 
-            from palaeopca.P1Mpl.P1Zijder import zijder_save
+            from palaeopca.P1Mpl.P1Zijder import zijder_export, zijder_pdf, zijder_contact_sheet
 
             outdir = dlg.pathPicker.getPath()
             if outdir == "":
@@ -282,7 +508,12 @@ class P1PCAWindow(QWidget):
             kwargs["pca_anno"] = dlg.annoCheck.isChecked()
             kwargs["pca_lines"] = dlg.lineCheck.isChecked()
 
-            zijder_save(outdir, indata, xh, xv, y, z, pbar = pbar, figsize = figsize, fmt = fmt, dpi = dpi, **kwargs)
+            if dlg.modeCombo.currentText() == "Multi-page PDF":
+                zijder_pdf(os.path.join(outdir, "Zijderveld.pdf"), indata, xh, xv, y, z, pbar = pbar, figsize = figsize, **kwargs)
+            elif dlg.modeCombo.currentText() == "Contact sheets":
+                zijder_contact_sheet(os.path.join(outdir, "Zijderveld_sheets.{0}".format(fmt)), indata, xh, xv, y, z, dlg.rowsSpin.value(), dlg.colsSpin.value(), pbar = pbar, dpi = dpi, **kwargs)
+            else:
+                zijder_export(outdir, indata, xh, xv, y, z, pbar = pbar, figsize = figsize, fmt = fmt, dpi = dpi, **kwargs)
 
             pbar.progress.setValue(100)
             pbar.close()
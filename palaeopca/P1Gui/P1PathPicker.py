@@ -35,6 +35,7 @@ class P1PathPicker(QWidget):
         self.__button.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("folder-open", "solid"))
 
         self.__button.clicked.connect(self.__showPathPickerDialog)
+        self.__lineEdit.textEdited.connect(self.lineChanged)
 
         self.__layout.addWidget(self.__lineEdit)
         self.__layout.addWidget(self.__button)
@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import QDialog, QProgressBar
 class P1ProgressBar(QDialog):
     def __init__(self, parent = None):
         super(P1ProgressBar, self).__init__(parent)
+        self.canceled = False
         self.__setupGui()
 
     def __setupGui(self):
@@ -12,3 +13,9 @@ class P1ProgressBar(QDialog):
         self.progress.setGeometry(0, 0, 300, 25)
         self.progress.setMaximum(100)
         self.show()
+
+    def reject(self):
+        # Closing the dialog before the task finished cancels it, if the task supports it
+        if self.progress.value() < self.progress.maximum():
+            self.canceled = True
+        super(P1ProgressBar, self).reject()
@@ -2,7 +2,7 @@
 from ast import literal_eval
 
 # PyQt
-from PyQt5.QtCore import QSettings
+from PyQt5.QtCore import QSettings, pyqtSignal
 from PyQt5.QtWidgets import QWidget, \
     QDialog, \
     QListWidget, \
@@ -27,6 +27,7 @@ import matplotlib.pyplot as plt
 # PalaeoPCA
 import palaeopca
 from palaeopca.P1Gui.P1PathPicker import P1PathPicker
+from palaeopca.P1Gui.P1ImportDialog import import_cache, column_presets
 
 
 def _icon(name, style = ""):
@@ -34,6 +35,8 @@ def _icon(name, style = ""):
     return icon
 
 class P1SettingsDialog(QDialog):
+    settingsSaved = pyqtSignal()
+
     def __init__(self, parent = None):
         super(P1SettingsDialog, self).__init__(parent)
 
@@ -173,6 +176,7 @@ class P1SettingsDialog(QDialog):
             self.__mesh_widget.save_settings()
 
         self.__changes = False
+        self.settingsSaved.emit()
 
 class P1GeneralSettings(QWidget):
     def __init__(self, parent = None):
@@ -186,20 +190,26 @@ class P1GeneralSettings(QWidget):
         self.__label_unitsIn = QLabel("Input units")
         self.__label_unitsOut = QLabel("NRM output units")
         self.__label_volume = QLabel("Volume")
+        self.__label_precision = QLabel("Table decimals")
 
         self.__combo_unitsIn = QComboBox()
         self.__combo_unitsIn.addItems(["emu", "Am2", "A/m"])
         self.__combo_unitsOut = QComboBox()
         self.__combo_unitsOut.addItems(["emu", "Am2", "A/m"])
         self.__line_volume = QLineEdit()
+        self.__spin_precision = QSpinBox()
+        self.__spin_precision.setRange(-1, 15)
+        self.__spin_precision.setSpecialValueText("Full")
 
         self.__layout.addWidget(self.__label_unitsIn, 0, 0)
         self.__layout.addWidget(self.__label_unitsOut, 1, 0)
         self.__layout.addWidget(self.__label_volume, 2, 0)
+        self.__layout.addWidget(self.__label_precision, 3, 0)
 
         self.__layout.addWidget(self.__combo_unitsIn, 0, 1)
         self.__layout.addWidget(self.__combo_unitsOut, 1, 1)
         self.__layout.addWidget(self.__line_volume, 2, 1)
+        self.__layout.addWidget(self.__spin_precision, 3, 1)
 
     def load_settings(self):
         if not self.loaded:
@@ -208,10 +218,12 @@ class P1GeneralSettings(QWidget):
             self.__combo_unitsIn.setCurrentText(s.value("Units/Input", "emu"))
             self.__combo_unitsOut.setCurrentText(s.value("Units/Output", "A/m"))
             self.__line_volume.setText(str(s.value("Params/Volume", "10")))
+            self.__spin_precision.setValue(int(s.value("Table/Precision", -1)))
 
             self.__combo_unitsIn.currentIndexChanged.connect(self.__dlg.set_active)
             self.__combo_unitsOut.currentIndexChanged.connect(self.__dlg.set_active)
             self.__line_volume.textEdited.connect(self.__dlg.set_active)
+            self.__spin_precision.valueChanged.connect(self.__dlg.set_active)
 
             self.loaded = True
 
@@ -221,6 +233,7 @@ class P1GeneralSettings(QWidget):
         s.setValue("Units/Input", self.__combo_unitsIn.currentText())
         s.setValue("Units/Output", self.__combo_unitsOut.currentText())
         s.setValue("Params/Volume", self.__line_volume.text())
+        s.setValue("Table/Precision", self.__spin_precision.value())
 
 class P1ImportSettings(QWidget):
     delimiters = {
@@ -257,16 +270,34 @@ class P1ImportSettings(QWidget):
 
         self.__check_space = QCheckBox("Skip whitespaces")
 
+        # Parsed files are kept as binary copies and read again without parsing
+        self.__label_cache = QLabel("Import cache (MB)")
+        self.__spin_cache = QSpinBox()
+        self.__spin_cache.setRange(0, 65536)
+        self.__spin_cache.setSpecialValueText("Off")
+        self.__button_cache = QPushButton("Clear cache")
+
+        # Presets are saved in the import dialog
+        self.__label_preset = QLabel("Column preset")
+        self.__combo_preset = QComboBox()
+
         self.__layout.addWidget(self.__label_num, 0, 0)
         self.__layout.addWidget(self.__label_sep, 1, 0)
         self.__layout.addWidget(self.__label_header, 2, 0)
         self.__layout.addWidget(self.__label_footer, 3, 0)
         self.__layout.addWidget(self.__check_space, 4, 0, 1, 2)
+        self.__layout.addWidget(self.__label_cache, 5, 0)
 
         self.__layout.addWidget(self.__combo_num, 0, 1)
         self.__layout.addWidget(self.__combo_sep, 1, 1)
         self.__layout.addWidget(self.__spin_header, 2, 1)
         self.__layout.addWidget(self.__spin_footer, 3, 1)
+        self.__layout.addWidget(self.__spin_cache, 5, 1)
+        self.__layout.addWidget(self.__button_cache, 6, 1)
+        self.__layout.addWidget(self.__label_preset, 7, 0)
+        self.__layout.addWidget(self.__combo_preset, 7, 1)
+
+        self.__button_cache.clicked.connect(self.__on_clear_cache)
 
     def load_settings(self):
         if not self.loaded:
@@ -277,12 +308,18 @@ class P1ImportSettings(QWidget):
             self.__spin_header.setValue(int(s.value("Import/SkipHeader", 1)))
             self.__spin_footer.setValue(int(s.value("Import/SkipFooter", 1)))
             self.__check_space.setChecked(literal_eval(s.value("Import/SkipWhitespaces", "False")))
+            self.__spin_cache.setValue(int(s.value("Import/CacheSize", 512)))
+            self.__combo_preset.addItem("Default")
+            self.__combo_preset.addItems(sorted(column_presets()))
+            self.__combo_preset.setCurrentText(s.value("Import/Preset", "Default"))
 
             self.__combo_num.currentIndexChanged.connect(self.__dlg.set_active)
             self.__combo_sep.currentIndexChanged.connect(self.__dlg.set_active)
             self.__spin_header.valueChanged.connect(self.__dlg.set_active)
             self.__spin_footer.valueChanged.connect(self.__dlg.set_active)
             self.__check_space.stateChanged.connect(self.__dlg.set_active)
+            self.__spin_cache.valueChanged.connect(self.__dlg.set_active)
+            self.__combo_preset.currentIndexChanged.connect(self.__dlg.set_active)
 
             self.loaded = True
 
@@ -297,6 +334,17 @@ class P1ImportSettings(QWidget):
             s.setValue("Import/SkipWhitespaces", "True")
         else:
             s.setValue("Import/SkipWhitespaces", "False")
+        s.setValue("Import/CacheSize", self.__spin_cache.value())
+        s.setValue("Import/Preset", self.__combo_preset.currentText())
+
+        # A smaller or disabled cache is trimmed right away
+        import_cache(True).evict()
+
+    def __on_clear_cache(self):
+        cache = import_cache(True)
+        size = cache.size()
+        cache.clear()
+        QMessageBox.information(self, "Import cache", "Removed {0:.1f} MB of cached files.".format((size - cache.size()) / 2**20), QMessageBox.Ok)
 
 class P1ZijderSettings(QWidget):
     def __init__(self, parent = None):
@@ -0,0 +1,77 @@
+from PyQt5.QtCore import QObject, pyqtSlot
+from PyQt5.QtWidgets import QMessageBox
+
+from palaeopca.P1Gui.P1ProgressBar import P1ProgressBar
+from palaeopca.P1Gui.P1Worker import P1Worker
+from palaeopca.P1Utils.files import write_csv, write_xlsx
+
+
+class P1TableExport(QObject):
+    """
+    Class implementing the background export of tables to Excel workbooks or text files with progress.
+    """
+    def __init__(self, jobs: list, parent = None):
+        """
+        Constructor
+
+        :param jobs: list of keyword argument dictionaries passed to P1Utils.files.write_xlsx for xlsx files or write_csv otherwise (list)
+        :param parent: parent widget, owns the progress bar (QWidget)
+        """
+        super(P1TableExport, self).__init__(parent)
+
+        self.__jobs = jobs
+        self.__pbar = None
+        self.__worker = None
+
+    def start(self):
+        """
+        Public method to start writing in a background thread.
+        """
+        self.__pbar = P1ProgressBar(self.parent())
+        self.__pbar.setWindowTitle("Exporting ...")
+
+        self.__worker = P1Worker(self.__run)
+        self.__worker.partial.connect(self.__on_partial)
+        self.__worker.error.connect(self.__on_error)
+        self.__worker.finished.connect(self.__on_finished)
+        self.__worker.start()
+
+    def cancel(self):
+        """
+        Public method to stop writing, incomplete files are removed.
+        """
+        if self.__worker is not None and self.__worker.isRunning():
+            self.__worker.cancel()
+            self.__worker.wait()
+
+    def __run(self):
+        total = max(sum(job["data"].shape[0] for job in self.__jobs), 1)
+        done = 0
+        for job in self.__jobs:
+            writer = write_xlsx(**job) if job["outfile"].endswith(".xlsx") else write_csv(**job)
+            try:
+                for rows in writer:
+                    yield int(100 * (done + rows) / total)
+            finally:
+                writer.close()
+            done += job["data"].shape[0]
+
+    @pyqtSlot(object)
+    def __on_partial(self, value: int):
+        if self.__pbar.canceled:
+            self.__worker.cancel()
+        elif value > self.__pbar.progress.value():
+            self.__pbar.progress.setValue(value)
+
+    @pyqtSlot(object)
+    def __on_error(self, error):
+        err = QMessageBox(self.parent())
+        err.setText("Cannot open file for writing.")
+        err.setInformativeText("Make sure the file is not locked/opened by another program.")
+        err.setDetailedText("{0}".format(error))
+        err.exec()
+
+    @pyqtSlot()
+    def __on_finished(self):
+        self.__pbar.progress.setValue(self.__pbar.progress.maximum())
+        self.__pbar.close()
@@ -0,0 +1,128 @@
+from typing import List
+
+import numpy as np
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from palaeopca.P1Utils.P1LRUCache import P1LRUCache
+
+
+class P1TableModel(QAbstractTableModel):
+    """
+    Class implementing a table model of a 2D array.
+
+    Cells are formatted column-wise for blocks of rows and kept in a cache, painting only looks up strings.
+    Rows are made available to the view in batches through canFetchMore/fetchMore.
+    """
+    def __init__(self, data: np.ndarray, header: List, parent = None, precision: int = None, block: int = 128, batch: int = 50000, cache_size: int = 64):
+        """
+        Constructor
+
+        :param data: 2D array shown in the table, None if a subclass reads the rows (numpy.ndarray)
+        :param header: column names, list or array (list)
+        :param parent: parent object (QObject)
+        :param precision: number of decimals, None formats values as str() (integer)
+        :param block: rows formatted at once (integer)
+        :param batch: rows added per fetchMore (integer)
+        :param cache_size: maximum number of cached blocks (integer)
+        """
+        QAbstractTableModel.__init__(self, parent)
+        self._data = data
+        self._header = header
+
+        self.__precision = precision
+        self.__block = block
+        self.__batch = batch
+        self.__blocks = P1LRUCache(cache_size)
+        self.__rows = min(batch, self._row_total())
+
+        # Cells written by the owner are formatted again
+        self.dataChanged.connect(self.__on_data_changed)
+
+    def rowCount(self, parent = QModelIndex()):
+        if parent is not None and parent.isValid():
+            return 0
+        return self.__rows
+
+    def columnCount(self, parent = QModelIndex()):
+        if parent is not None and parent.isValid():
+            return 0
+        return self._column_total()
+
+    def canFetchMore(self, parent = QModelIndex()):
+        if parent.isValid():
+            return False
+        return self.__rows < self._row_total()
+
+    def fetchMore(self, parent = QModelIndex()):
+        if parent.isValid():
+            return
+        rows = min(self.__rows + self.__batch, self._row_total())
+        self.beginInsertRows(QModelIndex(), self.__rows, rows - 1)
+        self.__rows = rows
+        self.endInsertRows()
+
+    def data(self, index, role = Qt.DisplayRole):
+        if index.isValid():
+            if role == Qt.DisplayRole:
+                n, row = divmod(index.row(), self.__block)
+                cells = self.__blocks.get(n)
+                if cells is None:
+                    cells = self.__format(n)
+                    self.__blocks.put(n, cells)
+                return cells[index.column()][row]
+        return None
+
+    def headerData(self, col, orientation, role):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return str(self._header[col])
+        return None
+
+    def precision(self) -> int:
+        return self.__precision
+
+    def set_precision(self, precision: int = None):
+        """
+        Sets the number of decimals shown.
+
+        :param precision: number of decimals, None formats values as str() (integer)
+        """
+        if precision == self.__precision:
+            return
+        self.__precision = precision
+        self.__blocks.clear()
+        if self.__rows > 0:
+            self.dataChanged.emit(self.index(0, 0), self.index(self.__rows - 1, self.columnCount() - 1))
+
+    def __format(self, n: int) -> List:
+        # One list of strings per column
+        values = self._rows(n * self.__block, (n + 1) * self.__block)
+        cells = []
+        for col in values.T:
+            if self.__precision is not None and np.issubdtype(col.dtype, np.floating):
+                cells.append(np.char.mod("%.{0}f".format(self.__precision), col).tolist())
+            else:
+                cells.append(col.astype(str).tolist())
+
+        labels = self._labels(n * self.__block, n * self.__block + values.shape[0])
+        if labels is not None:
+            cells[0] = labels.tolist()
+        return cells
+
+    def _row_total(self) -> int:
+        # Subclasses may read rows from another source than an array
+        return self._data.shape[0]
+
+    def _column_total(self) -> int:
+        return self._data.shape[1]
+
+    def _rows(self, start: int, stop: int) -> np.ndarray:
+        return self._data[start:stop]
+
+    def _labels(self, start: int, stop: int):
+        # Subclasses may show labels instead of the first column
+        return None
+
+    def __on_data_changed(self, top_left, bottom_right, roles = []):
+        for n in range(top_left.row() // self.__block, bottom_right.row() // self.__block + 1):
+            self.__blocks.pop(n)
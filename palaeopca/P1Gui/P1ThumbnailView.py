@@ -0,0 +1,303 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, QSize, QRectF, QPointF, QAbstractListModel, QModelIndex, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QBrush, QColor, QFont, QPolygonF
+from PyQt5.QtWidgets import QWidget, QListView, QVBoxLayout
+
+from palaeopca.P1Mpl.P1Zijder import P1ZijderProjection
+from palaeopca.P1Utils.P1LRUCache import P1LRUCache
+
+
+def zijder_thumbnail(sample: str, projection: dict, size: int = 96, pca_points: bool = False, pca_lines: bool = False) -> QImage:
+    """
+    Paints a small zijderveld plot from precalculated projection arrays, safe to call from worker threads.
+
+    :param sample: sample name (string)
+    :param projection: projection of a single sample, see P1Zijder.zijder_projection and zijder_sample (dict)
+    :param size: width and height in pixels (integer)
+    :param pca_points: mark points used in pca (bool)
+    :param pca_lines: plot pca lines (bool)
+    :return: thumbnail (QImage)
+    """
+    image = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.white)
+
+    h = projection["h"]
+    v = projection["v"]
+    points = np.concatenate([h, v, np.zeros((1, 2))])
+    points = points[np.all(np.isfinite(points), axis = 1)]
+
+    # Equal scaling of both axes, origin is always visible
+    margin = 4
+    top = 12
+    xmin, ymin = points.min(axis = 0)
+    xmax, ymax = points.max(axis = 0)
+    span = max(xmax - xmin, ymax - ymin)
+    if span == 0:
+        span = 1
+    scale = min(size - 2 * margin, size - top - margin) / span
+    x0 = size / 2 - (xmin + xmax) / 2 * scale
+    y0 = (size + top - margin) / 2 + (ymin + ymax) / 2 * scale
+
+    def polygon(xy):
+        xy = xy[np.all(np.isfinite(xy), axis = 1)]
+        return QPolygonF([QPointF(x0 + x * scale, y0 - y * scale) for x, y in xy.tolist()])
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+
+    font = QFont()
+    font.setPixelSize(9)
+    painter.setFont(font)
+    painter.setPen(Qt.black)
+    painter.drawText(QRectF(2, 0, size - 4, top), Qt.AlignLeft | Qt.AlignVCenter, sample)
+
+    painter.setClipRect(QRectF(0, top, size, size - top))
+
+    # Axes through origin
+    painter.setPen(QPen(QColor(160, 160, 160), 0.5))
+    painter.drawLine(QPointF(0, y0), QPointF(size, y0))
+    painter.drawLine(QPointF(x0, top), QPointF(x0, size))
+
+    for key, color in (("h", QColor("blue")), ("v", QColor("red"))):
+        pen = QPen(color, 0.6, Qt.DashLine)
+        painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
+        line = polygon(projection[key])
+        painter.drawPolyline(line)
+
+        painter.setPen(QPen(color, 0.6))
+        painter.setBrush(Qt.white)
+        for point in line:
+            painter.drawRect(QRectF(point.x() - 1.5, point.y() - 1.5, 3, 3))
+
+        if pca_points and "mask" in projection:
+            painter.setBrush(QBrush(color))
+            for point in polygon(projection[key][projection["mask"]]):
+                painter.drawRect(QRectF(point.x() - 1.5, point.y() - 1.5, 3, 3))
+
+        if pca_lines and key + "_line" in projection:
+            painter.setPen(QPen(Qt.black, 0.8))
+            painter.drawPolyline(polygon(projection[key + "_line"].T))
+
+    painter.end()
+
+    return image
+
+
+class P1ThumbnailSignals(QObject):
+    done = pyqtSignal(object)
+
+
+class P1ThumbnailJob(QRunnable):
+    """
+    Class implementing a thumbnail rendering job for the thread pool.
+    """
+    def __init__(self, row: int, generation: tuple, sample: str, projection: dict, size: int, pca_points: bool, pca_lines: bool):
+        super(P1ThumbnailJob, self).__init__()
+
+        self.signals = P1ThumbnailSignals()
+        self.__args = (row, generation, sample, projection, size, pca_points, pca_lines)
+
+    def run(self):
+        row, generation, sample, projection, size, pca_points, pca_lines = self.__args
+        image = zijder_thumbnail(sample, projection, size, pca_points, pca_lines)
+        self.signals.done.emit((row, generation, image))
+
+
+class P1ThumbnailModel(QAbstractListModel):
+    """
+    Class implementing a list model of zijderveld thumbnails.
+
+    Thumbnails are only rendered when the view asks for them, i.e. for visible cells.
+    Requests are served newest first, so cells scrolled past are skipped.
+    """
+    def __init__(self, parent = None, size: int = 96, cache_size: int = 1024):
+        """
+        Constructor
+
+        :param parent: parent object (QObject)
+        :param size: thumbnail size in pixels (integer)
+        :param cache_size: maximum number of cached thumbnails (integer)
+        """
+        super(P1ThumbnailModel, self).__init__(parent)
+
+        self.__size = size
+        self.__cache = P1LRUCache(cache_size)
+        self.__samples = []
+        self.__projection = None
+        self.__pca_points = False
+        self.__pca_lines = False
+
+        # Jobs of an older model or row generation are dropped when they finish
+        self.__generation = 0
+        self.__row_generations = {}
+        self.__requests = OrderedDict()
+        self.__pending = {}
+        self.__pool = QThreadPool(self)
+
+        self.__placeholder = QPixmap(size, size)
+        self.__placeholder.fill(QColor(235, 235, 235))
+
+        self.__dispatcher = QTimer(self)
+        self.__dispatcher.setSingleShot(True)
+        self.__dispatcher.setInterval(0)
+        self.__dispatcher.timeout.connect(self.__dispatch)
+
+    def set_data(self, samples: list, projection: P1ZijderProjection, pca_points: bool = False, pca_lines: bool = False):
+        """
+        Sets samples and their projections.
+
+        :param samples: sample names (list)
+        :param projection: projections of the samples, calculated for the rows that are shown (P1ZijderProjection)
+        :param pca_points: mark points used in pca (bool)
+        :param pca_lines: plot pca lines (bool)
+        """
+        self.beginResetModel()
+        self.__samples = [str(x) for x in samples]
+        self.__projection = projection
+        self.__pca_points = pca_points
+        self.__pca_lines = pca_lines
+        self.invalidate()
+        self.endResetModel()
+
+    def invalidate(self, row: int = None):
+        """
+        Drops cached thumbnails, all or of a single row, they are rendered again when shown.
+
+        :param row: row of the sample (integer)
+        """
+        if row is None:
+            self.__generation += 1
+            self.__row_generations.clear()
+            self.__cache.clear()
+            self.__requests.clear()
+            self.__pending.clear()
+        else:
+            self.__row_generations[row] = self.__row_generations.get(row, 0) + 1
+            self.__cache.pop(row)
+            self.__pending.pop(row, None)
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def thumbnailSize(self) -> int:
+        return self.__size
+
+    def rowCount(self, parent = QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.__samples)
+
+    def data(self, index, role = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        # Sample name is painted into the thumbnail
+        if role == Qt.ToolTipRole:
+            return self.__samples[index.row()]
+        elif role == Qt.DecorationRole:
+            pixmap = self.__cache.get(index.row())
+            if pixmap is None:
+                self.__request(index.row())
+                return self.__placeholder
+            return pixmap
+
+        return None
+
+    def __request(self, row: int):
+        if row in self.__pending:
+            return
+        self.__requests[row] = None
+        self.__requests.move_to_end(row)
+
+        # Rows requested long ago have been scrolled past, they are requested again when shown
+        while len(self.__requests) > self.__cache.maxsize:
+            self.__requests.popitem(last = False)
+        self.__dispatcher.start()
+
+    @pyqtSlot()
+    def __dispatch(self):
+        while self.__requests and len(self.__pending) < self.__pool.maxThreadCount():
+            row, _ = self.__requests.popitem()
+            if row in self.__pending or row in self.__cache:
+                continue
+
+            projection = {key: value.copy() for key, value in self.__projection.get(row).items()}
+            job = P1ThumbnailJob(row, self.__row_generation(row), self.__samples[row], projection, self.__size, self.__pca_points, self.__pca_lines)
+            job.signals.done.connect(self.__on_done)
+            self.__pending[row] = job
+            self.__pool.start(job)
+
+    @pyqtSlot(object)
+    def __on_done(self, item):
+        row, generation, image = item
+        if generation != self.__row_generation(row):
+            return
+        self.__pending.pop(row, None)
+
+        self.__cache.put(row, QPixmap.fromImage(image))
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+        self.__dispatch()
+
+    def __row_generation(self, row: int) -> tuple:
+        return (self.__generation, self.__row_generations.get(row, 0))
+
+    def shutdown(self):
+        """
+        Drops queued jobs and waits for running ones.
+        """
+        self.__requests.clear()
+        self.__pool.clear()
+        self.__pool.waitForDone()
+
+
+class P1ThumbnailView(QWidget):
+    """
+    Class implementing a grid of zijderveld thumbnails of all samples.
+    """
+    sampleActivated = pyqtSignal(int)
+
+    def __init__(self, parent = None, size: int = 96):
+        super(P1ThumbnailView, self).__init__(parent)
+
+        self.model = P1ThumbnailModel(self, size)
+
+        self.__view = QListView(self)
+        self.__view.setViewMode(QListView.IconMode)
+        self.__view.setResizeMode(QListView.Adjust)
+        self.__view.setMovement(QListView.Static)
+        self.__view.setUniformItemSizes(True)
+        self.__view.setLayoutMode(QListView.Batched)
+        self.__view.setBatchSize(2000)
+        self.__view.setIconSize(QSize(size, size))
+        self.__view.setGridSize(QSize(size + 6, size + 6))
+        self.__view.setSpacing(0)
+        self.__view.setModel(self.model)
+
+        self.__layout = QVBoxLayout(self)
+        self.__layout.setContentsMargins(0, 0, 0, 0)
+        self.__layout.addWidget(self.__view)
+
+        self.__view.clicked.connect(self.__on_clicked)
+        self.__view.activated.connect(self.__on_clicked)
+
+    def set_data(self, samples: list, projection: P1ZijderProjection, pca_points: bool = False, pca_lines: bool = False):
+        """
+        Sets samples and their projections, see P1ThumbnailModel.set_data.
+        """
+        self.model.set_data(samples, projection, pca_points, pca_lines)
+
+    def scrollTo(self, row: int):
+        self.__view.scrollTo(self.model.index(row))
+
+    def closeEvent(self, event):
+        self.model.shutdown()
+        super(P1ThumbnailView, self).closeEvent(event)
+
+    @pyqtSlot(QModelIndex)
+    def __on_clicked(self, index: QModelIndex):
+        self.sampleActivated.emit(index.row())
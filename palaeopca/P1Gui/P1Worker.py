@@ -0,0 +1,58 @@
+import types
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class P1Worker(QThread):
+    """
+    Class implementing a worker thread that runs a function off the gui thread.
+
+    If the function returns a generator, every yielded item is emitted through the partial signal
+    and the last item is emitted as result. Cancellation is checked between items.
+    """
+    partial = pyqtSignal(object)
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+
+    def __init__(self, fn, *args, parent = None, **kwargs):
+        """
+        Constructor
+
+        :param fn: function to run (callable)
+        :param args: positional arguments passed to fn
+        :param parent: parent object (QObject)
+        :param kwargs: keyword arguments passed to fn
+        """
+        super(P1Worker, self).__init__(parent)
+
+        self.__fn = fn
+        self.__args = args
+        self.__kwargs = kwargs
+
+    def run(self):
+        """
+        Public method running the function, called by QThread.start().
+        """
+        try:
+            out = self.__fn(*self.__args, **self.__kwargs)
+
+            if isinstance(out, types.GeneratorType):
+                item = None
+                for item in out:
+                    if self.isInterruptionRequested():
+                        out.close()
+                        return
+                    self.partial.emit(item)
+                out = item
+        except Exception as e:
+            self.error.emit(e)
+            return
+
+        if not self.isInterruptionRequested():
+            self.result.emit(out)
+
+    def cancel(self):
+        """
+        Public method to request cancellation, the worker stops at the next item.
+        """
+        self.requestInterruption()
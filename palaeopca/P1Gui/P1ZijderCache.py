@@ -0,0 +1,146 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage
+
+from palaeopca.P1Mpl.P1Zijder import zijder_render
+from palaeopca.P1Utils.P1LRUCache import P1LRUCache
+
+
+class P1ZijderCache(QObject):
+    """
+    Class implementing a cache of rendered zijderveld plots.
+
+    Plots of neighbouring samples are prefetched in worker processes, so paging through samples only swaps images.
+    Rendering in processes keeps matplotlib off the gui thread, pyplot state is not shared between threads.
+    """
+    ready = pyqtSignal(object)
+    __finished = pyqtSignal(object)
+
+    def __init__(self, parent = None, size: int = 64, workers: int = 2):
+        """
+        Constructor
+
+        :param parent: parent object (QObject)
+        :param size: maximum number of cached images (integer)
+        :param workers: number of worker processes (integer)
+        """
+        super(P1ZijderCache, self).__init__(parent)
+
+        self.__cache = P1LRUCache(size)
+        self.__workers = workers
+        self.__pool = None
+        self.__broken = False
+        self.__pending = {}
+        self.__generation = 0
+
+        self.__finished.connect(self.__on_finished)
+
+    def get(self, key) -> QImage:
+        """
+        Public method to retrieve a cached image.
+
+        :param key: key of the plot
+        :return: cached image or None (QImage)
+        """
+        return self.__cache.get(key)
+
+    def put(self, key, image: QImage):
+        """
+        Public method to cache an image, e.g. grabbed from a canvas after drawing.
+
+        :param key: key of the plot
+        :param image: rendered plot (QImage)
+        """
+        self.__cache.put(key, image)
+
+    def is_pending(self, key) -> bool:
+        """
+        Public method to check if a plot is rendered in the background, ready is emitted when it is done.
+
+        :param key: key of the plot
+        :return: pending state (bool)
+        """
+        return key in self.__pending
+
+    def prefetch(self, jobs: list):
+        """
+        Public method to render plots in the background, pending jobs not in the list are cancelled.
+
+        :param jobs: list of (key, args, kwargs) tuples, args and kwargs are passed to zijder_render
+        """
+        # Prefetching is optional, plots are drawn on demand if workers are not available
+        if self.__broken:
+            return
+
+        keys = [key for key, _, _ in jobs]
+        for key in list(self.__pending.keys()):
+            # Cancelling runs the done callback, which may already have removed the key
+            if key not in keys and self.__pending[key].cancel():
+                self.__pending.pop(key, None)
+
+        for key, args, kwargs in jobs:
+            if key in self.__cache or key in self.__pending:
+                continue
+            if self.__pool is None:
+                self.__pool = ProcessPoolExecutor(self.__workers, mp_context = multiprocessing.get_context("spawn"))
+
+            try:
+                future = self.__pool.submit(zijder_render, *args, **kwargs)
+            except (BrokenProcessPool, OSError):
+                self.__broken = True
+                self.shutdown()
+                return
+            self.__pending[key] = future
+            generation = self.__generation
+            future.add_done_callback(lambda f, key = key, generation = generation: self.__done(key, generation, f))
+
+    def clear(self):
+        """
+        Public method to invalidate all cached and pending plots.
+        """
+        self.__generation += 1
+        for future in self.__pending.values():
+            future.cancel()
+        self.__pending.clear()
+        self.__cache.clear()
+
+    def shutdown(self):
+        """
+        Public method to stop the worker processes.
+        """
+        self.clear()
+        if self.__pool is not None:
+            self.__pool.shutdown(wait = False)
+            self.__pool = None
+
+    def __done(self, key, generation: int, future):
+        # Called from the executor thread, results are passed to the gui thread by signal
+        try:
+            self.__finished.emit((key, generation, future))
+        except RuntimeError:
+            # Window was closed while rendering
+            pass
+
+    @pyqtSlot(object)
+    def __on_finished(self, item):
+        key, generation, future = item
+        if generation != self.__generation:
+            return
+        if self.__pending.get(key) is future:
+            del self.__pending[key]
+        if future.cancelled():
+            return
+        if isinstance(future.exception(), BrokenProcessPool):
+            self.__broken = True
+            self.shutdown()
+            return
+        if future.exception() is not None:
+            return
+
+        width, height, buffer = future.result()
+        image = QImage(buffer, width, height, QImage.Format_RGBA8888).copy()
+        self.__cache.put(key, image)
+        self.ready.emit(key)
@@ -0,0 +1,231 @@
+import numpy as np
+
+from PyQt5.QtCore import Qt, QCoreApplication, QTimer, pyqtSlot
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QToolButton, QComboBox, QStackedWidget, QLabel
+
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+from matplotlib.figure import Figure
+
+from palaeopca.P1Gui.P1ZijderCache import P1ZijderCache
+from palaeopca.P1Mpl.P1Zijder import zijder_plot
+import palaeopca.P1Utils.P1PixmapCache
+
+
+class P1ZijderView(QWidget):
+    """
+    Class implementing a zijderveld plot of one sample at a time with buttons to page through the samples.
+
+    Cached plots are shown as image while paging, the canvas is drawn once navigation settles.
+    Plots of neighbouring samples are prefetched, a plot that is still rendering is swapped in when it is ready.
+    """
+    def __init__(self, parent = None):
+        super(P1ZijderView, self).__init__(parent)
+
+        self.__data = None
+        self.__components = None
+        self.__plot_kwargs = None
+        self.__canvas_key = None
+
+        self.figure = Figure(figsize = (4, 4), dpi = 150)
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+
+        self.__cache = P1ZijderCache(self)
+        self.__label = QLabel()
+        self.__label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.__stack = QStackedWidget(self)
+        self.__stack.addWidget(self.canvas)
+        self.__stack.addWidget(self.__label)
+
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.setInterval(300)
+
+        self.__prevButton = QToolButton(self)
+        self.__prevButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
+        self.__prevButton.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("chevron-left", "solid"))
+
+        self.__sampleCombo = QComboBox(self)
+
+        self.__nextButton = QToolButton(self)
+        self.__nextButton.setToolButtonStyle(Qt.ToolButtonIconOnly)
+        self.__nextButton.setIcon(palaeopca.P1Utils.P1PixmapCache.getIcon("chevron-right", "solid"))
+
+        self.__tools = QHBoxLayout()
+        self.__tools.addWidget(self.toolbar)
+        self.__tools.addWidget(self.__prevButton)
+        self.__tools.addWidget(self.__sampleCombo)
+        self.__tools.addWidget(self.__nextButton)
+
+        self.__layout = QVBoxLayout(self)
+        self.__layout.setContentsMargins(0, 0, 0, 0)
+        self.__layout.addLayout(self.__tools)
+        self.__layout.addWidget(self.__stack, 10)
+
+        self.__sampleCombo.currentIndexChanged.connect(self.__update)
+        self.__prevButton.clicked.connect(self.__on_prev_button_clicked)
+        self.__nextButton.clicked.connect(self.__on_next_button_clicked)
+        self.__timer.timeout.connect(self.__draw)
+        self.__cache.ready.connect(self.__on_ready)
+
+    def addToolWidget(self, widget: QWidget):
+        """
+        Adds a widget to the tool row, between toolbar and sample navigation.
+
+        :param widget: tool widget, e.g. a button (QWidget)
+        """
+        self.__tools.insertWidget(self.__tools.count() - 3, widget)
+
+    def set_data(self, data, components: tuple, plot_kwargs):
+        """
+        Sets the samples and shows the first one.
+
+        :param data: data container (P1DataObject)
+        :param components: plot directions xh, xv, y and z, see zijder_plot (tuple)
+        :param plot_kwargs: function returning the keyword arguments of zijder_plot for a row, without figure, figsize and dpi (callable)
+        """
+        self.__data = data
+        self.__components = components
+        self.__plot_kwargs = plot_kwargs
+        self.__cache.clear()
+
+        self.__sampleCombo.currentIndexChanged.disconnect(self.__update)
+        self.__sampleCombo.clear()
+        self.__sampleCombo.addItems(data.get_sample_names())
+        self.__sampleCombo.currentIndexChanged.connect(self.__update)
+
+        self.__update(0)
+
+    def set_components(self, components: tuple):
+        """
+        Sets the plot directions, cached plots are invalidated.
+
+        :param components: plot directions xh, xv, y and z, see zijder_plot (tuple)
+        """
+        self.__components = components
+        self.__cache.clear()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Shows the current sample again, e.g. after its plot arguments changed.
+        """
+        if self.__data is not None:
+            self.__update(self.currentIndex())
+
+    def currentIndex(self) -> int:
+        return self.__sampleCombo.currentIndex()
+
+    def setCurrentIndex(self, index: int):
+        self.__sampleCombo.setCurrentIndex(index)
+
+    def shutdown(self):
+        """
+        Stops rendering in the background.
+        """
+        self.__cache.shutdown()
+
+    @pyqtSlot()
+    def __on_prev_button_clicked(self):
+        self.__sampleCombo.setCurrentIndex(self.__sampleCombo.currentIndex() - 1)
+
+    @pyqtSlot()
+    def __on_next_button_clicked(self):
+        self.__sampleCombo.setCurrentIndex(self.__sampleCombo.currentIndex() + 1)
+
+    @pyqtSlot(int)
+    def __update(self, index: int):
+        # Set buttons
+        self.__prevButton.setEnabled(index > 0)
+        self.__nextButton.setEnabled(index < self.__sampleCombo.count() - 1)
+
+        # Show cached plot if available and draw canvas once navigation settles
+        key = self.__key(index)
+        image = self.__cache.get(key)
+        if image is not None:
+            self.__show_image(image)
+            self.__timer.start()
+        elif self.__cache.is_pending(key):
+            # Rendering plot is swapped in when ready, see __on_ready
+            self.__timer.start()
+        else:
+            self.__draw()
+
+        # Render neighbouring samples in the background, the current plot is kept if still rendering
+        jobs = [self.__job(index)] if self.__cache.is_pending(key) else []
+        for n in (index + 1, index - 1, index + 2, index - 2):
+            if 0 <= n < self.__sampleCombo.count():
+                jobs.append(self.__job(n))
+        self.__cache.prefetch(jobs)
+
+    def __key(self, index: int, kwargs: dict = None) -> tuple:
+        """
+        Returns the cache key of a plot, including everything that changes its appearance.
+        Arrays are keyed by their bytes, NaN results would never compare equal as floats.
+        """
+        if kwargs is None:
+            kwargs = self.__plot_kwargs(index)
+
+        values = []
+        for name, value in sorted(kwargs.items()):
+            if name == "projection":
+                # Projections follow from the data, the directions and the results
+                continue
+            if isinstance(value, np.ndarray):
+                value = (value.shape, value.tobytes())
+            values.append((name, value))
+
+        return (
+            index,
+            self.__components,
+            tuple(values),
+            tuple(self.figure.get_size_inches().tolist()),
+            self.figure.dpi
+        )
+
+    def __job(self, index: int) -> tuple:
+        sample = self.__sampleCombo.itemText(index)
+        kwargs = self.__plot_kwargs(index)
+        key = self.__key(index, kwargs)
+        kwargs["figsize"] = tuple(self.figure.get_size_inches().tolist())
+        kwargs["dpi"] = self.figure.dpi
+
+        return key, (sample, self.__data.get_vectors(slice(index, index + 1))[0]) + self.__components, kwargs
+
+    def __show_image(self, image: QImage):
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(self.canvas.device_pixel_ratio)
+        self.__label.setPixmap(pixmap)
+        self.__stack.setCurrentWidget(self.__label)
+
+    @pyqtSlot(object)
+    def __on_ready(self, key):
+        # Plot of the current sample, the canvas is drawn once navigation settles
+        if key == self.__key(self.currentIndex()) and key != self.__canvas_key:
+            self.__show_image(self.__cache.get(key))
+
+    @pyqtSlot()
+    def __draw(self):
+        self.__timer.stop()
+        index = self.currentIndex()
+        kwargs = self.__plot_kwargs(index)
+        key = self.__key(index, kwargs)
+
+        self.figure = zijder_plot(
+            self.__sampleCombo.currentText(),
+            self.__data.get_vectors(slice(index, index + 1))[0],
+            *self.__components,
+            figure = self.figure,
+            **kwargs
+        )
+        self.canvas.draw()
+        self.__stack.setCurrentWidget(self.canvas)
+        self.__canvas_key = key
+
+        # Keep drawn plot for paging back
+        buffer = self.canvas.buffer_rgba()
+        height, width = np.asarray(buffer).shape[:2]
+        self.__cache.put(key, QImage(buffer, width, height, QImage.Format_RGBA8888).copy())
+
+        QCoreApplication.processEvents()
@@ -6,6 +6,8 @@ import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib import gridspec
+from matplotlib.collections import QuadMesh
+from matplotlib.colors import Normalize
 from mpl_toolkits.axes_grid1.inset_locator import inset_axes
 
 mpl.use("Agg")
@@ -14,6 +16,144 @@ import palaeopca
 from palaeopca.P1Utils.P1PCALine import PCALine
 from palaeopca.P1Backend.P1DataObject import P1DataObject
 
+
+def _mesh_edges(centers: np.ndarray) -> np.ndarray:
+    # Cell edges halfway between centers, as pcolormesh with nearest shading
+    centers = np.asarray(centers, dtype = float)
+    if len(centers) == 1:
+        return np.array([centers[0] - 0.5, centers[0] + 0.5])
+    mid = (centers[1:] + centers[:-1]) / 2
+    return np.concatenate([[2 * centers[0] - mid[0]], mid, [2 * centers[-1] - mid[-1]]])
+
+
+def mesh_blocks(edges: np.ndarray, c: np.ndarray, pixels: float, axis: int = 0, circular: bool = False) -> tuple:
+    """
+    Aggregates cells of a mesh along one axis to blocks, so that at most one block falls on a pixel.
+
+    :type edges: numpy.ndarray
+    :type c: numpy.ndarray
+    :type pixels: float
+    :type axis: integer
+    :type circular: bool
+
+    :param edges: cell edges along axis, one more than cells
+    :param c: mesh values
+    :param pixels: number of pixels covered by the cells
+    :param axis: axis to aggregate (default: 0)
+    :param circular: values are angles in degrees, blocks get the circular mean (default: False)
+    :returns: edges and values of the blocks, NaN values are ignored
+    :rtype: tuple
+    """
+    n = c.shape[axis]
+    size = int(np.ceil(n / pixels)) if pixels > 0 else 1
+    if size <= 1:
+        return edges, c
+
+    c = np.moveaxis(c, axis, 0)
+    pad = -n % size
+    if pad:
+        c = np.concatenate([c, np.full((pad,) + c.shape[1:], np.nan)])
+    c = c.reshape((-1, size) + c.shape[1:])
+
+    valid = np.isfinite(c)
+    count = valid.sum(axis = 1)
+    if circular:
+        r = np.radians(np.where(valid, c, 0))
+        out = np.degrees(np.arctan2(np.where(valid, np.sin(r), 0).sum(axis = 1), np.where(valid, np.cos(r), 0).sum(axis = 1))) % 360
+    else:
+        out = np.where(valid, c, 0).sum(axis = 1) / np.maximum(count, 1)
+    out[count == 0] = np.nan
+
+    return np.append(edges[:n:size], edges[n]), np.moveaxis(out, 0, axis)
+
+
+def mesh_image(ax, x: np.ndarray, y: np.ndarray, c: np.ndarray, circular: bool = False, downsample: bool = True, **kwargs) -> QuadMesh:
+    """
+    | Draws a rasterized colour mesh, downsampled to the resolution of the axis.
+    | The visible range is aggregated again on zoom. Vector formats embed the mesh as image.
+
+    :type x: numpy.ndarray
+    :type y: numpy.ndarray
+    :type c: numpy.ndarray
+    :type circular: bool
+    :type downsample: bool
+
+    :param ax: matplotlib axis instance
+    :param x: cell centers along x (columns of c)
+    :param y: cell centers along y (rows of c)
+    :param c: mesh values
+    :param circular: values are angles in degrees (default: False)
+    :param downsample: aggregate cells to the resolution of the axis (default: True)
+    :Keyword Arguments:
+        * *cmap* (``string``) --
+          matplotlib colormap name (default: None)
+        * *vmin* (``float``) --
+          lower limit of colour scale (default: minimum of c)
+        * *vmax* (``float``) --
+          upper limit of colour scale (default: maximum of c)
+
+    :returns: matplotlib mesh instance, colorbars can be attached to it.
+    :rtype: matplotlib.collections.QuadMesh
+    """
+    if "cmap" not in kwargs:
+        kwargs["cmap"] = None
+    if "vmin" not in kwargs:
+        kwargs["vmin"] = None
+    if "vmax" not in kwargs:
+        kwargs["vmax"] = None
+
+    # Rows sorted by depth, colour scale of the full data
+    order = np.argsort(y, kind = "stable")
+    y = np.asarray(y, dtype = float)[order]
+    c = np.ma.filled(np.ma.asarray(c, dtype = float), np.nan)[order]
+    x_edges = _mesh_edges(x)
+    y_edges = _mesh_edges(y)
+    norm = Normalize(kwargs["vmin"], kwargs["vmax"])
+    norm.autoscale_None(np.ma.masked_invalid(c))
+
+    def rows(limits = None) -> tuple:
+        if limits is None:
+            return 0, len(y)
+        i0 = max(np.searchsorted(y_edges, min(limits), "right") - 1, 0)
+        i1 = min(np.searchsorted(y_edges, max(limits), "left"), len(y))
+        return i0, max(i1, i0 + 1)
+
+    def build(i0: int, i1: int) -> QuadMesh:
+        xe, ye, cc = x_edges, y_edges[i0:i1+1], c[i0:i1]
+        if downsample:
+            ye, cc = mesh_blocks(ye, cc, ax.bbox.height, 0, circular)
+            xe, cc = mesh_blocks(xe, cc, ax.bbox.width, 1, circular)
+        X, Y = np.meshgrid(xe, ye)
+        mesh = QuadMesh(np.stack([X, Y], axis = -1), cmap = kwargs["cmap"], norm = norm, edgecolors = "none", antialiased = False, rasterized = True)
+        mesh.set_array(np.ma.masked_invalid(cc))
+        ax.add_collection(mesh, autolim = False)
+        return mesh
+
+    mesh = build(*rows())
+    ax.update_datalim([(x_edges[0], y_edges[0]), (x_edges[-1], y_edges[-1])])
+    ax.autoscale_view()
+
+    if downsample:
+        state = {"mesh": mesh, "key": rows() + (ax.bbox.height, ax.bbox.width)}
+
+        def update(ax):
+            key = rows(ax.get_ylim()) + (ax.bbox.height, ax.bbox.width)
+            if key == state["key"]:
+                return
+
+            # The colorbar stays attached to the first mesh, all meshes share its norm and colormap
+            if state["mesh"] is not mesh:
+                state["mesh"].remove()
+            else:
+                mesh.set_visible(False)
+            state["mesh"] = build(*key[:2])
+            state["key"] = key
+
+        ax.callbacks.connect("ylim_changed", update)
+
+    return mesh
+
+
 def mesh_plot(outfile: str, indata: Dict, save = False, **kwargs) -> plt.figure:
     """
     | Generates a sequence (downcore) mesh plot.
@@ -48,6 +188,8 @@ def mesh_plot(outfile: str, indata: Dict, save = False, **kwargs) -> plt.figure:
           invert order of samples (default: True)
         * *ylabel* (``string``) --
           label for y-axis (default: "")
+        * *downsample* (``bool``) --
+          aggregate meshes to the resolution of the axes, see mesh_image (default: True)
 
     :returns: matplotlib figure instance.
     :rtype: matplotlib.Figure
@@ -101,6 +243,8 @@ def mesh_plot(outfile: str, indata: Dict, save = False, **kwargs) -> plt.figure:
         kwargs["ylabel"] = ""
     if "invertY" not in kwargs:
         kwargs["invertY"] = True
+    if "downsample" not in kwargs:
+        kwargs["downsample"] = True
     
     if all (par == False in kwargs for par in ("NRM", "Incl", "Decl", "MADp", "MADo")):
         # Nothing to plot, return
@@ -152,7 +296,7 @@ def mesh_plot(outfile: str, indata: Dict, save = False, **kwargs) -> plt.figure:
             c = indata["MADo"]
             cmap = kwargs["cmap"].pop(0)#
 
-        mesh = ax[n].pcolormesh(x, y, c, cmap = cmap, norm = None, edgecolor = None, vmin = vmin, vmax = vmax)
+        mesh = mesh_image(ax[n], x, y, c, indices[n] == 3, kwargs["downsample"], cmap = cmap, vmin = vmin, vmax = vmax)
 
         # Set spines according to column
         if n == 0:
@@ -11,6 +11,115 @@ import palaeopca
 from palaeopca.P1Utils.P1PCALine import PCALine
 from palaeopca.P1Backend.P1DataObject import P1DataObject
 
+
+class P1SequenceLOD(object):
+    """
+    Class implementing level-of-detail data for sequence plots.
+
+    A pyramid of block minima and maxima over depth is precalculated for every column. Lines only get the level
+    matching the pixel height of their axis and the visible depth range, the envelope of the data is kept at every level.
+    """
+    def __init__(self, indata: np.ndarray):
+        """
+        Constructor
+
+        :type indata: numpy.ndarray
+
+        :param indata: array of pca results [SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step]
+        """
+        self.__lines = []
+        self.set_data(indata)
+
+    def set_data(self, indata: np.ndarray):
+        """
+        Replaces the data, attached lines are updated in place.
+
+        :type indata: numpy.ndarray
+
+        :param indata: array of pca results, see constructor
+        """
+        order = np.argsort(indata[:,0], kind = "stable")
+        self.__values = indata[order]
+        self.__depth = self.__values[:,0]
+        self.__levels = {}
+
+        for ax, line, column in self.__lines:
+            self.__update(ax, line, column)
+            ax.relim()
+            ax.autoscale_view(scaley = False)
+
+    def attach(self, ax, line, column: int):
+        """
+        Keeps the data of a line at the level matching the y-limits of its axis.
+
+        :type column: integer
+
+        :param ax: matplotlib axis instance
+        :param line: matplotlib line instance of the axis
+        :param column: column of the data plotted on the x-axis
+        """
+        self.__lines.append((ax, line, column))
+        ax.callbacks.connect("ylim_changed", lambda ax: self.__update(ax, line, column))
+
+    def points(self, column: int, limits: tuple = None, pixels: float = None) -> tuple:
+        """
+        Returns the points of a column within a depth range, decimated to the given resolution.
+
+        :type column: integer
+        :type limits: tuple
+        :type pixels: float
+
+        :param column: column of the data
+        :param limits: visible depth range (default: all)
+        :param pixels: resolution of the depth range in pixels (default: no decimation)
+        :returns: values and depths
+        :rtype: tuple
+        """
+        n = len(self.__depth)
+        if limits is None:
+            i0, i1 = 0, n
+        else:
+            # One sample beyond the visible range keeps the line continuous
+            i0 = max(np.searchsorted(self.__depth, min(limits), "left") - 1, 0)
+            i1 = min(np.searchsorted(self.__depth, max(limits), "right") + 1, n)
+
+        levels = self.__pyramid(column)
+        level = 0
+        if pixels is not None and i1 - i0 > pixels > 0:
+            level = min(int(np.ceil(np.log2((i1 - i0) / pixels))), len(levels))
+
+        if level == 0:
+            indices = np.arange(i0, i1)
+        else:
+            size = 2 ** level
+            lo, hi = levels[level - 1]
+            j0, j1 = i0 // size, -(-i1 // size)
+            indices = np.sort(np.stack([lo[j0:j1], hi[j0:j1]], axis = 1), axis = 1).ravel()
+
+        return self.__values[indices, column], self.__depth[indices]
+
+    def __pyramid(self, column: int) -> list:
+        # Indices of minima and maxima in blocks of 2, 4, 8, ... samples, built on first use
+        if column not in self.__levels:
+            values = self.__values[:, column]
+            lo = hi = np.arange(len(values))
+            levels = []
+            while len(lo) > 1:
+                if len(lo) % 2:
+                    lo = np.append(lo, lo[-1])
+                    hi = np.append(hi, hi[-1])
+                a, b = lo[0::2], lo[1::2]
+                lo = np.where((values[b] < values[a]) | np.isnan(values[a]), b, a)
+                a, b = hi[0::2], hi[1::2]
+                hi = np.where((values[b] > values[a]) | np.isnan(values[a]), b, a)
+                levels.append((lo, hi))
+            self.__levels[column] = levels
+        return self.__levels[column]
+
+    def __update(self, ax, line, column: int):
+        line.set_data(*self.points(column, ax.get_ylim(), ax.bbox.height))
+
+
 def sequence_plot(outfile: str, indata: np.ndarray, save = False, **kwargs) -> plt.figure:
     """
     Generates a sequence (downcore) plot.
@@ -45,6 +154,8 @@ def sequence_plot(outfile: str, indata: np.ndarray, save = False, **kwargs) -> p
           invert order of samples (default: True)
         * *ylabel* (``string``) --
           label for y-axis (default: "")
+        * *lod* (``bool`` or ``P1SequenceLOD``) --
+          decimate lines to the resolution of the axes and update them on zoom, an existing instance can be passed to update the plot in place later (default: True)
 
     :returns: matplotlib figure instance.
     :rtype: matplotlib.Figure
@@ -73,6 +184,8 @@ def sequence_plot(outfile: str, indata: np.ndarray, save = False, **kwargs) -> p
         kwargs["MADo"] = True
     if "ylabel" not in kwargs:
         kwargs["ylabel"] = ""
+    if "lod" not in kwargs:
+        kwargs["lod"] = True
     
     if all (par == False in kwargs for par in ("NRM", "Incl", "Decl", "MADp", "MADo")):
         # Nothing to plot, return
@@ -94,11 +207,22 @@ def sequence_plot(outfile: str, indata: np.ndarray, save = False, **kwargs) -> p
     else:
         fig = plt.figure(figsize = kwargs["figsize"], dpi = kwargs["dpi"])
 
+    if kwargs["lod"] is True:
+        lod = P1SequenceLOD(indata)
+    elif kwargs["lod"]:
+        lod = kwargs["lod"]
+    else:
+        lod = None
+
     # Add subplots and data
     for n in range(ncols):
         # Add axis and data
         ax[n] = fig.add_subplot(grid[0, n])
-        ax[n].plot(indata[:, indices[n]], indata[:,0], '-', clip_on = False)
+        if lod is not None:
+            line, = ax[n].plot(*lod.points(indices[n], pixels = ax[n].bbox.height), '-', clip_on = False)
+            lod.attach(ax[n], line, indices[n])
+        else:
+            ax[n].plot(indata[:, indices[n]], indata[:,0], '-', clip_on = False)
 
         # Set spines according to column
         if n == 0:
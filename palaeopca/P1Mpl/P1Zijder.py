@@ -1,11 +1,16 @@
 # Imports
 import sys
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
 import matplotlib as mpl
-import matplotlib.pyplot as plt
+import matplotlib.style
 from matplotlib import gridspec
 import matplotlib.patches as mpatches
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
 
 mpl.use("Agg")
 
@@ -13,9 +18,58 @@ if "PyQt5" in sys.modules:
     from PyQt5.QtWidgets import QApplication
 
 import palaeopca
-from palaeopca.P1Utils.P1PCALine import PCALine
+from palaeopca.P1Utils.P1PCALine import PCALines
+from palaeopca.P1Utils.P1LRUCache import P1LRUCache
 from palaeopca.P1Backend.P1DataObject import P1DataObject
 
+# Data column and sign of every plot direction
+_components = {
+    "N": (0, 1),
+    "S": (0, -1),
+    "E": (1, 1),
+    "W": (1, -1),
+    "Down": (2, 1),
+    "Up": (2, -1),
+}
+
+def _vertical_angle(incRad, azimuthRad):
+    return np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(azimuthRad)))
+
+# Angle of the pca line in every possible projection, functions of inclination and declination in radians
+_line_angles = {
+    "NN": lambda incRad, decRad: np.full_like(decRad, np.radians(45)),
+    "NE": lambda incRad, decRad: (np.pi / 2 + (-1) * decRad),
+    "NS": lambda incRad, decRad: np.full_like(decRad, -np.radians(45)),
+    "NW": lambda incRad, decRad: -1 * (np.pi / 2 + (-1) * decRad),
+
+    "EN": lambda incRad, decRad: decRad,
+    "EE": lambda incRad, decRad: np.full_like(decRad, np.radians(45)),
+    "ES": lambda incRad, decRad: -decRad,
+    "EW": lambda incRad, decRad: np.full_like(decRad, -np.radians(45)),
+
+    "SN": lambda incRad, decRad: np.full_like(decRad, -np.radians(45)),
+    "SE": lambda incRad, decRad: -1 * (np.pi / 2 + (-1) * decRad),
+    "SS": lambda incRad, decRad: np.full_like(decRad, np.radians(45)),
+    "SW": lambda incRad, decRad: (np.pi / 2 + (-1) * decRad),
+
+    "WN": lambda incRad, decRad: -decRad,
+    "WE": lambda incRad, decRad: np.full_like(decRad, -np.radians(45)),
+    "WS": lambda incRad, decRad: decRad,
+    "WW": lambda incRad, decRad: np.full_like(decRad, np.radians(45)),
+
+    "NUp": lambda incRad, decRad: -1 * _vertical_angle(incRad, decRad),
+    "NDown": lambda incRad, decRad: _vertical_angle(incRad, decRad),
+
+    "EUp": lambda incRad, decRad: -1 * _vertical_angle(incRad, np.pi / 2 - decRad),
+    "EDown": lambda incRad, decRad: _vertical_angle(incRad, np.pi / 2 - decRad),
+
+    "SUp": lambda incRad, decRad: _vertical_angle(incRad, decRad),
+    "SDown": lambda incRad, decRad: -1 * _vertical_angle(incRad, decRad),
+
+    "WUp": lambda incRad, decRad: _vertical_angle(incRad, np.pi / 2 - decRad),
+    "WDown": lambda incRad, decRad: -1 * _vertical_angle(incRad, np.pi / 2 - decRad),
+}
+
 def zijder_save(outdir: str, indata: P1DataObject, xh: str="N", xv: str="N", y: str="W", z: str="Up", pbar=None, **kwargs):
     """
     Warpper function to loop through data, generates and saves zijderveld plots
@@ -80,18 +134,26 @@ def zijder_save(outdir: str, indata: P1DataObject, xh: str="N", xv: str="N", y:
     kwargs["units"] = indata.get_units()
     kwargs["pca_steps"] = indata.get_steps()
 
+    # Project all samples at once
+    if pca_results:
+        projection = zijder_projection(indata.get_vectors(), xh, xv, y, z, kwargs["pca_results"], kwargs["pca_steps"])
+    else:
+        projection = zijder_projection(indata.get_vectors(), xh, xv, y, z)
+
     # Loop through samples
     pbar_steps = 100 / indata.rowCount()
     new_value = 0
     zijder_kwargs = kwargs.copy()
-    for n, sample in enumerate(indata.get_samples()):
+    for n, sample in enumerate(indata.get_sample_names()):
         if pca_results:
             zijder_kwargs["pca_results"] = kwargs["pca_results"][n]
+        zijder_kwargs["projection"] = zijder_sample(projection, n)
             
         outfile = os.path.join(outdir, "Zijder_{0}.{1}".format(sample, kwargs["fmt"]))
-        fig = zijder_plot(sample, indata.get_data(sample), xh, xv, y, z, **zijder_kwargs)
+        fig = Figure(figsize = kwargs["figsize"], dpi = kwargs["dpi"])
+        FigureCanvasAgg(fig)
+        zijder_plot(sample, indata.get_data(sample), xh, xv, y, z, figure = fig, **zijder_kwargs)
         fig.savefig(outfile)
-        plt.close(fig)
 
         if pbar != None:
             new_value += pbar_steps
@@ -99,7 +161,608 @@ def zijder_save(outdir: str, indata: P1DataObject, xh: str="N", xv: str="N", y:
                 pbar.progress.setValue(int(new_value))
             QApplication.processEvents()
 
-def zijder_plot(sample: str, indata: np.ndarray, xh: str="N", xv: str="N", y: str="W", z: str="Up", **kwargs) -> plt.figure:
+def zijder_export(outdir: str, indata: P1DataObject, xh: str="N", xv: str="N", y: str="W", z: str="Up", pbar=None, workers: int=None, **kwargs) -> int:
+    """
+    | Generates and saves zijderveld plots of all samples in parallel worker processes.
+    | Plots are rendered with the object oriented matplotlib API, every worker reuses one figure and only updates its artists.
+
+    :type outdir: string
+    :type indata: P1DataObject
+    :type xh: string
+    :type xv: string
+    :type y: string
+    :type z: string
+    :type pbar: P1Progressbar
+    :type workers: integer
+
+    :param outdir: full path to output directory, will be created if non existant
+    :param indata: P1DataObject with all sample data
+    :param xh: component to be plotted on x-axis, horizontal projection (N, S, E or W, default: N)
+    :param xv: component to be plotted on x-axis, vertical projection (N, S, E or W, default: N)
+    :param y: component to be plotted on y-axis, horizontal projection (N, S, E or W, default: W)
+    :param z: component to be plotted on y-axis, vertical projection (Up or Down, default: Up)
+    :param pbar: progress bar instance, only used in gui mode, export stops if it was canceled
+    :param workers: number of worker processes, 0 renders in the calling process (default: None, number of cpus)
+
+    :Keyword Arguments:
+        * *figsize* (``tuple``) --
+          size of figure in inches (default: (5, 5))
+        * *fmt* (``string`` or ``list``) --
+          figure format, a list of formats saves every plot in each of them (default: png)
+        * *dpi* (``float``) --
+          resolution of figure (default: 300)
+        * *chunksize* (``integer``) --
+          number of samples per job (default: 16)
+        * *pca_results* (``numpy.ndarray``) --
+          array of pca results [SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step] (default: None)
+        * *pca_anno* (``bool``) --
+          annotate plot with pca results, Inc, Dec, MADp and MADo (default: False)
+        * *pca_points* (``bool``) --
+          mark points used in pca (default: False)
+        * *pca_lines* (``bool``) --
+          plot largest Eigenvector of pca (default: False)
+
+    :returns: number of exported samples
+    :rtype: integer
+    """
+    # Check dir and create if necessary
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+
+    # Set parameters
+    if "figsize" not in kwargs:
+        kwargs["figsize"] = (5, 5)
+    if "fmt" not in kwargs:
+        kwargs["fmt"] = "png"
+    if "dpi" not in kwargs:
+        kwargs["dpi"] = 300
+    if "chunksize" not in kwargs:
+        kwargs["chunksize"] = 16
+    if "pca_results" not in kwargs:
+        kwargs["pca_results"] = None
+        kwargs["pca_anno"] = False
+        kwargs["pca_points"] = False
+        kwargs["pca_lines"] = False
+    if "pca_anno" not in kwargs:
+        kwargs["pca_anno"] = False
+    if "pca_points" not in kwargs:
+        kwargs["pca_points"] = False
+    if "pca_lines" not in kwargs:
+        kwargs["pca_lines"] = False
+    if workers is None:
+        workers = os.cpu_count()
+
+    fmts = [kwargs["fmt"]] if isinstance(kwargs["fmt"], str) else list(kwargs["fmt"])
+    pca_results = kwargs["pca_results"]
+    steps = indata.get_steps()
+
+    plot_kwargs = {
+        "figsize": tuple(kwargs["figsize"]),
+        "dpi": kwargs["dpi"],
+        "units": indata.get_units(),
+        "pca_anno": kwargs["pca_anno"],
+        "pca_points": kwargs["pca_points"],
+        "pca_lines": kwargs["pca_lines"]
+    }
+    vectors = indata.get_vectors()
+    if pca_results is not None:
+        plot_kwargs["pca_steps"] = steps
+        projection = zijder_projection(vectors, xh, xv, y, z, pca_results, steps)
+    else:
+        projection = zijder_projection(vectors, xh, xv, y, z)
+
+    # Split samples into jobs, every job carries its own data
+    samples = indata.get_sample_names()
+    jobs = []
+    for start in range(0, indata.rowCount(), kwargs["chunksize"]):
+        job = []
+        for n in range(start, min(start + kwargs["chunksize"], indata.rowCount())):
+            job.append((
+                samples[n],
+                vectors[n],
+                zijder_sample(projection, n),
+                None if pca_results is None else pca_results[n]
+            ))
+        jobs.append(job)
+
+    done = 0
+    if workers == 0:
+        for job in jobs:
+            done += _zijder_export_job(outdir, job, xh, xv, y, z, fmts, plot_kwargs)
+            if not _update_progress(pbar, done, indata.rowCount()):
+                break
+        return done
+
+    pool = ProcessPoolExecutor(min(workers, len(jobs)), mp_context = multiprocessing.get_context("spawn"))
+    try:
+        pending = {pool.submit(_zijder_export_job, outdir, job, xh, xv, y, z, fmts, plot_kwargs) for job in jobs}
+        while pending:
+            finished, pending = wait(pending, timeout = 0.1, return_when = FIRST_COMPLETED)
+            for future in finished:
+                done += future.result()
+
+            if not _update_progress(pbar, done, indata.rowCount()):
+                # Running jobs are finished, queued jobs are dropped
+                for future in pending:
+                    future.cancel()
+                done += sum(future.result() for future in pending if not future.cancelled())
+                break
+    finally:
+        pool.shutdown(wait = True)
+
+    return done
+
+# Figure reused by all jobs of an export worker process
+_export_figure = None
+
+def _zijder_export_job(outdir: str, job: list, xh: str, xv: str, y: str, z: str, fmts: list, kwargs: dict) -> int:
+    global _export_figure
+
+    key = tuple(sorted((k, v) for k, v in kwargs.items() if k != "pca_steps"))
+    if _export_figure is None or _export_figure[0] != key:
+        fig = Figure(figsize = kwargs["figsize"], dpi = kwargs["dpi"])
+        FigureCanvasAgg(fig)
+        _export_figure = (key, fig)
+    fig = _export_figure[1]
+
+    for sample, data, projection, pca_results in job:
+        plot_kwargs = kwargs.copy()
+        if pca_results is not None:
+            plot_kwargs["pca_results"] = pca_results
+
+        zijder_plot(sample, data, xh, xv, y, z, figure = fig, projection = projection, **plot_kwargs)
+        for fmt in fmts:
+            fig.savefig(os.path.join(outdir, "Zijder_{0}.{1}".format(sample, fmt)), format = fmt)
+
+    return len(job)
+
+def zijder_pdf(outfile: str, indata: P1DataObject, xh: str="N", xv: str="N", y: str="W", z: str="Up", pbar=None, **kwargs) -> int:
+    """
+    | Streams the zijderveld plots of all samples into a single multi-page pdf file, one page per sample.
+    | Pages are written as they are rendered and one figure is reused, memory does not grow with the number of samples.
+
+    :type outfile: string
+    :type indata: P1DataObject
+    :type xh: string
+    :type xv: string
+    :type y: string
+    :type z: string
+    :type pbar: P1Progressbar
+
+    :param outfile: full path to pdf file
+    :param indata: P1DataObject with all sample data
+    :param xh: component to be plotted on x-axis, horizontal projection (N, S, E or W, default: N)
+    :param xv: component to be plotted on x-axis, vertical projection (N, S, E or W, default: N)
+    :param y: component to be plotted on y-axis, horizontal projection (N, S, E or W, default: W)
+    :param z: component to be plotted on y-axis, vertical projection (Up or Down, default: Up)
+    :param pbar: progress bar instance, only used in gui mode, export stops if it was canceled
+
+    :Keyword Arguments:
+        * *figsize* (``tuple``) --
+          size of pages in inches (default: (5, 5))
+        * *pca_results* (``numpy.ndarray``) --
+          array of pca results [SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step] (default: None)
+        * *pca_anno* (``bool``) --
+          annotate plot with pca results, Inc, Dec, MADp and MADo (default: False)
+        * *pca_points* (``bool``) --
+          mark points used in pca (default: False)
+        * *pca_lines* (``bool``) --
+          plot largest Eigenvector of pca (default: False)
+
+    :returns: number of pages
+    :rtype: integer
+    """
+    # Check dir and create if necessary
+    if os.path.dirname(outfile) != "" and not os.path.exists(os.path.dirname(outfile)):
+        os.makedirs(os.path.dirname(outfile))
+
+    # Set parameters
+    if "figsize" not in kwargs:
+        kwargs["figsize"] = (5, 5)
+    if "pca_results" not in kwargs:
+        kwargs["pca_results"] = None
+        kwargs["pca_anno"] = False
+        kwargs["pca_points"] = False
+        kwargs["pca_lines"] = False
+    if "pca_anno" not in kwargs:
+        kwargs["pca_anno"] = False
+    if "pca_points" not in kwargs:
+        kwargs["pca_points"] = False
+    if "pca_lines" not in kwargs:
+        kwargs["pca_lines"] = False
+
+    pca_results = kwargs["pca_results"]
+    steps = indata.get_steps()
+    vectors = indata.get_vectors()
+    if pca_results is not None:
+        projection = zijder_projection(vectors, xh, xv, y, z, pca_results, steps)
+    else:
+        projection = zijder_projection(vectors, xh, xv, y, z)
+
+    plot_kwargs = {
+        "units": indata.get_units(),
+        "pca_anno": kwargs["pca_anno"],
+        "pca_points": kwargs["pca_points"],
+        "pca_lines": kwargs["pca_lines"]
+    }
+    if pca_results is not None:
+        plot_kwargs["pca_steps"] = steps
+
+    fig = Figure(figsize = kwargs["figsize"])
+    FigureCanvasAgg(fig)
+
+    pages = 0
+    with PdfPages(outfile) as pdf:
+        for n, sample in enumerate(indata.get_sample_names()):
+            if pca_results is not None:
+                plot_kwargs["pca_results"] = pca_results[n]
+
+            zijder_plot(str(sample), vectors[n], xh, xv, y, z, figure = fig, projection = zijder_sample(projection, n), **plot_kwargs)
+            pdf.savefig(fig)
+            pages += 1
+
+            if not _update_progress(pbar, pages, indata.rowCount()):
+                break
+
+    return pages
+
+def zijder_contact_sheet(outfile: str, indata: P1DataObject, xh: str="N", xv: str="N", y: str="W", z: str="Up", rows: int=4, cols: int=3, pbar=None, **kwargs) -> int:
+    """
+    | Tiles small zijderveld plots of all samples on pages of rows x cols plots.
+    | A pdf file is written as a single multi-page document, other formats write one file per page with the page number appended to the file name.
+    | Pages are written as they are rendered and the tiles are reused, memory does not grow with the number of samples.
+
+    :type outfile: string
+    :type indata: P1DataObject
+    :type xh: string
+    :type xv: string
+    :type y: string
+    :type z: string
+    :type rows: integer
+    :type cols: integer
+    :type pbar: P1Progressbar
+
+    :param outfile: full path to output file, format will be determined from file extension
+    :param indata: P1DataObject with all sample data
+    :param xh: component to be plotted on x-axis, horizontal projection (N, S, E or W, default: N)
+    :param xv: component to be plotted on x-axis, vertical projection (N, S, E or W, default: N)
+    :param y: component to be plotted on y-axis, horizontal projection (N, S, E or W, default: W)
+    :param z: component to be plotted on y-axis, vertical projection (Up or Down, default: Up)
+    :param rows: plots per page in vertical direction (default: 4)
+    :param cols: plots per page in horizontal direction (default: 3)
+    :param pbar: progress bar instance, only used in gui mode, export stops if it was canceled
+
+    :Keyword Arguments:
+        * *pagesize* (``tuple``) --
+          size of pages in inches (default: (8.27, 11.69), A4)
+        * *dpi* (``float``) --
+          resolution of raster formats (default: 300)
+        * *pca_results* (``numpy.ndarray``) --
+          array of pca results [SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step] (default: None)
+        * *pca_anno* (``bool``) --
+          annotate plots with pca results, Inc, Dec, MADp and MADo (default: False)
+        * *pca_points* (``bool``) --
+          mark points used in pca (default: False)
+        * *pca_lines* (``bool``) --
+          plot largest Eigenvector of pca (default: False)
+
+    :returns: number of pages
+    :rtype: integer
+    """
+    # Check dir and create if necessary
+    if os.path.dirname(outfile) != "" and not os.path.exists(os.path.dirname(outfile)):
+        os.makedirs(os.path.dirname(outfile))
+
+    # Set parameters
+    if "pagesize" not in kwargs:
+        kwargs["pagesize"] = (8.27, 11.69)
+    if "dpi" not in kwargs:
+        kwargs["dpi"] = 300
+    if "pca_results" not in kwargs:
+        kwargs["pca_results"] = None
+        kwargs["pca_anno"] = False
+        kwargs["pca_points"] = False
+        kwargs["pca_lines"] = False
+    if "pca_anno" not in kwargs:
+        kwargs["pca_anno"] = False
+    if "pca_points" not in kwargs:
+        kwargs["pca_points"] = False
+    if "pca_lines" not in kwargs:
+        kwargs["pca_lines"] = False
+
+    pca_results = kwargs["pca_results"]
+    if pca_results is not None:
+        projection = zijder_projection(indata.get_vectors(), xh, xv, y, z, pca_results, indata.get_steps())
+    else:
+        projection = zijder_projection(indata.get_vectors(), xh, xv, y, z)
+        kwargs["pca_anno"] = kwargs["pca_points"] = kwargs["pca_lines"] = False
+
+    base, ext = os.path.splitext(outfile)
+    fmt = ext[1:].lower() if ext != "" else "pdf"
+    samples = indata.get_sample_names()
+    per_page = rows * cols
+    pages = 0
+
+    with mpl.style.context("{0}/P1Mpl/styles/zijder.mplstyle".format(palaeopca.basedir)):
+        fig = Figure(figsize = kwargs["pagesize"], dpi = kwargs["dpi"])
+        FigureCanvasAgg(fig)
+        fig.subplots_adjust(left = 0.06, right = 0.97, bottom = 0.04, top = 0.96, wspace = 0.3, hspace = 0.3)
+
+        # Create tiles once, pages only update their data
+        tiles = []
+        for ax in fig.subplots(rows, cols, squeeze = False).flat:
+            ax.set_aspect("equal", adjustable = "datalim")
+            ax.spines["top"].set_position(("data", 0))
+            ax.spines["right"].set_position(("data", 0))
+            ax.tick_params(labelsize = 5)
+            ax.xaxis.offsetText.set_fontsize(5)
+            ax.yaxis.offsetText.set_fontsize(5)
+            tiles.append({
+                "ax": ax,
+                "h": ax.plot([], [], "s--", color = "blue", markersize = 2)[0],
+                "v": ax.plot([], [], "^--", color = "red", markersize = 2)[0],
+                "h_points": ax.plot([], [], "s", color = "blue", markerfacecolor = "blue", markersize = 2, visible = kwargs["pca_points"])[0],
+                "v_points": ax.plot([], [], "^", color = "red", markerfacecolor = "red", markersize = 2, visible = kwargs["pca_points"])[0],
+                "h_line": ax.plot([], [], "-", color = "black", visible = kwargs["pca_lines"])[0],
+                "v_line": ax.plot([], [], "-", color = "black", visible = kwargs["pca_lines"])[0],
+                "title": ax.set_title("", fontsize = 6),
+                "anno": ax.text(0.02, 0.02, "", transform = ax.transAxes, fontsize = 5, verticalalignment = "bottom", visible = kwargs["pca_anno"])
+            })
+
+        pdf = PdfPages(outfile) if fmt == "pdf" else None
+        try:
+            for start in range(0, len(samples), per_page):
+                for i, tile in enumerate(tiles):
+                    n = start + i
+                    tile["ax"].set_visible(n < len(samples))
+                    if n >= len(samples):
+                        continue
+
+                    p = zijder_sample(projection, n)
+                    tile["h"].set_data(p["h"][:, 0], p["h"][:, 1])
+                    tile["v"].set_data(p["v"][:, 0], p["v"][:, 1])
+                    tile["title"].set_text(str(samples[n]))
+                    if pca_results is not None:
+                        tile["h_points"].set_data(p["h"][p["mask"], 0], p["h"][p["mask"], 1])
+                        tile["v_points"].set_data(p["v"][p["mask"], 0], p["v"][p["mask"], 1])
+                        tile["h_line"].set_data(*p["h_line"])
+                        tile["v_line"].set_data(*p["v_line"])
+                        tile["anno"].set_text("Inc: {0:.1f}°, Dec: {1:.1f}°\nMADp: {2:.1f}°, MADo: {3:.1f}°".format(*pca_results[n, 2:6]))
+
+                    # Scale to data points only, pca lines may extend beyond
+                    tile["ax"].ignore_existing_data_limits = True
+                    tile["ax"].update_datalim(np.concatenate([p["h"], p["v"]]))
+                    tile["ax"].autoscale_view()
+
+                pages += 1
+                if pdf is not None:
+                    pdf.savefig(fig)
+                else:
+                    fig.savefig("{0}_{1:04d}{2}".format(base, pages, ext), format = fmt)
+
+                if not _update_progress(pbar, min(start + per_page, len(samples)), len(samples)):
+                    break
+        finally:
+            if pdf is not None:
+                pdf.close()
+
+    return pages
+
+def _update_progress(pbar, done: int, total: int) -> bool:
+    """
+    Updates the progress bar, returns False if it was canceled.
+    """
+    if pbar != None:
+        new_value = int(100 * done / total)
+        if new_value > pbar.progress.value():
+            pbar.progress.setValue(new_value)
+        QApplication.processEvents()
+        return not getattr(pbar, "canceled", False)
+    return True
+
+def zijder_render(sample: str, indata: np.ndarray, xh: str="N", xv: str="N", y: str="W", z: str="Up", **kwargs) -> (int, int, bytes):
+    """
+    Renders a zijderveld plot into an RGBA buffer without pyplot figure management, used to render plots in worker processes.
+
+    :type sample: string
+    :type indata: numpy.ndarray
+    :type xh: string
+    :type xv: string
+    :type y: string
+    :type z: string
+
+    :param sample: sample name used in legend
+    :param indata: numpy array of (x, y, z) data vectors
+    :param xh: component to be plotted on x-axis, horizontal projection (N, S, E or W, default: N)
+    :param xv: component to be plotted on x-axis, vertical projection (N, S, E or W, default: N)
+    :param y: component to be plotted on y-axis, horizontal projection (N, S, E or W, default: W)
+    :param z: component to be plotted on y-axis, vertical projection (Up or Down, default: Up)
+    :param kwargs: keyword arguments passed to zijder_plot, figsize and dpi define the size of the image
+
+    :returns: width, height and RGBA data of the image
+    :rtype: tuple
+    """
+    if "figsize" not in kwargs:
+        kwargs["figsize"] = (5, 5)
+    if "dpi" not in kwargs:
+        kwargs["dpi"] = 300
+
+    fig = Figure(figsize = kwargs["figsize"], dpi = kwargs["dpi"])
+    canvas = FigureCanvasAgg(fig)
+    kwargs["figure"] = fig
+
+    zijder_plot(sample, indata, xh, xv, y, z, **kwargs)
+    canvas.draw()
+    width, height = canvas.get_width_height()
+
+    return width, height, bytes(canvas.buffer_rgba())
+
+def pca_line_angles(inc: float, dec: float, xh: str="N", xv: str="N", y: str="W", z: str="Up") -> (float, float):
+    """
+    Calculates the angles of the pca direction in the horizontal and vertical projection of a zijderveld plot.
+
+    :type inc: float
+    :type dec: float
+    :type xh: string
+    :type xv: string
+    :type y: string
+    :type z: string
+
+    :param inc: inclination of the pca direction in degrees, scalar or array
+    :param dec: declination of the pca direction in degrees, scalar or array
+    :param xh: component to be plotted on x-axis, horizontal projection (N, S, E or W, default: N)
+    :param xv: component to be plotted on x-axis, vertical projection (N, S, E or W, default: N)
+    :param y: component to be plotted on y-axis, horizontal projection (N, S, E or W, default: W)
+    :param z: component to be plotted on y-axis, vertical projection (Up or Down, default: Up)
+
+    :returns: angles of the horizontal and vertical projection line in radians, same shape as inc and dec
+    :rtype: tuple
+    """
+    # Convert inc and dec to radians
+    incRad = np.radians(inc)
+    decRad = np.radians(dec)
+
+    # Only the two needed projections are evaluated
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        angle_h = _line_angles["{0}{1}".format(xh, y)](incRad, decRad)
+        angle_v = _line_angles["{0}{1}".format(xv, z)](incRad, decRad)
+
+    return angle_h, angle_v
+
+def zijder_projection(indata: np.ndarray, xh: str="N", xv: str="N", y: str="W", z: str="Up", pca_results: np.ndarray=None, pca_steps: np.ndarray=None, stdv: float=1.5) -> dict:
+    """
+    | Calculates the zijderveld projections of all samples at once.
+    | Plots only need to set the data of their artists, see zijder_sample to get the arrays of a single sample.
+
+    :type indata: numpy.ndarray
+    :type xh: string
+    :type xv: string
+    :type y: string
+    :type z: string
+    :type pca_results: numpy.ndarray
+    :type pca_steps: numpy.ndarray
+    :type stdv: float
+
+    :param indata: array with samples in the first, steps in the second and (x, y, z) in the third dimension, see P1DataObject.get_vectors
+    :param xh: component to be plotted on x-axis, horizontal projection (N, S, E or W, default: N)
+    :param xv: component to be plotted on x-axis, vertical projection (N, S, E or W, default: N)
+    :param y: component to be plotted on y-axis, horizontal projection (N, S, E or W, default: W)
+    :param z: component to be plotted on y-axis, vertical projection (Up or Down, default: Up)
+    :param pca_results: array of pca results [SampleID/Depth, NRM, Inclination, Declination, MADp, MADo, Min step, Max step] per sample (default: None)
+    :param pca_steps: demagnetization steps, required with pca_results (default: None)
+    :param stdv: length of pca lines beyond the used points in standard deviations (default: 1.5)
+
+    :returns: dictionary with projected points "h" and "v" (samples, steps, 2), with pca_results also points used in pca "mask" (samples, steps) and pca line end points "h_line" and "v_line" (samples, 2, 2) as [(x1, x2), (y1, y2)]
+    :rtype: dict
+    """
+    projection = {
+        "h": np.empty(indata.shape[:2] + (2,)),
+        "v": np.empty(indata.shape[:2] + (2,))
+    }
+    for key, (cx, cy) in (("h", (xh, y)), ("v", (xv, z))):
+        for n, c in enumerate((cx, cy)):
+            col, sign = _components[c]
+            np.multiply(indata[:, :, col], sign, out = projection[key][:, :, n])
+
+    if pca_results is not None:
+        pca_results = np.atleast_2d(pca_results)
+        projection["mask"] = np.logical_and(pca_steps >= pca_results[:, 6, None], pca_steps <= pca_results[:, 7, None])
+
+        angle_h, angle_v = pca_line_angles(pca_results[:, 2], pca_results[:, 3], xh, xv, y, z)
+        for key, angle in (("h", angle_h), ("v", angle_v)):
+            x_line, y_line = PCALines(projection[key][:, :, 0], projection[key][:, :, 1], angle, stdv, projection["mask"])
+            projection[key + "_line"] = np.stack([x_line, y_line], axis = 1)
+
+    return projection
+
+def zijder_sample(projection: dict, n: int) -> dict:
+    """
+    Returns the projection arrays of a single sample.
+
+    :type projection: dict
+    :type n: integer
+
+    :param projection: projection of all samples, see zijder_projection
+    :param n: row index of the sample
+
+    :returns: dictionary with the same keys and the sample dimension removed
+    :rtype: dict
+    """
+    return {key: value[n] for key, value in projection.items()}
+
+class P1ZijderProjection(object):
+    """
+    Class implementing the zijderveld projections of a data container, calculated for blocks of samples on demand.
+
+    Only the vectors of requested blocks are read, a lazily loaded file is parsed for the samples that are shown.
+    """
+    def __init__(self, indata: P1DataObject, xh: str="N", xv: str="N", y: str="W", z: str="Up", pca_results: np.ndarray=None, block: int=64, cache_size: int=64):
+        """
+        Constructor
+
+        :type indata: P1DataObject
+        :type xh: string
+        :type xv: string
+        :type y: string
+        :type z: string
+        :type pca_results: numpy.ndarray
+        :type block: integer
+        :type cache_size: integer
+
+        :param indata: data container
+        :param xh: component to be plotted on x-axis, horizontal projection, see zijder_projection
+        :param xv: component to be plotted on x-axis, vertical projection, see zijder_projection
+        :param y: component to be plotted on y-axis, horizontal projection, see zijder_projection
+        :param z: component to be plotted on y-axis, vertical projection, see zijder_projection
+        :param pca_results: array of pca results per sample, rows changed later need an update (default: None)
+        :param block: samples projected at once (default: 64)
+        :param cache_size: maximum number of cached blocks (default: 64)
+        """
+        self.__data = indata
+        self.__components = (xh, xv, y, z)
+        self.__results = pca_results
+        self.__block = block
+        self.__blocks = P1LRUCache(cache_size)
+
+    def get(self, n: int) -> dict:
+        """
+        Returns the projection arrays of a single sample, the block of the sample is calculated if not cached.
+
+        :type n: integer
+
+        :param n: row index of the sample
+
+        :returns: dictionary with the keys of zijder_projection and the sample dimension removed, see zijder_sample
+        :rtype: dict
+        """
+        block, row = divmod(n, self.__block)
+        projection = self.__blocks.get(block)
+        if projection is None:
+            rows = slice(block * self.__block, min((block + 1) * self.__block, self.__data.rowCount()))
+            projection = self.__project(rows)
+            self.__blocks.put(block, projection)
+        return zijder_sample(projection, row)
+
+    def update(self, n: int):
+        """
+        Calculates the projection of a single sample again, e.g. after its pca results changed.
+
+        :type n: integer
+
+        :param n: row index of the sample
+        """
+        block, row = divmod(n, self.__block)
+        projection = self.__blocks.get(block)
+        if projection is not None:
+            for key, value in self.__project(slice(n, n + 1)).items():
+                projection[key][row] = value[0]
+
+    def __project(self, rows: slice) -> dict:
+        if self.__results is None:
+            return zijder_projection(self.__data.get_vectors(rows), *self.__components)
+        return zijder_projection(self.__data.get_vectors(rows), *self.__components, self.__results[rows], self.__data.get_steps())
+
+def zijder_plot(sample: str, indata: np.ndarray, xh: str="N", xv: str="N", y: str="W", z: str="Up", **kwargs) -> Figure:
     """
     Generates and a zijderveld plot of provided data.
 
@@ -136,13 +799,12 @@ def zijder_plot(sample: str, indata: np.ndarray, xh: str="N", xv: str="N", y: st
           mark points used in pca (default: False)
         * *pca_lines* (``bool``) --
           plot largest Eigenvector of pca (default: False)
+        * *projection* (``dict``) --
+          precalculated projection of the sample, see zijder_projection and zijder_sample (default: None, calculated from indata)
 
     :returns: matplotlib figure or axis instance.
     :rtype: matplotlib.Figure or matplotlib.Axis
     """
-    # Set style
-    plt.style.use("{0}/P1Mpl/styles/zijder.mplstyle".format(palaeopca.basedir))
-
     # Set parameters
     if "figure" not in kwargs:
         kwargs["figure"] = None
@@ -173,159 +835,117 @@ def zijder_plot(sample: str, indata: np.ndarray, xh: str="N", xv: str="N", y: st
     if "pca_lines" not in kwargs:
         kwargs["pca_lines"] = False
 
-    # Prepare figure
-    if kwargs["figure"] != None:
-        fig = kwargs["figure"]
-    else:
-        fig = plt.figure(figsize = kwargs["figsize"], dpi = kwargs["dpi"])
+    # Style only applies to this plot, the global rcParams are not changed
+    with mpl.style.context("{0}/P1Mpl/styles/zijder.mplstyle".format(palaeopca.basedir)):
+        # Prepare figure
+        if kwargs["figure"] != None:
+            fig = kwargs["figure"]
+        else:
+            import matplotlib.pyplot as plt
+            fig = plt.figure(figsize = kwargs["figsize"], dpi = kwargs["dpi"])
 
-    # Check if figure has an axis and create if necessary
-    if len(fig.axes) == 0:
-        # Add axes
-        ax = fig.add_axes([0.18, 0.1, 0.5, 0.75])
+        # Check if figure has an axis and create if necessary
+        if len(fig.axes) == 0:
+            # Add axes
+            ax = fig.add_axes([0.18, 0.1, 0.5, 0.75])
         
-        # Make axis equal
-        ax.set_aspect("equal", anchor = "C", adjustable = "box")
-        redraw = False
-
-        # Move spines to origin
-        ax.spines["top"].set_position(("data", 0))
-        ax.spines["right"].set_position(("data", 0))
-    else:
-        ax = fig.axes[0]
-        redraw = True
-    
-    # Add data
-    data = {
-        "N": indata[:, 0],
-        "S": -indata[:, 0],
-        "E": indata[:, 1],
-        "W": -indata[:, 1],
-        "Down": indata[:,2],
-        "Up": -indata[:,2],
-    }
-
-    # Check if lines already exist
-    if not redraw:
-        h_line = ax.plot(data[xh], data[y], "s--", color = "blue", label = "Horizontal")
-        v_line = ax.plot(data[xv], data[z], "^--", color = "red", label = "Vertical")
-        hdl = [h_line[0], v_line[0]]
-    else:
-        ax.get_lines()[0].set_data(data[xh], data[y])
-        ax.get_lines()[1].set_data(data[xv], data[z])
-        hdl, _ = ax.get_legend_handles_labels()
-        hdl = hdl[:2]
-
-    # Mark points
-    if pca_results:
-        ind = np.logical_and(kwargs["pca_steps"] >= kwargs["pca_results"][6], kwargs["pca_steps"] <= kwargs["pca_results"][7])
+            # Make axis equal
+            ax.set_aspect("equal", anchor = "C", adjustable = "box")
+            redraw = False
 
-    if kwargs["pca_points"] and len(kwargs["pca_steps"]) == indata.shape[0]:
-        if not redraw:
-            ax.plot(data[xh][ind], data[y][ind], "s", markerfacecolor = "blue")
-            ax.plot(data[xv][ind], data[z][ind], "^", markerfacecolor = "red")
+            # Move spines to origin
+            ax.spines["top"].set_position(("data", 0))
+            ax.spines["right"].set_position(("data", 0))
         else:
-            ax.get_lines()[2].set_data(data[xh][ind], data[y][ind])
-            ax.get_lines()[3].set_data(data[xv][ind], data[z][ind])
-
-    # Draw pca lines
-    if kwargs["pca_lines"] and len(kwargs["pca_steps"]) == indata.shape[0]:
-        # Convert inc and dec to radians
-        incRad = np.radians(kwargs["pca_results"][2])
-        decRad = np.radians(kwargs["pca_results"][3])
-
-        # Generate dictionary with all possible projections
-        direction_mapper = {
-            "NN": np.radians(45),
-            "NE": (np.pi / 2 + (-1) * decRad),
-            "NS": -np.radians(45),
-            "NW": -1 * (np.pi / 2 + (-1) * decRad),
-
-            "EN": decRad,#(np.pi / 2 - decRad),
-            "EE": np.radians(45),
-            "ES": -decRad,
-            "EW": -np.radians(45),
-
-            "SN": -np.radians(45),
-            "SE": -1 * (np.pi / 2 + (-1) * decRad),
-            "SS": np.radians(45),
-            "SW": (np.pi / 2 + (-1) * decRad),
-
-            "WN": -decRad,
-            "WE": -np.radians(45),
-            "WS": decRad,
-            "WW": np.radians(45),
-            
-            "NUp": -1 * (np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(decRad)))),
-            "NDown": np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(decRad))),
-
-            "EUp": -1 * (np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(np.pi/2-decRad)))),
-            "EDown": (np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(np.pi/2-decRad)))),
-
-            "SUp": np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(decRad))),
-            "SDown": -1 * (np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(decRad)))),
-
-            "WUp": (np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(np.pi/2-decRad)))),
-            "WDown": -1 * (np.pi / 2 + np.arctan(np.sin(incRad) / (np.cos(incRad) * np.cos(np.pi/2-decRad)))),
-        }
-
-        # Get line angle for horizontal projection & calculate horizontal projection line parameters
-        angleRad = direction_mapper["{0}{1}".format(xh, y)]
-        x_h, y_h = PCALine(data[xh][ind], data[y][ind], angleRad, 1.5)
-
-        # Get line angle for horizontal projection & calculate horizontal projection line parameters
-        angleRad = direction_mapper["{0}{1}".format(xv, z)]
-        x_v, y_v = PCALine(data[xv][ind], data[z][ind], angleRad, 1.5)
+            ax = fig.axes[0]
+            redraw = True
+    
+        # Project data
+        pca_available = pca_results and len(kwargs["pca_steps"]) == indata.shape[0]
+        if "projection" not in kwargs or kwargs["projection"] is None:
+            if pca_available:
+                projection = zijder_projection(indata[None], xh, xv, y, z, kwargs["pca_results"], kwargs["pca_steps"])
+            else:
+                projection = zijder_projection(indata[None], xh, xv, y, z)
+            kwargs["projection"] = zijder_sample(projection, 0)
+        h = kwargs["projection"]["h"]
+        v = kwargs["projection"]["v"]
 
-        # Draw lines
+        # Check if lines already exist
         if not redraw:
-            ax.plot(x_v, y_v, "-", color = "black")
-            ax.plot(x_h, y_h, "-", color = "black")
+            h_line = ax.plot(h[:, 0], h[:, 1], "s--", color = "blue", label = "Horizontal")
+            v_line = ax.plot(v[:, 0], v[:, 1], "^--", color = "red", label = "Vertical")
+            hdl = [h_line[0], v_line[0]]
         else:
-            if len(ax.get_lines()) == 4:
-                ax.get_lines()[2].set_data(x_v, y_v)
-                ax.get_lines()[3].set_data(x_h, y_h)
+            ax.get_lines()[0].set_data(h[:, 0], h[:, 1])
+            ax.get_lines()[1].set_data(v[:, 0], v[:, 1])
+            hdl, _ = ax.get_legend_handles_labels()
+            hdl = hdl[:2]
+
+        # Mark points
+        if kwargs["pca_points"] and pca_available:
+            ind = kwargs["projection"]["mask"]
+            if not redraw:
+                ax.plot(h[ind, 0], h[ind, 1], "s", markerfacecolor = "blue")
+                ax.plot(v[ind, 0], v[ind, 1], "^", markerfacecolor = "red")
             else:
-                ax.get_lines()[4].set_data(x_v, y_v)
-                ax.get_lines()[5].set_data(x_h, y_h)
-
-    # Draw figure so we can change tick labels
-    ax.relim()
-    ax.autoscale()
-    fig.canvas.draw()
-
-    # Move scale factor to label
-    ax.xaxis.offsetText.set_visible(False)
-    ax.yaxis.offsetText.set_visible(False)
-
-    offset = ax.xaxis.get_offset_text().get_text()
-    xlabel = xh
-    if xh != xv:
-        xlabel += ", {0}".format(xv)
-    ax.set_xlabel("{0} ({1} {2})".format(xlabel, kwargs["units"], offset))
-
-    offset = ax.yaxis.get_major_formatter().get_offset()
-    ylabel = "{0}, {1}".format(y, z)
-    ax.set_ylabel("{0} ({1} {2})".format(ylabel, kwargs["units"], offset))
-
-    # Annotate
-    sample_patch = mpatches.Patch(alpha = 0, label = sample)
-    hdl.append(sample_patch)
-
-    if kwargs["pca_anno"]:
-        inc_patch = mpatches.Patch(alpha = 0, label = "Inc: {:.1f} ($^o$)".format(kwargs["pca_results"][2]))
-        hdl.append(inc_patch)
-
-        dec_patch = mpatches.Patch(alpha = 0, label = "Dec: {:.1f} ($^o$)".format(kwargs["pca_results"][3]))
-        hdl.append(dec_patch)
-
-        madp_patch = mpatches.Patch(alpha = 0, label = "MADp: {:.1f} ($^o$)".format(kwargs["pca_results"][4]))
-        hdl.append(madp_patch)
-
-        mado_patch = mpatches.Patch(alpha = 0, label = "MADo: {:.1f} ($^o$)".format(kwargs["pca_results"][5]))
-        hdl.append(mado_patch)
+                ax.get_lines()[2].set_data(h[ind, 0], h[ind, 1])
+                ax.get_lines()[3].set_data(v[ind, 0], v[ind, 1])
+
+        # Draw pca lines
+        if kwargs["pca_lines"] and pca_available:
+            x_h, y_h = kwargs["projection"]["h_line"]
+            x_v, y_v = kwargs["projection"]["v_line"]
+
+            # Draw lines
+            if not redraw:
+                ax.plot(x_v, y_v, "-", color = "black")
+                ax.plot(x_h, y_h, "-", color = "black")
+            else:
+                if len(ax.get_lines()) == 4:
+                    ax.get_lines()[2].set_data(x_v, y_v)
+                    ax.get_lines()[3].set_data(x_h, y_h)
+                else:
+                    ax.get_lines()[4].set_data(x_v, y_v)
+                    ax.get_lines()[5].set_data(x_h, y_h)
+
+        # Draw figure so we can change tick labels
+        ax.relim()
+        ax.autoscale()
+        fig.canvas.draw()
+
+        # Move scale factor to label
+        ax.xaxis.offsetText.set_visible(False)
+        ax.yaxis.offsetText.set_visible(False)
+
+        offset = ax.xaxis.get_offset_text().get_text()
+        xlabel = xh
+        if xh != xv:
+            xlabel += ", {0}".format(xv)
+        ax.set_xlabel("{0} ({1} {2})".format(xlabel, kwargs["units"], offset))
+
+        offset = ax.yaxis.get_major_formatter().get_offset()
+        ylabel = "{0}, {1}".format(y, z)
+        ax.set_ylabel("{0} ({1} {2})".format(ylabel, kwargs["units"], offset))
+
+        # Annotate
+        sample_patch = mpatches.Patch(alpha = 0, label = sample)
+        hdl.append(sample_patch)
+
+        if kwargs["pca_anno"]:
+            inc_patch = mpatches.Patch(alpha = 0, label = "Inc: {:.1f} ($^o$)".format(kwargs["pca_results"][2]))
+            hdl.append(inc_patch)
+
+            dec_patch = mpatches.Patch(alpha = 0, label = "Dec: {:.1f} ($^o$)".format(kwargs["pca_results"][3]))
+            hdl.append(dec_patch)
+
+            madp_patch = mpatches.Patch(alpha = 0, label = "MADp: {:.1f} ($^o$)".format(kwargs["pca_results"][4]))
+            hdl.append(madp_patch)
+
+            mado_patch = mpatches.Patch(alpha = 0, label = "MADo: {:.1f} ($^o$)".format(kwargs["pca_results"][5]))
+            hdl.append(mado_patch)
         
-    # Add Legend
-    ax.legend(handles = hdl, loc = "lower left", bbox_to_anchor = (1.02, 0))
+        # Add Legend
+        ax.legend(handles = hdl, loc = "lower left", bbox_to_anchor = (1.02, 0))
 
     return fig
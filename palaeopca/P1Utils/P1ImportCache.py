@@ -0,0 +1,153 @@
+import os
+import glob
+import hashlib
+import tempfile
+
+import numpy as np
+
+
+class P1ImportCache(object):
+    """
+    Class implementing a cache of parsed data files.
+
+    Parsed arrays are stored as binary .npy sidecars in a cache directory and memory-mapped when the file is opened again.
+    Sidecars are keyed by path, size, modification time and import options, a changed source file is parsed again.
+    The least recently used sidecars are removed when the cache exceeds its size.
+    """
+    version = 1
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 2**20):
+        """
+        Constructor
+
+        :param directory: cache directory, created if missing (string)
+        :param max_bytes: maximum total size of all sidecars (integer)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def load(self, infile: str, *options) -> np.ndarray:
+        """
+        Public method to retrieve a cached array, stale sidecars of the same file are removed.
+
+        :param infile: full path to input file (string)
+        :param options: import options the array was parsed with, e.g. delimiter and skipped rows
+        :return: copy-on-write memory map of the array or None (numpy.ndarray)
+        """
+        sidecar = self.__sidecar(infile, options)
+        if sidecar is None:
+            return None
+
+        self.__remove_stale(sidecar)
+        if not os.path.isfile(sidecar):
+            return None
+
+        try:
+            data = np.load(sidecar, mmap_mode = "c", allow_pickle = False)
+        except (OSError, ValueError):
+            self.__remove(sidecar)
+            return None
+
+        # Modification time orders sidecars for eviction
+        try:
+            os.utime(sidecar)
+        except OSError:
+            pass
+        return data
+
+    def store(self, infile: str, data: np.ndarray, *options):
+        """
+        Public method to write an array to the cache, older sidecars are evicted if the cache is full.
+
+        :param infile: full path to input file (string)
+        :param data: parsed array (numpy.ndarray)
+        :param options: import options the array was parsed with, see load
+        """
+        sidecar = self.__sidecar(infile, options)
+        if sidecar is None or data.nbytes > self.max_bytes:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+
+            # Written under a temporary name, concurrent loads never see partial files
+            fd, tmpfile = tempfile.mkstemp(".tmp", dir = self.directory)
+            with os.fdopen(fd, "wb") as fout:
+                np.save(fout, np.ascontiguousarray(data), allow_pickle = False)
+            os.replace(tmpfile, sidecar)
+        except OSError:
+            return
+
+        self.__remove_stale(sidecar)
+        self.evict()
+
+    def evict(self):
+        """
+        Public method to remove the least recently used sidecars until the cache fits its size.
+        """
+        files = []
+        for sidecar in glob.glob(os.path.join(self.directory, "*.npy")):
+            try:
+                stat = os.stat(sidecar)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, sidecar))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, sidecar in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if self.__remove(sidecar):
+                total -= size
+
+    def clear(self):
+        """
+        Public method to remove all sidecars.
+        """
+        for sidecar in glob.glob(os.path.join(self.directory, "*.npy")):
+            self.__remove(sidecar)
+
+    def size(self) -> int:
+        """
+        Public method to get the total size of all sidecars.
+
+        :return: size in bytes (integer)
+        """
+        total = 0
+        for sidecar in glob.glob(os.path.join(self.directory, "*.npy")):
+            try:
+                total += os.path.getsize(sidecar)
+            except OSError:
+                pass
+        return total
+
+    def __sidecar(self, infile: str, options: tuple) -> str:
+        # <path>_<size, mtime>_<options>.npy, files of the same path share the prefix
+        try:
+            stat = os.stat(infile)
+        except OSError:
+            return None
+
+        path = _digest(os.path.normcase(os.path.abspath(infile)))
+        source = _digest((stat.st_size, stat.st_mtime_ns))
+        options = _digest((self.version,) + tuple(options))
+        return os.path.join(self.directory, "{0}_{1}_{2}.npy".format(path, source, options))
+
+    def __remove_stale(self, sidecar: str):
+        # Sidecars of an older version of the same file
+        path, source, _ = os.path.basename(sidecar).split("_")
+        for other in glob.glob(os.path.join(self.directory, path + "_*.npy")):
+            if os.path.basename(other).split("_")[1] != source:
+                self.__remove(other)
+
+    def __remove(self, sidecar: str) -> bool:
+        # Mapped files cannot be removed on all platforms, they are tried again later
+        try:
+            os.remove(sidecar)
+        except OSError:
+            return False
+        return True
+
+
+def _digest(value) -> str:
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+
+class P1LRUCache(object):
+    """
+    Class implementing a size-bounded least recently used cache.
+    """
+    def __init__(self, maxsize: int = 64):
+        """
+        Constructor
+
+        :param maxsize: maximum number of entries (integer)
+        """
+        self.maxsize = maxsize
+        self.__items = OrderedDict()
+
+    def get(self, key, default = None):
+        """
+        Public method to retrieve an entry, marks it as most recently used.
+
+        :param key: key of the entry
+        :param default: value returned if key is not cached
+        :return: cached value or default
+        """
+        try:
+            self.__items.move_to_end(key)
+        except KeyError:
+            return default
+        return self.__items[key]
+
+    def put(self, key, value):
+        """
+        Public method to add an entry, the least recently used entries are dropped if the cache is full.
+
+        :param key: key of the entry
+        :param value: value to cache
+        """
+        self.__items[key] = value
+        self.__items.move_to_end(key)
+        while len(self.__items) > self.maxsize:
+            self.__items.popitem(last = False)
+
+    def pop(self, key, default = None):
+        """
+        Public method to remove an entry.
+
+        :param key: key of the entry
+        :param default: value returned if key is not cached
+        :return: removed value or default
+        """
+        return self.__items.pop(key, default)
+
+    def clear(self):
+        """
+        Public method to remove all entries.
+        """
+        self.__items.clear()
+
+    def __contains__(self, key):
+        return key in self.__items
+
+    def __len__(self):
+        return len(self.__items)
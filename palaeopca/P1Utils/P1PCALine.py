@@ -30,4 +30,39 @@ def PCALine(x, y, r, stdv = 1) -> (List, List):
     x_points = np.asarray([x.min() - stdv * x.std(), x.max() + stdv * x.std()])
     y_points = slope * x_points + intercept
 
-    return x_points, y_points
\ No newline at end of file
+    return x_points, y_points
+
+def PCALines(x, y, r, stdv = 1, mask = None) -> (np.ndarray, np.ndarray):
+    """
+    Function to calculate points for PCA fits of many samples at once, see PCALine
+
+    Keywords:
+        x: x data points, samples in the first dimension
+        y: y data points, samples in the first dimension
+        r: angles in radians, one per sample
+        stdv: scaling factor in standard deviations (default: 1)
+        mask: points used per sample (default: None, all points)
+
+    Returns:
+        Tuple with (samples, 2) arrays of (x1, x2), (y1, y2) coordinates
+    """
+    if mask is None:
+        mask = np.ones(x.shape, dtype = bool)
+    mask = np.logical_and(mask, np.logical_and(np.isfinite(x), np.isfinite(y)))
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        n = mask.sum(axis = 1)
+        x_pca = np.where(mask, x, 0).sum(axis = 1) / n
+        y_pca = np.where(mask, y, 0).sum(axis = 1) / n
+        x_std = np.sqrt(np.where(mask, (x - x_pca[:, None])**2, 0).sum(axis = 1) / n)
+
+        slope = np.cos(r) / np.sin(r)
+        intercept = y_pca - slope * x_pca
+
+        x_points = np.empty((x.shape[0], 2))
+        x_points[:, 0] = np.where(mask, x, np.inf).min(axis = 1) - stdv * x_std
+        x_points[:, 1] = np.where(mask, x, -np.inf).max(axis = 1) + stdv * x_std
+        x_points[n == 0] = np.nan
+        y_points = slope[:, None] * x_points + intercept[:, None]
+
+    return x_points, y_points
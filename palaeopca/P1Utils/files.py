@@ -1,8 +1,73 @@
 # Imports
+import os
+import io
+import bz2
+import gzip
+import lzma
+import zipfile
+from typing import List
+
 import numpy as np
 
 
+# Decompressors of single-stream files by extension
+_openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
 # Functions
+def open_file(infile: str, mode: str = "rt", errors: str = None):
+    """
+    Opens a data file for reading, compressed files are decompressed while they are read without temporary files.
+    Files ending with .gz, .bz2 or .xz are streamed through their decompressor, members of zip archives are addressed as archive.zip/member.
+
+    :param infile: full path to input file or archive member (string)
+    :param mode: "rt" for text or "rb" for bytes (string)
+    :param errors: handling of decoding errors in text mode, see open (string)
+    :return: file object
+    """
+    archive, member = _split_member(infile)
+    if archive is not None:
+        # Open members keep the archive file open after the archive is closed
+        with zipfile.ZipFile(archive) as zf:
+            fin = zf.open(member)
+        return io.TextIOWrapper(fin, errors = errors) if "b" not in mode else fin
+
+    opener = _openers.get(os.path.splitext(infile)[1].lower())
+    if opener is not None:
+        return opener(infile, mode, errors = errors) if "b" not in mode else opener(infile, mode)
+    return open(infile, mode, errors = errors)
+
+def archive_members(infile: str) -> List:
+    """
+    Lists the data files of a zip archive, other files are returned as they are.
+
+    :param infile: full path to input file (string)
+    :return: paths of all members as accepted by open_file, or the input file (list)
+    """
+    if not infile.lower().endswith(".zip") or not zipfile.is_zipfile(infile):
+        return [infile]
+    with zipfile.ZipFile(infile) as zf:
+        return ["{0}/{1}".format(infile, name) for name in zf.namelist() if not name.endswith("/")]
+
+def is_compressed(infile: str) -> bool:
+    """
+    Returns whether a data file is read through a decompressor, see open_file.
+
+    :param infile: full path to input file or archive member (string)
+    :return: compression state (bool)
+    """
+    return _split_member(infile)[0] is not None or os.path.splitext(infile)[1].lower() in _openers
+
+def _split_member(infile: str) -> tuple:
+    # (archive, member) of a path into a zip archive, (None, infile) otherwise
+    if os.path.isfile(infile):
+        return None, infile
+    lower = infile.lower()
+    for sep in ("/", "\\"):
+        n = lower.find(".zip" + sep)
+        if n >= 0 and os.path.isfile(infile[:n + 4]):
+            return infile[:n + 4], infile[n + 5:].replace("\\", "/")
+    return None, infile
+
 def load_file(infile: str) -> np.ndarray:
     """
     Loads a data file of known format:
@@ -32,6 +97,113 @@ def save_file(outfile: str, sample: np.ndarray, nrm: np.ndarray, inc: np.ndarray
         mado,
     ]).T
 
-    np.savetxt(outfile, outdata, delimiter = ",", header = "Sample,NRM,Inclination,Declination,MADp,MADo")
+    save_csv(outfile, outdata, header = "Sample,NRM,Inclination,Declination,MADp,MADo")
+
+    return outdata
+
+def write_csv(outfile: str, data: np.ndarray, header: str = "", sample: np.ndarray = None, fmt: str = "%.18e", delimiter: str = ",", chunk: int = 8192):
+    """
+    Writes a matrix to a text file, output matches np.savetxt with the same fmt, delimiter and header.
+    Rows are formatted in chunks with a single format operation, files ending with .gz are compressed.
+    Generator yielding the number of rows written after every chunk, closing it early removes the incomplete file.
+
+    :param outfile: full path to text file (string)
+    :param data: matrix with observations in rows (numpy.ndarray)
+    :param header: header line written after "# ", nothing is written if empty (string)
+    :param sample: SampleID/Depth written to the first column without copying the matrix, labels are written as they are (numpy.ndarray)
+    :param fmt: format of a single value, e.g. "%.6f" for fixed precision (string)
+    :param delimiter: column separator (string)
+    :param chunk: rows formatted at once (integer)
+    """
+    if data.ndim == 1:
+        data = data[:, np.newaxis]
+    labels = sample is not None and not np.issubdtype(sample.dtype, np.number)
+    row_fmt = delimiter.join(["%s"] * labels + [fmt] * (data.shape[1] + (sample is not None and not labels))) + "\n"
+
+    if outfile.endswith(".gz"):
+        f = gzip.open(outfile, "wt", compresslevel = 6, encoding = "utf-8")
+    else:
+        f = open(outfile, "w", encoding = "utf-8")
+    complete = False
+
+    try:
+        if header:
+            f.write("# " + header.replace("\n", "\n# ") + "\n")
+
+        for start in range(0, data.shape[0], chunk):
+            block = data[start:start+chunk]
+            if labels:
+                # Object rows keep labels and values apart
+                rows = np.empty((block.shape[0], block.shape[1] + 1), dtype = object)
+                rows[:, 0] = sample[start:start+chunk]
+                rows[:, 1:] = block
+                block = rows
+            elif sample is not None:
+                block = np.column_stack([sample[start:start+chunk], block])
+            f.write((row_fmt * block.shape[0]) % tuple(block.ravel().tolist()))
+            yield start + block.shape[0]
+
+        complete = True
+    finally:
+        f.close()
+        if not complete and os.path.exists(outfile):
+            os.remove(outfile)
+
+def save_csv(outfile: str, data: np.ndarray, header: str = "", sample: np.ndarray = None, fmt: str = "%.18e", delimiter: str = ","):
+    """
+    Writes a matrix to a text file, see write_csv.
+    """
+    for _ in write_csv(outfile, data, header, sample, fmt, delimiter):
+        pass
+
+def write_xlsx(outfile: str, data: np.ndarray, header: List = None, sample: np.ndarray = None, sample_header: str = "SampleID/Depth", chunk: int = 1024):
+    """
+    Writes a matrix to an Excel workbook in constant memory mode, rows are streamed to disk in order.
+    Generator yielding the number of data rows written after every chunk, closing it early removes the incomplete file.
+
+    :param outfile: full path to xlsx file (string)
+    :param data: matrix with observations in rows (numpy.ndarray)
+    :param header: column names written to the first row (list)
+    :param sample: SampleID/Depth written to the first column (numpy.ndarray)
+    :param sample_header: name of the sample column (string)
+    :param chunk: rows converted at once (integer)
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(outfile, {"constant_memory": True, "nan_inf_to_errors": True})
+    worksheet = workbook.add_worksheet()
+    complete = False
+
+    try:
+        row = 0
+        if header is not None:
+            names = [str(x) for x in header]
+            if sample is not None:
+                names.insert(0, sample_header)
+            worksheet.write_row(row, 0, names)
+            row += 1
+
+        for start in range(0, data.shape[0], chunk):
+            block = data[start:start+chunk].tolist()
+            if sample is not None:
+                for s, values in zip(sample[start:start+chunk].tolist(), block):
+                    worksheet.write_row(row, 0, [s] + values)
+                    row += 1
+            else:
+                for values in block:
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+            yield start + len(block)
+
+        complete = True
+    finally:
+        workbook.close()
+        if not complete and os.path.exists(outfile):
+            os.remove(outfile)
 
-    return outdata
\ No newline at end of file
+def save_xlsx(outfile: str, data: np.ndarray, header: List = None, sample: np.ndarray = None, sample_header: str = "SampleID/Depth"):
+    """
+    Writes a matrix to an Excel workbook, see write_xlsx.
+    """
+    for _ in write_xlsx(outfile, data, header, sample, sample_header):
+        pass
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from palaeopca.P1Backend.P1Backend import P1Backend
+from palaeopca.P1Backend.P1DataObject import P1DataObject
+from palaeopca.P1Backend.P1Kernel import P1IntervalPCA
+
+
+def overprint_file(outfile: str, samples: int=100, steps: int=16, seed: int=1, noise: float=10**(-6)):
+    """
+    Writes samples with a strong, quickly removed overprint on a weak characteristic component.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(steps)
+    rows = []
+    for n in range(samples):
+        o, c = rng.normal(size = 3), rng.normal(size = 3)
+        vectors = o * 10**3 * np.exp(-t / 2)[:, None] + c * 10**(-3) * (1 - t / steps)[:, None] + rng.normal(scale = noise, size = (steps, 3))
+        for k in range(steps):
+            rows.append("{0},{1},{2!r},{3!r},{4!r}".format(n, 5 * k, *vectors[k].tolist()))
+
+    with open(outfile, "w") as fout:
+        fout.write("id,step,x,y,z\n" + "\n".join(rows) + "\n")
+
+
+class TestBestFit(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.infile = os.path.join(cls.tmpdir.name, "overprint.csv")
+        overprint_file(cls.infile)
+        # More noise keeps the short intervals well-conditioned for ppca
+        cls.interval_file = os.path.join(cls.tmpdir.name, "interval.csv")
+        overprint_file(cls.interval_file, noise = 10**(-5))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def backend(self, ragged: bool=False, infile: str=None) -> P1Backend:
+        data = P1DataObject()
+        data.load_data(infile or self.infile, ",", 1, ragged = ragged)
+        backend = P1Backend()
+        backend.set_data(data)
+        return backend
+
+    def test_variants_match_ppca(self):
+        backend = self.backend()
+        variants = backend.run_best_fit(variants = "all")
+
+        for v, (anchor, origin) in enumerate(backend.pca_variants):
+            single = backend.run_best_fit(anchor = anchor, origin = origin)
+            np.testing.assert_array_equal(variants[v][:, 6:8], single[:, 6:8])
+            np.testing.assert_allclose(variants[v][:, 2:4], single[:, 2:4], atol = 10**(-6))
+            np.testing.assert_allclose(variants[v][:, 4], single[:, 4], rtol = 10**(-6))
+
+    def test_ragged_matches_grid(self):
+        grid = self.backend().run_best_fit(variants = "all")
+        ragged = self.backend(ragged = True).run_best_fit(variants = "all")
+
+        np.testing.assert_array_equal(ragged[:, :, 6:8], grid[:, :, 6:8])
+        np.testing.assert_allclose(ragged[:, :, 2:6], grid[:, :, 2:6], rtol = 10**(-9), atol = 10**(-9))
+
+    def test_interval_matches_ppca(self):
+        backend = self.backend(infile = self.interval_file)
+        data = backend.get_data()
+        out = np.empty(4)
+
+        for anchor, origin in backend.pca_variants:
+            interval = P1IntervalPCA(data, anchor, origin)
+            for n in range(data.rowCount()):
+                A = data.get_vectors(slice(n, n + 1))[0]
+                # Intervals after the overprint, the larger ones are ill-conditioned for ppca itself
+                for first, last in ((8, 13), (9, 11), (10, 15)):
+                    results = backend.ppca(A[first:last + 1], anchor = anchor, origin = origin)
+                    interval.fit(n, first, last, out)
+                    np.testing.assert_allclose(out[:2], [results["Inclination"], results["Declination"]], atol = 10**(-6))
+                    np.testing.assert_allclose(out[2], results["MADp"], rtol = 10**(-3))
+
+
+if __name__ == "__main__":
+    unittest.main()
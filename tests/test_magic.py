@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from palaeopca.P1Backend.P1Backend import P1Backend
+from palaeopca.P1Backend.P1MagIC import read_magic, write_specimens
+
+
+def measurements_file(outfile: str, directions: list, fields: range=range(0, 80, 10)):
+    """
+    Writes a MagIC measurements table of AF demagnetizations along the given (dec, inc) directions.
+    """
+    lines = ["tab\tmeasurements", "specimen\tmethod_codes\ttreat_ac_field\ttreat_temp\tmagn_moment\tdir_dec\tdir_inc"]
+    for n, (dec, inc) in enumerate(directions):
+        for k, field in enumerate(fields):
+            lines.append("S{0}\t{1}\t{2:g}\t273\t{3!r}\t{4:g}\t{5:g}".format(n, "LT-NO" if k == 0 else "LT-AF-Z", field * 10**(-3), float(10**(-6) * np.exp(-k / 3)), dec, inc))
+
+    with open(outfile, "w") as fout:
+        fout.write("\n".join(lines) + "\n")
+
+
+class TestMagIC(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_specimens_round_trip(self):
+        directions = [(10.0, 43.0), (100.0, -20.0), (250.0, 60.0), (350.0, 5.0)]
+        infile = os.path.join(self.tmpdir.name, "measurements.txt")
+        outfile = os.path.join(self.tmpdir.name, "specimens.txt")
+        measurements_file(infile, directions)
+
+        backend = P1Backend()
+        unit = backend.load_magic(infile)
+        self.assertEqual(unit, "mT")
+        self.assertEqual(backend.get_data().get_step_unit(), "mT")
+
+        results = backend.run_single_interval(10, 70, NRM_unit = "Am2", anchor = True)
+        np.testing.assert_allclose(results[:, 3:1:-1], directions, atol = 10**(-6))
+
+        write_specimens(outfile, results, backend.get_data().get_sample_names(), unit, anchor = True)
+        table = read_magic(outfile, "specimens", numeric = ["dir_dec", "dir_inc"])
+        np.testing.assert_allclose(np.column_stack((table["dir_dec"], table["dir_inc"])), directions, atol = 10**(-3))
+        self.assertTrue(all(u == "T" for u in table["meas_step_unit"]))
+
+
+if __name__ == "__main__":
+    unittest.main()